@@ -0,0 +1,88 @@
+"""
+1k concurrent "requests" against PostgreSQL: the asyncio pool(database_pool.core.aio) versus
+the sync pooled backend called through sync_to_async, as an async view does with the ORM.
+
+Needs a local server and psycopg 3, configured by BENCH_PG_HOST/PORT/NAME/USER/PASSWORD:
+
+    $ docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:15
+    $ python benchmarks/bench_asyncio_pool.py [--requests 1000] [--pool-size 10] [--sleep 0.002]
+"""
+
+import time
+import asyncio
+import argparse
+
+from common import configure_django, postgresql_from_env, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=1000, help='concurrent requests')
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--max-overflow', type=int, default=10)
+    parser.add_argument('--sleep', type=float, default=0.002, help='server side pg_sleep() of each query')
+    args = parser.parse_args()
+
+    pool_options = {'POOL_SIZE': args.pool_size, 'MAX_OVERFLOW': args.max_overflow, 'TIMEOUT': 60, 'ECHO': False}
+    configure_django({'default': postgresql_from_env(POOL_OPTIONS=pool_options)})
+
+    import django
+    django.setup()
+
+    from asgiref.sync import sync_to_async, ThreadSensitiveContext
+    from django.db import connection
+    from database_pool.core.aio import async_cursor, get_async_pool
+
+    sql = "SELECT pg_sleep(%s)"
+
+    def sync_query():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [args.sleep])
+                cursor.fetchall()
+        finally:
+            # request_finished: the connection goes back to the pool
+            connection.close()
+
+    async def sync_request():
+        # as Django's ASGIHandler does: one thread-sensitive context per request
+        async with ThreadSensitiveContext():
+            await sync_to_async(sync_query)()
+
+    async def async_request():
+        async with async_cursor() as cursor:
+            await cursor.execute(sql, [args.sleep])
+            await cursor.fetchall()
+
+    async def run(request):
+        latencies = []
+
+        async def timed():
+            start = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - start)
+
+        # warm up the pool first
+        await asyncio.gather(*[request() for _ in range(args.pool_size)])
+
+        start = time.perf_counter()
+        await asyncio.gather(*[timed() for _ in range(args.requests)])
+        return time.perf_counter() - start, latencies
+
+    async def bench():
+        print('%-14s %10s %10s %10s %10s' % ('path', 'req/s', 'p50 ms', 'p99 ms', 'max ms'))
+
+        for name, request in [('sync_to_async', sync_request), ('asyncio pool', async_request)]:
+            elapsed, latencies = await run(request)
+            print('%-14s %10.0f %10.1f %10.1f %10.1f' % (
+                name, args.requests / elapsed, percentile(latencies, 0.5) * 1000,
+                percentile(latencies, 0.99) * 1000, max(latencies) * 1000
+            ))
+
+        await get_async_pool().close()
+
+    asyncio.run(bench())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Checkout throughput of DBPoolWrapperMixin.get_new_connection under thread contention.
+
+Each thread owns its DatabaseWrapper (as Django does) and loops over checkout + checkin.
+`global-lock` emulates the former behaviour which took DBConnectionPool.lock on every
+checkout while looking the pool up(or building it), and released it before connect();
+`per-alias` is the current lock-free steady-state path.
+
+    $ python benchmarks/bench_checkout_contention.py [--checkouts 2000] [--aliases 4]
+"""
+
+import argparse
+import threading
+
+from common import make_stub_wrapper_class, run_threads
+
+THREADS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkouts', type=int, default=2000, help='checkouts per thread')
+    parser.add_argument('--aliases', type=int, default=4, help='number of database aliases')
+    args = parser.parse_args()
+
+    wrapper_class = make_stub_wrapper_class()
+
+    class GlobalLockPool:
+        """ The former lookup of the pools: under the global lock, the checkout itself is out of it """
+
+        def __init__(self, conn_pool):
+            self.conn_pool = conn_pool
+            self.global_lock = threading.Lock()
+
+        def __getattr__(self, name):
+            return getattr(self.conn_pool, name)
+
+        def get_or_create(self, pool_name, creator):
+            with self.global_lock:
+                if pool_name not in self.conn_pool:
+                    self.conn_pool.put(pool_name, creator())
+
+            return self.conn_pool.get(pool_name)
+
+    class GlobalLockWrapper(wrapper_class):
+        conn_pool = GlobalLockPool(wrapper_class.conn_pool)
+
+    def worker(cls, alias, pool_size, checkouts):
+        settings_dict = {'POOL_OPTIONS': {'POOL_SIZE': pool_size, 'MAX_OVERFLOW': 0, 'ECHO': False}}
+        wrapper = cls(settings_dict, alias=alias)
+
+        for _ in range(checkouts):
+            conn = wrapper.get_new_connection({})
+            conn.close()
+
+    print('%-8s %-12s %14s' % ('threads', 'mode', 'checkouts/s'))
+
+    for num_threads in THREADS:
+        for mode, cls in [('global-lock', GlobalLockWrapper), ('per-alias', wrapper_class)]:
+            # fresh aliases for every round, so the pools are built under contention too
+            aliases = ['%s-%s-%s' % (mode, num_threads, i) for i in range(args.aliases)]
+            counter = iter(range(num_threads))
+
+            def target():
+                alias = aliases[next(counter) % len(aliases)]
+                worker(cls, alias, num_threads, args.checkouts)
+
+            elapsed = run_threads(num_threads, target)
+            print('%-8d %-12s %14.0f' % (num_threads, mode, num_threads * args.checkouts / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Overhead of the pool hooks on checkout + checkin(single thread, stub driver).
+
+`disabled` has no subscriber(the default), `sampled-0.1%` and `sampled-100%` have one doing nothing.
+The cost of the disabled path itself(the lookup of the alias's hooks) is measured alone too,
+next to the mean duration of a checkout + checkin.
+
+    $ python benchmarks/bench_hooks_overhead.py [--checkouts 20000] [--repeat 5]
+"""
+
+import time
+import timeit
+import argparse
+
+from common import make_stub_wrapper_class
+
+
+def measure(wrapper, checkouts, repeat):
+    """ Best mean seconds per checkout + checkin over `repeat` rounds """
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        for _ in range(checkouts):
+            wrapper.connection = wrapper.get_new_connection({})
+            wrapper.close()
+
+        elapsed = (time.perf_counter() - start) / checkouts
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkouts', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    wrapper_class = make_stub_wrapper_class()
+
+    from database_pool.core.hooks import PoolHookRegistry
+
+    registry = PoolHookRegistry()
+    settings_dict = {'POOL_OPTIONS': {'POOL_SIZE': 4, 'ECHO': False}}
+
+    def noop(span):
+        pass
+
+    modes = [('disabled', None), ('sampled-0.1%', 0.001), ('sampled-100%', 1.0)]
+    results = {}
+
+    print('%-14s %14s %10s' % ('mode', 'us/checkout', 'vs disabled'))
+
+    for mode, sample_rate in modes:
+        alias = 'hooks-%s' % mode
+        wrapper = wrapper_class(settings_dict, alias=alias)
+
+        if sample_rate is not None:
+            registry.subscribe(alias, noop, sample_rate=sample_rate)
+
+        # build the pool and its first connection out of the measure
+        measure(wrapper, 100, 1)
+        results[mode] = measure(wrapper, args.checkouts, args.repeat)
+
+        print('%-14s %14.3f %+9.1f%%' % (mode, results[mode] * 1e6,
+                                         (results[mode] / results['disabled'] - 1) * 100))
+
+    # what the disabled path adds to a checkout: one dict lookup
+    wrapper = wrapper_class(settings_dict, alias='hooks-disabled')
+    number = 1000000
+    lookup = min(timeit.repeat('hooks = pool_hooks.get(alias); hooks is not None and hooks.sample()',
+                               globals={'pool_hooks': wrapper.pool_hooks, 'alias': wrapper.alias},
+                               number=number, repeat=args.repeat)) / number
+
+    print()
+    print('disabled path: %.1f ns per checkout, %.3f%% of a checkout + checkin'
+          % (lookup * 1e9, lookup / results['disabled'] * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+The native pool(POOL_OPTIONS['ENGINE'] = 'native', database_pool.core.pool) against SQLAlchemy's QueuePool:
+
+    import      seconds and memory to import a backend and build its pool, in a fresh interpreter
+                (the fake backend, no server needed)
+    checkout    checkout + checkin latency through DBPoolWrapperMixin, at 1 and 8 threads
+    query       overhead per cursor()/execute()/fetchone()/close() of the connection Django gets:
+                SQLAlchemy's _ConnectionFairy or the native pool's ConnectionProxy
+
+The DB-API driver of `checkout` and `query` is a stub, so that only the pool itself is measured.
+
+    $ python benchmarks/bench_native_pool.py [--checkouts 20000] [--queries 100000]
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from common import ROOT_DIR, make_stub_wrapper_class, percentile, run_threads
+
+ENGINES = ['sqlalchemy', 'native']
+
+IMPORT_SCRIPT = """
+import sys, time, json, resource, tempfile, os
+sys.path.insert(0, %(root)r)
+start = time.perf_counter()
+
+from django.conf import settings
+settings.configure(DATABASES={'default': {
+    'ENGINE': 'database_pool.backends.fake', 'NAME': os.path.join(tempfile.gettempdir(), 'bench_native.sqlite3'),
+    'POOL_OPTIONS': {'ENGINE': %(engine)r, 'ECHO': False},
+}})
+import logging
+logging.disable(logging.CRITICAL)
+
+import database_pool
+from django.db import connections
+connections['default'].ensure_connection()
+connections['default'].close()
+
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'sqlalchemy': 'sqlalchemy' in sys.modules,
+}))
+"""
+
+
+def bench_import(engine, rounds):
+    results = []
+
+    for _ in range(rounds):
+        process = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT % {'root': ROOT_DIR, 'engine': engine}],
+                                 capture_output=True, text=True, check=True)
+        results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    best = min(results, key=lambda result: result['seconds'])
+    return best
+
+
+def make_wrapper(wrapper_class, engine, alias, pool_size):
+    settings_dict = {'POOL_OPTIONS': {'ENGINE': engine, 'POOL_SIZE': pool_size, 'MAX_OVERFLOW': 0, 'ECHO': False,
+                                      'PRE_PING_IDLE': 60}}
+    return wrapper_class(settings_dict, alias=alias)
+
+
+def bench_checkout(wrapper_class, engine, num_threads, checkouts):
+    latencies = []
+
+    def worker():
+        wrapper = make_wrapper(wrapper_class, engine, 'checkout-%s-%s' % (engine, num_threads), num_threads)
+        local = []
+
+        for _ in range(checkouts):
+            start = time.perf_counter()
+            wrapper.connection = wrapper.get_new_connection({})
+            wrapper.close()
+            local.append(time.perf_counter() - start)
+
+        latencies.extend(local)
+
+    elapsed = run_threads(num_threads, worker)
+    return num_threads * checkouts / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def bench_query(wrapper_class, engine, queries):
+    wrapper = make_wrapper(wrapper_class, engine, 'query-%s' % engine, 1)
+    wrapper.connection = wrapper.get_new_connection({})
+    connection = wrapper.connection
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        cursor = connection.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        cursor.close()
+    elapsed = time.perf_counter() - start
+
+    wrapper.close()
+    return elapsed / queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkouts', type=int, default=20000, help='checkouts per thread')
+    parser.add_argument('--queries', type=int, default=100000)
+    parser.add_argument('--import-rounds', type=int, default=5, help='fresh interpreters, the best one is kept')
+    args = parser.parse_args()
+
+    print('%-12s %12s %12s %10s %12s' % ('import', 'ms', 'maxrss MB', 'modules', 'sqlalchemy'))
+    for engine in ENGINES:
+        result = bench_import(engine, args.import_rounds)
+        print('%-12s %12.1f %12.1f %10d %12s' % (
+            engine, result['seconds'] * 1000, result['maxrss_kb'] / 1024, result['modules'], result['sqlalchemy'],
+        ))
+
+    wrapper_class = make_stub_wrapper_class()
+
+    print('\n%-12s %8s %14s %10s %10s' % ('checkout', 'threads', 'checkouts/s', 'p50 us', 'p99 us'))
+    for num_threads in [1, 8]:
+        for engine in ENGINES:
+            rate, p50, p99 = bench_checkout(wrapper_class, engine, num_threads, args.checkouts)
+            print('%-12s %8d %14.0f %10.1f %10.1f' % (engine, num_threads, rate, p50 * 1e6, p99 * 1e6))
+
+    print('\n%-12s %14s' % ('query', 'ns/query'))
+    for engine in ENGINES:
+        print('%-12s %14.0f' % (engine, bench_query(wrapper_class, engine, args.queries) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+The pools of the Oracle wrapper(database_pool.backends.oracle.wrapper) by driver and mode:
+
+    cx_Oracle           cx_Oracle's SessionPool(Oracle Client libraries)
+    oracledb-thick      python-oracledb's pool in thick mode(Oracle Client libraries)
+    oracledb-thin       python-oracledb's pool in thin mode(pure Python, no client libraries)
+    oracledb-drcp       thin mode, sessions of the Database Resident Connection Pooling's pooled servers
+
+    startup     seconds from the interpreter start to the first query(imports, pool, first session)
+                and the memory of the process
+    requests    acquire + a query + release through the wrapper, `--threads` threads sharing the pool
+
+No reference numbers come with it: the paths are only comparable when measured on the same server and host.
+
+Every path runs in its own interpreter. Needs a local Oracle Free server, configured by
+BENCH_ORA_NAME(Easy Connect: host:port/service_name)/USER/PASSWORD, the thick paths need the Oracle Client
+libraries(BENCH_ORA_LIB_DIR if they aren't found by the system loader), the DRCP path a started pool:
+
+    $ docker run -d -p 1521:1521 -e ORACLE_PASSWORD=oracle gvenzl/oracle-free:slim
+    $ docker exec -i <container> sqlplus -s / as sysdba <<< "EXECUTE DBMS_CONNECTION_POOL.START_POOL();"
+    $ python benchmarks/bench_oracle_pool.py [--requests 5000] [--threads 8]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+from common import configure_django, oracle_from_env, percentile
+
+PATHS = {
+    # path -> driver imported first, EXTRAS of the path
+    'cx_Oracle': ('cx_Oracle', {}),
+    'oracledb-thick': ('oracledb', {'thick': True, 'lib_dir': os.environ.get('BENCH_ORA_LIB_DIR', '')}),
+    'oracledb-thin': ('oracledb', {}),
+    'oracledb-drcp': ('oracledb', {'drcp': True, 'cclass': 'BENCH', 'purity': 'self'}),
+}
+
+
+def run_worker(path, args, started):
+    """ :return: the results of one path, in this interpreter """
+    driver, extras = PATHS[path]
+    # the wrapper falls back to cx_Oracle when the project imported it
+    __import__(driver)
+
+    extras = dict(extras, min=args.threads, max=args.threads, increment=1, threaded=True, ping_interval=60)
+    configure_django({'default': oracle_from_env(EXTRAS=extras)})
+
+    import django
+    django.setup()
+
+    from django.db import connections
+    from database_pool.backends.oracle.wrapper import DatabaseWrapper
+
+    def run_request(wrapper):
+        try:
+            cursor = wrapper._cursor()
+            cursor.execute('SELECT 1 FROM DUAL')
+            cursor.fetchone()
+        finally:
+            wrapper.close()
+
+    settings_dict = connections.settings['default']
+    run_request(DatabaseWrapper(settings_dict, alias='default'))
+    startup = time.time() - started
+
+    import resource
+    maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    per_thread = args.requests // args.threads
+    latencies = []
+    barrier = threading.Barrier(args.threads + 1)
+
+    def worker():
+        # a wrapper per thread as Django has, they share the pool of the alias
+        wrapper = DatabaseWrapper(settings_dict, alias='default')
+        barrier.wait()
+
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            run_request(wrapper)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'startup_ms': startup * 1000,
+        'maxrss_mb': maxrss_kb / 1024,
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=list(PATHS))
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--started', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args, args.started)))
+        return
+
+    options = ['--requests', str(args.requests), '--threads', str(args.threads)]
+    print('%-16s %12s %12s %10s %10s %10s' % ('path', 'startup ms', 'maxrss MB', 'req/s', 'p50 ms', 'p99 ms'))
+
+    for path in args.paths:
+        process = subprocess.run([sys.executable, __file__, '--worker', path, '--started', repr(time.time())] + options,
+                                 capture_output=True, text=True)
+
+        if process.returncode != 0:
+            error = (process.stderr.strip().splitlines() or ['failed'])[-1].strip()
+            print('%-16s skipped: %s' % (path, error))
+            continue
+
+        results = json.loads(process.stdout.strip().splitlines()[-1])
+        print('%-16s %12.0f %12.1f %10.0f %10.2f %10.2f' % (
+            path, results['startup_ms'], results['maxrss_mb'], results['requests_per_second'],
+            results['p50_ms'], results['p99_ms'],
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+The compiled query cache of the Oracle wrapper's FormatStylePlaceholderCursor(EXTRAS['query_cache_size']):
+nanoseconds spent by the cursor's execute() before the driver's, with and without the cache, on statements
+shaped like the ORM's.
+
+The driver's cursor is a stub, only python-oracledb or cx_Oracle has to be installed(no server needed):
+
+    $ python benchmarks/bench_oracle_query_cache.py [--executions 200000] [--statements 300]
+"""
+
+import time
+import random
+import decimal
+import datetime
+import argparse
+
+from common import configure_django
+
+SHAPES = [
+    # (sql, parameters)
+    ('SELECT "APP_ITEM"."ID", "APP_ITEM"."NAME", "APP_ITEM"."PRICE" FROM "APP_ITEM" WHERE "APP_ITEM"."ID" = %s',
+     lambda rand: [rand.randint(1, 10 ** 6)]),
+    ('SELECT "APP_ITEM"."ID", "APP_ITEM"."NAME" FROM "APP_ITEM" WHERE ("APP_ITEM"."NAME" LIKEC %s ESCAPE \'\\\' '
+     'AND "APP_ITEM"."CREATED" >= %s) ORDER BY "APP_ITEM"."CREATED" DESC FETCH FIRST 20 ROWS ONLY',
+     lambda rand: ['%%item %d%%' % rand.randint(1, 100), datetime.datetime(2024, 1, rand.randint(1, 28))]),
+    ('UPDATE "APP_ITEM" SET "NAME" = %s, "PRICE" = %s, "ACTIVE" = %s, "UPDATED" = %s WHERE "APP_ITEM"."ID" = %s',
+     lambda rand: ['item %d' % rand.randint(1, 10 ** 6), decimal.Decimal('%d.99' % rand.randint(1, 99)),
+                   rand.random() > 0.5, datetime.datetime(2024, 1, 1, 12), rand.randint(1, 10 ** 6)]),
+]
+
+
+class StubCursor:
+    arraysize = 1
+    outputtypehandler = None
+
+    def setinputsizes(self, *args, **kwargs):
+        pass
+
+    def execute(self, sql, params=None):
+        pass
+
+
+class StubConnection:
+    def cursor(self):
+        return StubCursor()
+
+
+def make_workload(statements, executions):
+    """ `statements` distinct statements(the table name varies), run in a Zipf-like order """
+    rand = random.Random(1)
+    sqls = [(sql.replace('APP_ITEM', 'APP_ITEM%d' % i), params)
+            for i in range(statements // len(SHAPES) + 1) for sql, params in SHAPES][:statements]
+    weights = [1.0 / (rank + 1) for rank in range(len(sqls))]
+
+    return [(sql, params(rand)) for sql, params in rand.choices(sqls, weights, k=executions)]
+
+
+def bench(cursor, workload):
+    start = time.perf_counter()
+
+    for sql, params in workload:
+        cursor.execute(sql, params)
+
+    return (time.perf_counter() - start) / len(workload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--executions', type=int, default=200000)
+    parser.add_argument('--statements', type=int, default=300, help='distinct statements of the workload')
+    parser.add_argument('--size', type=int, default=500, help='EXTRAS[\'query_cache_size\']')
+    args = parser.parse_args()
+
+    configure_django()
+    from database_pool.backends.oracle.wrapper import FormatStylePlaceholderCursor, CompiledQueryCache
+
+    workload = make_workload(args.statements, args.executions)
+
+    print('%-12s %12s %10s %12s' % ('cache', 'ns/execute', 'hit rate', 'statements'))
+    for size in [0, args.size]:
+        query_cache = CompiledQueryCache(size) if size else None
+        cursor = FormatStylePlaceholderCursor(StubConnection(), None, query_cache)
+        seconds = bench(cursor, workload)
+
+        if query_cache is None:
+            print('%-12s %12.0f %10s %12s' % ('off', seconds * 1e9, '-', '-'))
+        else:
+            stats = query_cache.stats()
+            print('%-12s %12.0f %10.3f %12d' % (
+                size, seconds * 1e9, stats['hits'] / float(stats['hits'] + stats['misses']), stats['size'],
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Round-trips per request of the liveness check at checkout, for each backend's SQLAlchemy dialect.
+
+`always` pings every connection checked out(the former behaviour, PRE_PING_IDLE = 0),
+`adaptive` only pings the connections idle for more than PRE_PING_IDLE seconds or whose last use
+ended in an error. The traffic alternates bursts of back-to-back requests and quiet periods longer
+than PRE_PING_IDLE, a share of the requests end in a database error.
+The DB-API driver is a stub counting the statements and pings it receives.
+
+    $ python benchmarks/bench_pre_ping.py [--requests 2000] [--queries 3] [--burst 200] [--errors 0.01]
+"""
+
+import time
+import random
+import argparse
+
+from common import StubDBAPI, make_stub_wrapper_class
+
+# statements and pings received by the stub driver
+ROUND_TRIPS = {'statements': 0, 'pings': 0}
+
+
+class CountingDBAPI(StubDBAPI):
+    class Cursor(StubDBAPI.Cursor):
+        def execute(self, sql, params=None):
+            ROUND_TRIPS['statements'] += 1
+
+    class Connection(StubDBAPI.Connection):
+        autocommit = True
+        closed = False
+
+        def cursor(self):
+            return CountingDBAPI.Cursor()
+
+        def ping(self, reconnect=None):
+            ROUND_TRIPS['pings'] += 1
+
+    @classmethod
+    def connect(cls, **kwargs):
+        return cls.Connection()
+
+
+def get_dialects():
+    from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+    from sqlalchemy.dialects.mysql.pymysql import MySQLDialect_pymysql
+    from sqlalchemy.dialects.oracle.cx_oracle import OracleDialect_cx_oracle
+
+    return [('postgresql', PGDialect_psycopg2), ('mysql', MySQLDialect_pymysql), ('oracle', OracleDialect_cx_oracle)]
+
+
+def make_wrapper_class(dialect_class):
+    base_class = make_stub_wrapper_class()
+
+    class Wrapper(base_class):
+        Database = CountingDBAPI
+
+        def _get_dialect(self):
+            # the real drivers aren't needed, only the dialect's do_ping() is
+            dialect = dialect_class()
+            dialect.dbapi = CountingDBAPI
+            return dialect
+
+    return Wrapper
+
+
+def run(wrapper_class, alias, args, pre_ping_idle):
+    settings_dict = {'POOL_OPTIONS': {'POOL_SIZE': 4, 'ECHO': False, 'PRE_PING_IDLE': pre_ping_idle}}
+    wrapper = wrapper_class(settings_dict, alias=alias)
+    rand = random.Random(42)
+
+    ROUND_TRIPS.update(statements=0, pings=0)
+
+    for i in range(args.requests):
+        if i and i % args.burst == 0:
+            # quiet period, the idle connections should be checked again
+            time.sleep(args.idle * 1.5)
+
+        wrapper.connection = wrapper.get_new_connection({})
+
+        for _ in range(args.queries):
+            wrapper.connection.cursor().execute('SELECT 1')
+
+        wrapper.errors_occurred = rand.random() < args.errors
+        wrapper.close()
+
+    return ROUND_TRIPS['statements'] - args.requests * args.queries + ROUND_TRIPS['pings']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=3, help='queries per request')
+    parser.add_argument('--burst', type=int, default=200, help='requests between two quiet periods')
+    parser.add_argument('--idle', type=float, default=0.05, help='PRE_PING_IDLE of the adaptive mode(seconds)')
+    parser.add_argument('--errors', type=float, default=0.01, help='share of the requests ending in an error')
+    args = parser.parse_args()
+
+    print('%-12s %-10s %10s %16s %16s' % ('backend', 'mode', 'pings', 'pings/request', 'round-trips/req'))
+
+    for vendor, dialect_class in get_dialects():
+        wrapper_class = make_wrapper_class(dialect_class)
+
+        for mode, pre_ping_idle in [('always', 0), ('adaptive', args.idle)]:
+            pings = run(wrapper_class, '%s-%s' % (vendor, mode), args, pre_ping_idle)
+            print('%-12s %-10s %10d %16.3f %16.3f' % (
+                vendor, mode, pings, pings / args.requests, args.queries + pings / args.requests,
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+The same workload against PostgreSQL through the psycopg2 pooled backend(database_pool.backends.postgresql)
+and the psycopg 3 one(database_pool.backends.psycopg): text format, binary format, and binary format with
+the writes of a request sent in a pipeline.
+
+A request runs `--writes` UPDATEs(results not read) and a SELECT of `--rows` rows(int, jsonb, timestamptz),
+`--threads` threads share a pool. Every path runs in its own interpreter: with psycopg 3 installed Django 4.2+
+picks it, the psycopg2 path hides it from Django. The psycopg 3 paths need Django 4.2+ and psycopg_pool.
+
+Needs a local server, configured by BENCH_PG_HOST/PORT/NAME/USER/PASSWORD:
+
+    $ docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:15
+    $ python benchmarks/bench_psycopg.py [--requests 2000] [--threads 8] [--writes 5] [--rows 50]
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+from common import configure_django, postgresql_from_env, percentile
+
+PATHS = {
+    # path -> ENGINE, POOL_OPTIONS, whether the writes are sent in a pipeline
+    'psycopg2': ('database_pool.backends.postgresql', {}, False),
+    'psycopg': ('database_pool.backends.psycopg', {}, False),
+    'psycopg-binary': ('database_pool.backends.psycopg', {'BINARY': True}, False),
+    'psycopg-pipeline': ('database_pool.backends.psycopg', {'BINARY': True}, True),
+}
+
+TABLE = 'dbpool_bench_item'
+
+
+def create_table(connection, rows):
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS %s" % TABLE)
+        cursor.execute("CREATE TABLE %s (id integer PRIMARY KEY, position integer, payload jsonb, "
+                       "updated timestamptz)" % TABLE)
+        cursor.execute("INSERT INTO %s SELECT i, i, jsonb_build_object('name', 'item ' || i), now() "
+                       "FROM generate_series(1, %%s) AS i" % TABLE, [rows])
+
+
+def run_request(connection, args, pipeline, rand_ids):
+    from contextlib import nullcontext
+
+    with connection.cursor() as cursor:
+        with connection.pipeline() if pipeline else nullcontext():
+            for pk in rand_ids:
+                cursor.execute("UPDATE %s SET position = position + 1, updated = now() WHERE id = %%s" % TABLE, [pk])
+
+        cursor.execute("SELECT id, position, payload, updated FROM %s ORDER BY id LIMIT %%s" % TABLE, [args.rows])
+        cursor.fetchall()
+
+
+def run_worker(path, args):
+    """ :return: the results of one path, in this interpreter """
+    engine, pool_options, pipeline = PATHS[path]
+
+    if path == 'psycopg2':
+        # Django 4.2+ prefers psycopg 3 when both drivers are installed
+        sys.modules['psycopg'] = None
+
+    pool_options = dict(pool_options, POOL_SIZE=args.threads, MAX_OVERFLOW=0, TIMEOUT=60, ECHO=False)
+    configure_django({'default': postgresql_from_env(ENGINE=engine, POOL_OPTIONS=pool_options)})
+
+    import django
+    django.setup()
+
+    import random
+    import database_pool  # noqa: F401, rewrites the engines
+    from django.db import connection
+
+    create_table(connection, args.rows)
+    connection.close()
+
+    per_thread = args.requests // args.threads
+    latencies = []
+    barrier = threading.Barrier(args.threads + 1)
+
+    def worker(index):
+        rand = random.Random(index)
+        barrier.wait()
+
+        for _ in range(per_thread):
+            ids = [rand.randint(1, args.rows) for _ in range(args.writes)]
+            start = time.perf_counter()
+
+            try:
+                run_request(connection, args, pipeline, ids)
+            finally:
+                connection.close()
+
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=5, help='UPDATEs per request')
+    parser.add_argument('--rows', type=int, default=50, help='rows read per request')
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=list(PATHS))
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args)))
+        return
+
+    options = ['--requests', str(args.requests), '--threads', str(args.threads), '--writes', str(args.writes),
+               '--rows', str(args.rows)]
+    print('%-18s %10s %10s %10s' % ('path', 'req/s', 'p50 ms', 'p99 ms'))
+
+    for path in args.paths:
+        process = subprocess.run([sys.executable, __file__, '--worker', path] + options,
+                                 capture_output=True, text=True)
+
+        if process.returncode != 0:
+            error = (process.stderr.strip().splitlines() or ['failed'])[-1].strip()
+            print('%-18s skipped: %s' % (path, error))
+            continue
+
+        results = json.loads(process.stdout.strip().splitlines()[-1])
+        print('%-18s %10.0f %10.2f %10.2f' % (
+            path, results['requests_per_second'], results['p50_ms'], results['p99_ms'],
+        ))
+
+
+if __name__ == '__main__':
+    main()
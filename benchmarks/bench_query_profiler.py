@@ -0,0 +1,96 @@
+"""
+Overhead of database_pool.middleware.QueryProfilerMiddleware per request(single thread): a view checking a
+connection out of the fake backend's native pool, running `--queries` queries and giving it back.
+
+`off` has no middleware, `sampled-1%` and `sampled-100%` profile a share of the requests(SAMPLE_RATE);
+the log line is disabled, the Server-Timing header is set.
+
+    $ python benchmarks/bench_query_profiler.py [--requests 5000] [--queries 10] [--repeat 5]
+"""
+
+import time
+import logging
+import argparse
+
+from common import configure_django
+
+
+def measure(handler, make_request, requests, repeat):
+    """ Best mean seconds per request over `repeat` rounds """
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        for _ in range(requests):
+            handler(make_request())
+
+        elapsed = (time.perf_counter() - start) / requests
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=10, help='queries per request')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    configure_django({'default': {
+        'ENGINE': 'database_pool.backends.fake', 'NAME': ':memory:',
+        'POOL_OPTIONS': {'ENGINE': 'native', 'ECHO': False},
+    }}, ALLOWED_HOSTS=['*'])
+
+    import django
+    django.setup()
+    logging.disable(logging.CRITICAL)
+
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from database_pool import middleware
+
+    def view(request):
+        with connection.cursor() as cursor:
+            for i in range(args.queries):
+                cursor.execute('SELECT %s', [i])
+                cursor.fetchone()
+
+        # as request_finished does
+        connection.close()
+        return HttpResponse()
+
+    factory = RequestFactory()
+
+    def make_request():
+        return factory.get('/items/')
+
+    modes = [('off', None), ('sampled-1%', 0.01), ('sampled-100%', 1.0)]
+    handlers = {}
+
+    for mode, sample_rate in modes:
+        if sample_rate is None:
+            handlers[mode] = view
+        else:
+            handlers[mode] = middleware.QueryProfilerMiddleware(view)
+            handlers[mode].sample_rate = sample_rate
+
+        # build the pool and its first connection out of the measure
+        measure(handlers[mode], make_request, 1000, 1)
+
+    # the modes take turns in every round, so that the noise of the machine is shared
+    results = {}
+    for _ in range(args.repeat):
+        for mode, _ in modes:
+            elapsed = measure(handlers[mode], make_request, args.requests, 1)
+            results[mode] = min(results.get(mode, elapsed), elapsed)
+
+    print('%-14s %14s %10s' % ('mode', 'us/request', 'vs off'))
+    for mode, _ in modes:
+        print('%-14s %14.2f %+9.1f%%' % (mode, results[mode] * 1e6, (results[mode] / results['off'] - 1) * 100))
+
+
+if __name__ == '__main__':
+    main()
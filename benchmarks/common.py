@@ -0,0 +1,157 @@
+"""
+Helpers shared by the benchmark scripts, they are not a part of the package.
+
+Run a benchmark from the root of the repository, eg:
+    $ python benchmarks/bench_checkout_contention.py
+"""
+
+import os
+import sys
+import time
+import threading
+import contextlib
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+class StubDBAPI:
+    """ A do-nothing DB-API 2.0 module, so that only the pool itself is measured """
+    paramstyle = 'format'
+    apilevel = '2.0'
+    threadsafety = 1
+
+    class Error(Exception):
+        pass
+
+    class Cursor:
+        rowcount = -1
+        description = None
+
+        def execute(self, sql, params=None):
+            pass
+
+        def fetchone(self):
+            return 1,
+
+        def close(self):
+            pass
+
+    class Connection:
+        def cursor(self):
+            return StubDBAPI.Cursor()
+
+        def rollback(self):
+            pass
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    @classmethod
+    def connect(cls, **kwargs):
+        return cls.Connection()
+
+
+def configure_django(databases=None, **options):
+    """ Minimal settings, `database_pool` reads settings.DATABASES when it is imported """
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(DATABASES=databases or {}, USE_TZ=True, **options)
+
+
+def database_from_env(engine, prefix, defaults):
+    """
+    DATABASES entry of a locally started server, eg: BENCH_PG_HOST, BENCH_PG_PORT, BENCH_PG_NAME,
+    BENCH_PG_USER, BENCH_PG_PASSWORD for prefix 'BENCH_PG'
+    """
+    database = {'ENGINE': engine}
+
+    for key, default in defaults.items():
+        database[key] = os.environ.get('%s_%s' % (prefix, key), default)
+
+    return database
+
+
+def postgresql_from_env(**extra):
+    return dict(database_from_env('database_pool.backends.postgresql', 'BENCH_PG', {
+        'HOST': '127.0.0.1', 'PORT': '5432', 'NAME': 'postgres', 'USER': 'postgres', 'PASSWORD': 'postgres',
+    }), **extra)
+
+
+def oracle_from_env(**extra):
+    # NAME is an Easy Connect string(host:port/service_name) when PORT is empty, as the Oracle Free images need
+    return dict(database_from_env('django.db.backends.oracle', 'BENCH_ORA', {
+        'HOST': '', 'PORT': '', 'NAME': '127.0.0.1:1521/FREEPDB1', 'USER': 'system', 'PASSWORD': 'oracle',
+    }), **extra)
+
+
+def percentile(values, q):
+    """ Nearest-rank percentile of a list of numbers """
+    if not values:
+        return None
+
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def make_stub_wrapper_class():
+    """ A DatabaseWrapper built on DBPoolWrapperMixin whose django part is a stub """
+    configure_django()
+
+    from sqlalchemy.engine.default import DefaultDialect
+    from database_pool.core.mixins import DBPoolWrapperMixin
+
+    class StubDjangoWrapper:
+        vendor = 'stub'
+        Database = StubDBAPI
+        errors_occurred = False
+        wrap_database_errors = contextlib.nullcontext()
+
+        def __init__(self, settings_dict, alias='default'):
+            self.alias = alias
+            self.settings_dict = settings_dict
+            self.connection = None
+
+        def get_new_connection(self, conn_params):
+            return self.Database.connect(**conn_params)
+
+        def _close(self):
+            self.connection.close()
+
+        def close(self):
+            if self.connection is not None:
+                self._close()
+                self.connection = None
+
+    class StubDatabaseWrapper(DBPoolWrapperMixin, StubDjangoWrapper):
+        class SQLAlchemyDialect(DefaultDialect):
+            pass
+
+    return StubDatabaseWrapper
+
+
+def run_threads(num_threads, target, *args):
+    """ Start `num_threads` threads running target(*args) at the same moment, return the elapsed seconds """
+    barrier = threading.Barrier(num_threads + 1)
+
+    def runner():
+        barrier.wait()
+        target(*args)
+
+    threads = [threading.Thread(target=runner) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    return time.perf_counter() - start
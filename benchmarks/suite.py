@@ -0,0 +1,407 @@
+"""
+Benchmark suite of the pooled backends against stock Django.
+
+For one backend, every mode runs in its own interpreter(Django is set up once per process):
+    pooled              database_pool's engine, CONN_MAX_AGE = 0(the connection goes back to the pool)
+    django-no-persist   stock engine, CONN_MAX_AGE = 0(a new connection per request)
+    django-persistent   stock engine, CONN_MAX_AGE = None(one connection per thread, never closed)
+
+and measures:
+    threads     requests/s and queries/s at 1, 8 and 64 threads, checkout and request latency percentiles
+    processes   requests/s of several forked processes, each one running several threads
+    churn       connect + close latency(a physical connection for stock Django, a checkout for the pool)
+
+A request is run as Django does: close_old_connections(), the queries, close_old_connections().
+The results are stored as JSON(benchmarks/results/ by default), a former result can be compared:
+
+    $ BENCH_PG_HOST=127.0.0.1 python benchmarks/suite.py --backend postgresql
+    $ python benchmarks/suite.py --backend mysql --compare benchmarks/results/mysql-20240101-120000.json
+
+The servers are configured by BENCH_PG_*, BENCH_MYSQL_* and BENCH_ORACLE_* (HOST, PORT, NAME, USER, PASSWORD).
+The `fake` backend needs no server: stock Django's sqlite3 against database_pool's fake engine(sqlite3 too,
+no latency injected) on a temporary file(BENCH_FAKE_NAME), that is the overhead of the pool itself.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+from common import ROOT_DIR, database_from_env, percentile
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# backend -> stock engine, pooled engine, prefix of the environment variables, defaults
+BACKENDS = {
+    'postgresql': {
+        'stock': 'django.db.backends.postgresql',
+        'pooled': 'database_pool.backends.postgresql',
+        'env': 'BENCH_PG',
+        'defaults': {'HOST': '127.0.0.1', 'PORT': '5432', 'NAME': 'postgres', 'USER': 'postgres',
+                     'PASSWORD': 'postgres'},
+        'query': 'SELECT 1',
+    },
+    'mysql': {
+        'stock': 'django.db.backends.mysql',
+        'pooled': 'database_pool.backends.mysql',
+        'env': 'BENCH_MYSQL',
+        'defaults': {'HOST': '127.0.0.1', 'PORT': '3306', 'NAME': 'mysql', 'USER': 'root', 'PASSWORD': 'root'},
+        'query': 'SELECT 1',
+    },
+    'oracle': {
+        'stock': 'django.db.backends.oracle',
+        'pooled': 'database_pool.backends.oracle',
+        'env': 'BENCH_ORACLE',
+        'defaults': {'HOST': '127.0.0.1', 'PORT': '1521', 'NAME': 'XEPDB1', 'USER': 'system', 'PASSWORD': 'oracle'},
+        'query': 'SELECT 1 FROM DUAL',
+    },
+    'fake': {
+        'stock': 'django.db.backends.sqlite3',
+        'pooled': 'database_pool.backends.fake',
+        'env': 'BENCH_FAKE',
+        # a file: CONN_MAX_AGE = 0 doesn't close an in-memory sqlite3 database
+        'defaults': {'NAME': os.path.join(tempfile.gettempdir(), 'database_pool_bench.sqlite3')},
+        'query': 'SELECT 1',
+    },
+}
+
+MODES = ['pooled', 'django-no-persist', 'django-persistent']
+THREADS = [1, 8, 64]
+
+# metrics compared between two results: path in a mode's results -> True if higher is better
+COMPARED_METRICS = {
+    ('threads', str(num_threads), metric): higher
+    for num_threads in THREADS
+    for metric, higher in [('requests_per_second', True), ('checkout_p99_ms', False), ('request_p99_ms', False)]
+}
+COMPARED_METRICS.update({
+    ('processes', 'requests_per_second'): True,
+    ('churn', 'p50_ms'): False,
+    ('churn', 'p99_ms'): False,
+})
+
+
+def get_database(backend, mode, pool_size):
+    """ DATABASES['default'] of a mode """
+    spec = BACKENDS[backend]
+    database = database_from_env(spec['pooled'] if mode == 'pooled' else spec['stock'], spec['env'],
+                                 spec['defaults'])
+
+    if mode == 'django-persistent':
+        database['CONN_MAX_AGE'] = None
+    else:
+        database['CONN_MAX_AGE'] = 0
+
+    if mode == 'pooled':
+        database['POOL_OPTIONS'] = {'POOL_SIZE': pool_size, 'MAX_OVERFLOW': max(THREADS), 'ECHO': False,
+                                    'TIMEOUT': 60}
+
+    return database
+
+
+def ms_percentiles(values, prefix=''):
+    return {
+        '%sp50_ms' % prefix: percentile(values, 0.50) * 1000,
+        '%sp95_ms' % prefix: percentile(values, 0.95) * 1000,
+        '%sp99_ms' % prefix: percentile(values, 0.99) * 1000,
+    }
+
+
+def run_request(sql, queries):
+    """ One request, as Django's handlers do it. :return: (checkout seconds, request seconds) """
+    from django.db import connection, close_old_connections
+
+    start = time.perf_counter()
+    close_old_connections()
+
+    connection.ensure_connection()
+    checked_out = time.perf_counter()
+
+    with connection.cursor() as cursor:
+        for _ in range(queries):
+            cursor.execute(sql)
+            cursor.fetchall()
+
+    close_old_connections()
+    return checked_out - start, time.perf_counter() - start
+
+
+def run_threads(num_threads, duration, sql, queries):
+    """ Requests in a loop by `num_threads` threads for `duration` seconds """
+    barrier = threading.Barrier(num_threads + 1)
+    deadline = [None]
+    samples = [[] for _ in range(num_threads)]
+
+    def worker(index):
+        from django.db import connection
+
+        barrier.wait()
+        timings = samples[index]
+
+        try:
+            while time.perf_counter() < deadline[0]:
+                timings.append(run_request(sql, queries))
+        finally:
+            # the persistent connections too
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(num_threads)]
+    for thread in threads:
+        thread.start()
+
+    deadline[0] = time.perf_counter() + duration
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    timings = [timing for thread_samples in samples for timing in thread_samples]
+
+    result = {
+        'requests': len(timings),
+        'requests_per_second': len(timings) / elapsed,
+        'queries_per_second': len(timings) * queries / elapsed,
+    }
+    result.update(ms_percentiles([checkout for checkout, _ in timings], 'checkout_'))
+    result.update(ms_percentiles([request for _, request in timings], 'request_'))
+    return result
+
+
+def _process_worker(num_threads, duration, sql, queries, results):
+    results.put(run_threads(num_threads, duration, sql, queries)['requests'])
+
+
+def run_processes(num_processes, num_threads, duration, sql, queries):
+    """ `num_processes` forked processes running `num_threads` threads each """
+    from django.db import connections
+
+    # nothing opened by this process must be shared with the children
+    connections.close_all()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=_process_worker, args=(num_threads, duration, sql, queries, results))
+                 for _ in range(num_processes)]
+
+    for process in processes:
+        process.start()
+
+    requests = sum(results.get() for _ in processes)
+
+    for process in processes:
+        process.join()
+
+    return {
+        'processes': num_processes,
+        'threads_per_process': num_threads,
+        'requests': requests,
+        'requests_per_second': requests / duration,
+    }
+
+
+def run_churn(count):
+    """ connect() + close() of the thread's connection """
+    from django.db import connection
+
+    # a first connection out of the measure, the pool is built
+    connection.connect()
+    connection.close()
+
+    timings = []
+
+    for _ in range(count):
+        start = time.perf_counter()
+        connection.connect()
+        connection.close()
+        timings.append(time.perf_counter() - start)
+
+    result = {'count': count, 'mean_ms': sum(timings) / count * 1000}
+    result.update(ms_percentiles(timings))
+    return result
+
+
+def run_mode(spec):
+    """ Run in a fresh interpreter(--worker): all scenarios of one mode """
+    sys.path.insert(0, ROOT_DIR)
+
+    from django.conf import settings
+
+    settings.configure(DATABASES={}, USE_TZ=True, INSTALLED_APPS=[])
+
+    if spec['mode'] == 'pooled':
+        # database_pool must be imported before DATABASES is set: its setup() checks every alias
+        import database_pool  # noqa
+
+    settings.DATABASES['default'] = spec['database']
+
+    import django
+    django.setup()
+
+    sql, queries, duration = spec['query'], spec['queries'], spec['duration']
+    results = {'threads': {}}
+
+    for num_threads in spec['threads']:
+        results['threads'][str(num_threads)] = run_threads(num_threads, duration, sql, queries)
+
+    if spec['processes']:
+        results['processes'] = run_processes(spec['processes'], spec['process_threads'], duration, sql, queries)
+
+    results['churn'] = run_churn(spec['churn'])
+    return results
+
+
+def get_metadata(args):
+    import django
+    import sqlalchemy
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        'backend': args.backend,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'host': socket.gethostname(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'django': django.get_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'arguments': vars(args),
+    }
+
+
+def compare(previous, current, tolerance):
+    """ Print the relative changes of the compared metrics, :return: number of regressions """
+    regressions = 0
+    print('\n%-20s %-36s %12s %12s %9s' % ('mode', 'metric', 'previous', 'current', 'change'))
+
+    for mode, results in current['results'].items():
+        for path, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous['results'].get(mode), results
+
+            for key in path:
+                before = before.get(key) if isinstance(before, dict) else None
+                after = after.get(key) if isinstance(after, dict) else None
+
+            if not before or after is None:
+                continue
+
+            change = (after - before) / before
+            regression = -change if higher_is_better else change
+            flag = ' REGRESSION' if regression > tolerance else ''
+            regressions += bool(flag)
+
+            print('%-20s %-36s %12.3f %12.3f %+8.1f%%%s' % (mode, '.'.join(path), before, after, change * 100, flag))
+
+    return regressions
+
+
+def print_results(results):
+    print('%-20s %8s %12s %12s %12s %12s' % ('mode', 'threads', 'req/s', 'queries/s', 'checkout p99', 'request p99'))
+
+    for mode, mode_results in results.items():
+        for num_threads, result in mode_results['threads'].items():
+            print('%-20s %8s %12.0f %12.0f %10.3fms %10.3fms' % (
+                mode, num_threads, result['requests_per_second'], result['queries_per_second'],
+                result['checkout_p99_ms'], result['request_p99_ms']))
+
+        if 'processes' in mode_results:
+            result = mode_results['processes']
+            print('%-20s %8s %12.0f' % (mode, '%dx%d' % (result['processes'], result['threads_per_process']),
+                                        result['requests_per_second']))
+
+        churn = mode_results['churn']
+        print('%-20s %8s %12s   connect+close p50 %.3fms p99 %.3fms' % (mode, 'churn', '', churn['p50_ms'],
+                                                                        churn['p99_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='postgresql')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--threads', type=int, nargs='+', default=THREADS)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per measure')
+    parser.add_argument('--queries', type=int, default=3, help='queries per request')
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=4, help='forked processes, 0 to skip')
+    parser.add_argument('--process-threads', type=int, default=8, help='threads per forked process')
+    parser.add_argument('--churn', type=int, default=200, help='connect + close measured')
+    parser.add_argument('--output', help='JSON file of the results, default: benchmarks/results/<backend>-<date>.json')
+    parser.add_argument('--compare', help='JSON file of a former run')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative change flagged as a regression')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.worker) as fp:
+            spec = json.load(fp)
+
+        results = run_mode(spec)
+
+        with open(args.worker, 'w') as fp:
+            json.dump(results, fp)
+        return
+
+    results = {}
+
+    for mode in args.modes:
+        spec = {
+            'mode': mode,
+            'database': get_database(args.backend, mode, args.pool_size),
+            'query': BACKENDS[args.backend]['query'],
+            'queries': args.queries,
+            'duration': args.duration,
+            'threads': args.threads,
+            'processes': args.processes,
+            'process_threads': args.process_threads,
+            'churn': args.churn,
+        }
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fp:
+            json.dump(spec, fp)
+
+        try:
+            print('Running %s / %s ...' % (args.backend, mode), file=sys.stderr)
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', fp.name],
+                                     stdout=subprocess.DEVNULL)
+            if process.returncode:
+                sys.exit('%s / %s failed, exit code: %s' % (args.backend, mode, process.returncode))
+
+            with open(fp.name) as result_fp:
+                results[mode] = json.load(result_fp)
+        finally:
+            os.unlink(fp.name)
+
+    report = {'meta': get_metadata(args), 'results': results}
+    output = args.output or os.path.join(RESULTS_DIR, '%s-%s.json' % (args.backend, time.strftime('%Y%m%d-%H%M%S')))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+
+    print_results(results)
+    print('\nResults written to %s' % output)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(json.load(fp), report, args.tolerance)
+
+        if regressions:
+            sys.exit('%d regression(s) beyond %.0f%%' % (regressions, args.tolerance * 100))
+
+
+if __name__ == '__main__':
+    main()
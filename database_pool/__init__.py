@@ -10,6 +10,7 @@ Django supports long connections natively, but not connection pooling:
 
   This requires the same number of database connections as the number of workers, and is basically equivalent to
   a long connection except that it can be used in a loop among workers.
+  (POOL_OPTIONS['CHECKOUT_SCOPE'] = 'transaction' gives the connection back after each statement or transaction)
 
   Long connections also have their advantages, eliminating the overhead of new connections, avoiding the complexity of pooling,
   and being suitable for small and medium-sized sites that do not need to manually manage transactions.
@@ -36,6 +37,7 @@ import json
 import os.path
 import logging
 
+import django
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
@@ -43,6 +45,10 @@ from . import backends
 
 logger = logging.getLogger("django")
 
+# Django < 3.2 doesn't discover the AppConfig of apps.py by itself
+if django.VERSION < (3, 2):
+    default_app_config = 'database_pool.apps.DatabasePoolConfig'
+
 
 def setup():
     databases = settings.DATABASES
@@ -58,7 +64,7 @@ def setup():
     logger.warning("ORM Pool `relative_module_path`: %s", relative_module_path)
     logger.warning("ORM Pool Backends Package Path: %s" % engine_pkg_path)
 
-    backend_type_list = [".mysql", ".postgresql", ".oracle"]
+    backend_type_list = [".mysql", ".postgresql", ".psycopg", ".oracle", ".fake"]
 
     for alias, _db in databases.items():
         engine = _db.get("ENGINE")
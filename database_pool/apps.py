@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class DatabasePoolConfig(AppConfig):
+    name = 'database_pool'
+    verbose_name = 'Database Pool'
+
+    def ready(self):
+        # imported here: it needs the apps registry to be ready
+        from database_pool.core.prewarm import prewarm_on_ready
+
+        # opt-in by settings.DATABASE_POOL_PREWARM and POOL_OPTIONS['PREWARM'] of each alias
+        prewarm_on_ready()
@@ -0,0 +1,76 @@
+"""
+Pooled backend of the fake driver(database_pool.backends.fake.dbapi): Django's sqlite3 backend whose
+connections go through a simulated server, so the pools can be tested and benchmarked without a database.
+
+settings.py:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'database_pool.backends.fake',
+            'NAME': 'file:fake?mode=memory&cache=shared',   # any sqlite3 database, it names the fake server
+            'OPTIONS': {
+                'connect_latency': 0.005,
+                'query_latency': 0.001,
+                'ping_latency': 0.0005,
+                'connect_failure_rate': 0.0,
+                'query_failure_rate': 0.0,
+                'max_connections': 100,
+                'seed': 42,
+            },
+            'POOL_OPTIONS': {
+                'POOL_SIZE': 10,
+            }
+        }
+    }
+"""
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.sqlite3.base import DatabaseWrapper as _SQLiteDatabaseWrapper
+
+from database_pool.core.mixins import DBPoolWrapperMixin
+from database_pool.core.pool import Dialect, lazy_dialect
+from database_pool.core.reset import ResetOnReturnMixin
+from database_pool.backends.fake import dbapi as Database
+
+__all__ = ["DatabaseWrapper"]
+
+
+class SQLiteDatabaseWrapper(_SQLiteDatabaseWrapper):
+    # sqlite3 ignores close() on an in-memory database not to destroy it, here close() gives
+    # the connection back to the pool, which keeps the database alive
+    close = BaseDatabaseWrapper.close
+
+
+class FakePingMixin:
+    def do_ping(self, dbapi_connection):
+        try:
+            return dbapi_connection.ping()
+        except Database.OperationalError:
+            return False
+
+
+class DatabaseWrapper(DBPoolWrapperMixin, SQLiteDatabaseWrapper):
+    vendor = 'fake'
+    display_name = 'Fake'
+    Database = Database
+
+    @lazy_dialect
+    def SQLAlchemyDialect():
+        from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+
+        class SQLAlchemyDialect(FakePingMixin, ResetOnReturnMixin, SQLiteDialect_pysqlite):
+            pass
+
+        return SQLAlchemyDialect
+
+    class NativeDialect(FakePingMixin, ResetOnReturnMixin, Dialect):
+        pass
+
+    def _get_new_connection(self, conn_params):
+        # the fake server accepts the connection first, then Django's sqlite3 backend opens
+        # and sets it up(its SQL functions...)
+        open_sqlite = super(DatabaseWrapper, self)._get_new_connection
+        return Database.connect(connection_factory=lambda **params: open_sqlite(params), **conn_params)
+
+    def _set_dbapi_autocommit(self, autocommit):
+        # sqlite3: no `autocommit` attribute before python 3.12
+        self.dbapi_connection.isolation_level = None if autocommit else ''
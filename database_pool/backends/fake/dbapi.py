@@ -0,0 +1,255 @@
+"""
+A fake DB-API 2.0 driver: sqlite3 behind a simulated server, to stress-test the pools without a database.
+
+Every connection belongs to the FakeServer of its database name, which injects:
+    connect_latency, query_latency, ping_latency    seconds slept by connect(), every statement and ping()
+    connect_failure_rate, query_failure_rate        share(0..1) of the connects/statements failing
+    max_connections                                 connections open at once, None: unlimited
+    seed                                            of the failures' random generator(deterministic runs)
+
+    conn = connect(':memory:', query_latency=0.001, max_connections=10)
+
+The server's counters(connects, statements, pings, failures, peak_connections...) and its controls
+(disconnect_all(), fail_next()) are reached by FakeServer.get(name).
+"""
+
+import time
+import random
+import sqlite3
+import threading
+
+from sqlite3 import (  # noqa: F401
+    Warning, Error, InterfaceError, DatabaseError, DataError, OperationalError, IntegrityError,
+    InternalError, ProgrammingError, NotSupportedError, Binary, PARSE_DECLTYPES, PARSE_COLNAMES,
+    sqlite_version, sqlite_version_info, version, version_info,
+)
+
+__all__ = ["FakeServer", "FakeConnection", "FakeCursor", "connect"]
+
+apilevel = '2.0'
+threadsafety = 1
+paramstyle = sqlite3.paramstyle
+
+# the options of the server, not passed to sqlite3.connect()
+SERVER_OPTIONS = {
+    'connect_latency': 0.0,
+    'query_latency': 0.0,
+    'ping_latency': 0.0,
+    'connect_failure_rate': 0.0,
+    'query_failure_rate': 0.0,
+    'max_connections': None,
+    'seed': None,
+}
+
+COUNTERS = ('connects', 'statements', 'pings', 'connect_failures', 'query_failures', 'refused')
+
+
+class FakeServer:
+    """ The simulated database server of one database name, shared by the threads of the process """
+    _servers = {}
+    _servers_lock = threading.Lock()
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.lock = threading.Lock()
+        self.options = dict(SERVER_OPTIONS)
+        self.random = random.Random()
+        self.configure(**options)
+
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.open_connections = 0
+        self.peak_connections = 0
+        # bumped by disconnect_all(), the connections of an older generation are dead
+        self.generation = 0
+        self._fail_next = 0
+
+    @classmethod
+    def get(cls, name, **options):
+        """ The server of database `name`, created on first use, reconfigured by `options` """
+        with cls._servers_lock:
+            server = cls._servers.get(name)
+
+            if server is None:
+                server = cls._servers[name] = cls(name, **options)
+            elif options:
+                server.configure(**options)
+
+        return server
+
+    @classmethod
+    def reset(cls):
+        with cls._servers_lock:
+            cls._servers.clear()
+
+    def configure(self, **options):
+        unknown = set(options) - set(SERVER_OPTIONS)
+        if unknown:
+            raise ProgrammingError('Unknown fake server options: %s' % ', '.join(sorted(unknown)))
+
+        self.options.update(options)
+
+        if 'seed' in options:
+            self.random.seed(options['seed'])
+
+    def disconnect_all(self):
+        """ Simulate a server restart: every connection open so far is dead """
+        with self.lock:
+            self.generation += 1
+            self.open_connections = 0
+
+    def fail_next(self, count=1):
+        """ The next `count` statements fail whatever query_failure_rate is """
+        with self.lock:
+            self._fail_next += count
+
+    def incr(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _should_fail(self, rate):
+        with self.lock:
+            if self._fail_next:
+                self._fail_next -= 1
+                return True
+
+            return bool(rate) and self.random.random() < rate
+
+    def open(self):
+        """ Accept a new connection, :return: its generation """
+        latency = self.options['connect_latency']
+        if latency:
+            time.sleep(latency)
+
+        if self._should_fail(self.options['connect_failure_rate']):
+            self.incr('connect_failures')
+            raise OperationalError('could not connect to fake server %r' % self.name)
+
+        with self.lock:
+            max_connections = self.options['max_connections']
+
+            if max_connections is not None and self.open_connections >= max_connections:
+                self.counters['refused'] += 1
+                raise OperationalError('too many connections to fake server %r (max_connections: %s)'
+                                       % (self.name, max_connections))
+
+            self.open_connections += 1
+            self.peak_connections = max(self.peak_connections, self.open_connections)
+            self.counters['connects'] += 1
+            return self.generation
+
+    def close(self, generation):
+        with self.lock:
+            # the connections of an older generation were already dropped by disconnect_all()
+            if generation == self.generation:
+                self.open_connections -= 1
+
+    def round_trip(self, connection, kind):
+        """ A statement or a ping of `connection` reaching the server """
+        if connection.closed:
+            raise ProgrammingError('Cannot operate on a closed database.')
+
+        if connection.generation != self.generation:
+            raise OperationalError('server closed the connection unexpectedly')
+
+        latency = self.options['ping_latency' if kind == 'pings' else 'query_latency']
+        if latency:
+            time.sleep(latency)
+
+        self.incr(kind)
+
+        if kind == 'statements' and self._should_fail(self.options['query_failure_rate']):
+            self.incr('query_failures')
+            raise OperationalError('fake server %r failed the statement' % self.name)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, open_connections=self.open_connections,
+                        peak_connections=self.peak_connections)
+
+
+class FakeCursor:
+    """ Cursor whose statements go through the server first """
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def execute(self, sql, params=()):
+        self._connection.server.round_trip(self._connection, 'statements')
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self._connection.server.round_trip(self._connection, 'statements')
+        return self._cursor.executemany(sql, param_list)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, item):
+        return getattr(self._cursor, item)
+
+
+class FakeConnection:
+    """ A sqlite3 connection of a FakeServer """
+
+    def __init__(self, server, generation, connection):
+        self.server = server
+        self.generation = generation
+        self.closed = False
+        self._connection = connection
+
+    @property
+    def isolation_level(self):
+        return self._connection.isolation_level
+
+    @isolation_level.setter
+    def isolation_level(self, value):
+        self._connection.isolation_level = value
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self._connection.cursor(*args, **kwargs), self)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def ping(self):
+        self.server.round_trip(self, 'pings')
+        return True
+
+    def commit(self):
+        self.server.round_trip(self, 'statements')
+        return self._connection.commit()
+
+    def rollback(self):
+        self.server.round_trip(self, 'statements')
+        return self._connection.rollback()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.server.close(self.generation)
+            self._connection.close()
+
+    def __getattr__(self, item):
+        # create_function(), in_transaction...
+        return getattr(self._connection, item)
+
+
+def connect(database, connection_factory=None, **kwargs):
+    """
+    Open a connection of the fake server of `database`, the server options in kwargs(re)configure it,
+    the others are passed to `connection_factory`(default: sqlite3.connect)
+    """
+    options = {key: kwargs.pop(key) for key in list(kwargs) if key in SERVER_OPTIONS}
+    server = FakeServer.get(database, **options)
+
+    # the server refuses or accepts the connection before sqlite3 opens it
+    generation = server.open()
+
+    try:
+        connection = (connection_factory or sqlite3.connect)(database=database, **kwargs)
+    except Exception:
+        server.close(generation)
+        raise
+
+    return FakeConnection(server, generation, connection)
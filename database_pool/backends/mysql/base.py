@@ -1,15 +1,30 @@
-from sqlalchemy.dialects.mysql.pymysql import MySQLDialect_pymysql as MySQLDialect
+import logging
+
 from django.db.backends.mysql import base
 from database_pool.core import mixins
+from database_pool.core.pool import Dialect, lazy_dialect
+from database_pool.core.reset import MySQLResetOnReturnMixin
 
 
 class DatabaseWrapper(mixins.DBPoolWrapperMixin, base.DatabaseWrapper):
-    class SQLAlchemyDialect(MySQLDialect):
-        pass
+    @lazy_dialect
+    def SQLAlchemyDialect():
+        from sqlalchemy.dialects.mysql.pymysql import MySQLDialect_pymysql as MySQLDialect
+
+        class SQLAlchemyDialect(MySQLResetOnReturnMixin, MySQLDialect):
+            pass
+
+        return SQLAlchemyDialect
+
+    class NativeDialect(MySQLResetOnReturnMixin, Dialect):
+        def do_ping(self, dbapi_connection):
+            dbapi_connection.ping(False)
+            return True
 
     def _set_dbapi_autocommit(self, autocommit):
-        """ self.connection: <class 'sqlalchemy.pool.base._ConnectionFairy'> """
-        args = (self.vendor, self.connection, autocommit)
-        self.logger.info("[%s] DatabaseWrapper._set_dbapi_autocommit conn: %s, autocommit: %s", *args)
+        """ self.connection: <class 'sqlalchemy.pool.base._ConnectionFairy'>, or pymysql's connection(native pool) """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            args = (self.vendor, self.connection, autocommit)
+            self.logger.debug("[%s] DatabaseWrapper._set_dbapi_autocommit conn: %s, autocommit: %s", *args)
 
-        self.connection.connection.autocommit(autocommit)
+        self.dbapi_connection.autocommit(autocommit)
@@ -4,17 +4,56 @@ except ImportError as e:
     from django.core.exceptions import ImproperlyConfigured
     raise ImproperlyConfigured("Error loading cx_Oracle module: %s" % e)
 
-from sqlalchemy.dialects.oracle.cx_oracle import OracleDialect
 from django.db.backends.oracle.base import DatabaseWrapper as OracleDatabaseWrapper
 
+from database_pool.core.cache import OracleStatementCache, get_statement_cache_size
 from database_pool.core.mixins import DBPoolWrapperMixin
+from database_pool.core.pool import Dialect, lazy_dialect
+from database_pool.core.reset import OracleResetOnReturnMixin
 
 
 class DatabaseWrapper(DBPoolWrapperMixin, OracleDatabaseWrapper):
-    class SQLAlchemyDialect(OracleDialect):
+    # POOL_OPTIONS['STATEMENT_CACHE_SIZE']: cx_Oracle's statement cache of the connection
+    statement_cache_class = OracleStatementCache
+
+    @lazy_dialect
+    def SQLAlchemyDialect():
+        from sqlalchemy.dialects.oracle.cx_oracle import OracleDialect
+
+        class SQLAlchemyDialect(OracleResetOnReturnMixin, OracleDialect):
+            def do_ping(self, dbapi_connection):
+                try:
+                    return super(OracleDialect, self).do_ping(dbapi_connection)
+                except DatabaseError:
+                    return False
+
+        return SQLAlchemyDialect
+
+    class NativeDialect(OracleResetOnReturnMixin, Dialect):
+        select_one = 'SELECT 1 FROM DUAL'
+
         def do_ping(self, dbapi_connection):
             try:
-                return super(OracleDialect, self).do_ping(dbapi_connection)
+                return super().do_ping(dbapi_connection)
             except DatabaseError:
                 return False
 
+    def init_connection_state(self):
+        super(DatabaseWrapper, self).init_connection_state()
+
+        # Django checks the LIKE operators once per DatabaseWrapper, in init_connection_state(),
+        # which is skipped when the connection was already initialised: the connection remembers them
+        info = self.connection_info
+
+        if 'operators' in self.__dict__:
+            info.setdefault('operators', (self.operators, self.pattern_ops))
+        elif 'operators' in info:
+            self.operators, self.pattern_ops = info['operators']
+
+        # after Django's init_connection_state(), which sets the statement cache size of the connection to 20
+        size = get_statement_cache_size(self.settings_dict, self.statement_cache_class.default_size)
+        dbapi_connection = self.dbapi_connection
+
+        if dbapi_connection.stmtcachesize != size:
+            dbapi_connection.stmtcachesize = size
+
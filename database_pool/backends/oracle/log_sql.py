@@ -1,5 +1,7 @@
 # Middleware added if log level on INFO or DEBUG
 # If dango DEBUG then write sql timings to screen else write to the log
+# Superseded by database_pool.middleware.QueryProfilerMiddleware: all the pooled backends, sampled,
+# without DEBUG(connection.queries), with the checkout wait and hold time of the pool
 from django.conf import settings
 from django.db import connection
 from django.template import Template, Context
@@ -0,0 +1,101 @@
+"""
+The sessions of the Oracle pools: their setup by the pool's session callback, and the tags and users
+a block or a view requests its sessions with. Nothing here needs the driver.
+"""
+
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, DEFAULT_DB_ALIAS
+
+__all__ = ["DEFAULT_SESSION_TAG", "SessionSetup", "session_tag", "session_user"]
+
+# the tag of the sessions set up without EXTRAS['session_tags']
+DEFAULT_SESSION_TAG = 'default'
+
+
+class SessionSetup:
+    """ The session callback of the pool: sets up a new session, and a session tagged with other settings
+        than the ones requested(EXTRAS['session_tags']), so a session reused as it is costs no round-trip.
+
+        The drivers without session callbacks(cx_Oracle < 8) call it at every acquire, as before.
+    """
+    date_formats = ("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD' "
+                    "NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS.FF'")
+
+    def __init__(self, extras, logger=None):
+        self.statements = [self.date_formats] + list(extras.get('session', []))
+        self.tag_statements = dict(extras.get('session_tags', {}))
+        self.stmtcachesize = int(extras.get('stmtcachesize', 20))
+        self.logger = logger
+        # whether the pool calls it, set once the pool is created
+        self.installed = False
+        # the sessions set up, approximately under threads
+        self.setups = 0
+
+    def check_tag(self, tag):
+        if tag != DEFAULT_SESSION_TAG and tag not in self.tag_statements:
+            raise ImproperlyConfigured("Unknown session tag '%s', expecting one of EXTRAS['session_tags']: %s"
+                                       % (tag, sorted(self.tag_statements)))
+
+    def __call__(self, connection, requested_tag=None):
+        tag = requested_tag or DEFAULT_SESSION_TAG
+        # a tag replaces the settings of another one: it sets all the settings of the session again
+        statements = self.statements + list(self.tag_statements.get(tag, []))
+        cursor = connection.cursor()
+
+        try:
+            for sql in statements:
+                # no trailing ';' or '/', as FormatStylePlaceholderCursor.cleanquery()
+                if sql.endswith(';') or sql.endswith('/'):
+                    sql = sql[:-1]
+                cursor.execute(sql)
+        except Exception as error:
+            if self.logger:
+                self.logger.warning("Failed to set up the session due to error: %s" % error)
+            raise
+        finally:
+            cursor.close()
+
+        try:
+            connection.stmtcachesize = self.stmtcachesize
+        except:
+            # Django docs specify cx_Oracle version 4.3.1 or higher, but
+            # stmtcachesize is available only in 4.3.2 and up.
+            pass
+
+        if self.installed:
+            connection.tag = tag
+        self.setups += 1
+
+
+@contextmanager
+def session_tag(tag, using=DEFAULT_DB_ALIAS):
+    """ Run a block, or a view as a decorator, on sessions with the settings of EXTRAS['session_tags'][tag]:
+            @session_tag('reporting')
+            def report(request):
+                ......
+    """
+    connection = connections[using]
+    previous = connection.session_tag
+    connection.set_session_tag(tag)
+
+    try:
+        yield
+    finally:
+        connection.set_session_tag(previous)
+
+
+@contextmanager
+def session_user(user, using=DEFAULT_DB_ALIAS):
+    """ Run a block, or a view as a decorator, on the sessions of `user` acquired through the proxy user
+        (EXTRAS['proxy']), eg: the schema of a tenant
+    """
+    connection = connections[using]
+    previous = connection.session_user
+    connection.set_session_user(user)
+
+    try:
+        yield
+    finally:
+        connection.set_session_user(previous)
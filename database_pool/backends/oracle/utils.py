@@ -16,13 +16,30 @@ def get_extras(user_defined_extras=None):
                       'increment': 1,       # increase by this amount when more are needed
                       'threaded': True,     # server platform optimisation
                       'timeout': 600,       # connection timeout, 600 = 10 mins
+                      'ping_interval': 60,  # ping at acquire only the connections idle for this long
+                      'getmode': 'wait',    # acquire() when the pool is exhausted: wait, nowait, forceget, timedwait
+                      'wait_timeout': 0,    # milliseconds waited by the 'timedwait' getmode
+                      'max_lifetime_session': 0,  # seconds before a session is closed at its release, 0 = forever
+                      'thick': False,       # python-oracledb thick mode(Oracle Client libraries), thin by default
+                      'lib_dir': '',        # directory of the Oracle Client libraries of the thick mode
+                      'drcp': False,        # use the pooled servers of Database Resident Connection Pooling
+                      'cclass': '',         # DRCP connection class, sessions are shared within a class
+                      'purity': 'self',     # DRCP purity: self (reuse the session state) or new
+                      'proxy': False,       # heterogeneous pool, USER is the proxy of the users of session_user()
+                      'max_sessions_per_user': 0,  # sessions of one user(through the proxy) out at once, 0 = no cap
+                      'stmtcachesize': 20,  # statements cached per connection by cx_Oracle, 0 disables it
+                      'query_cache_size': 500,  # statements rewritten for Oracle cached per alias, 0 disables it
+                      'fetch_lobs_inline': 0,   # fetch the LOBs up to this size with the rows(True: 64KB), 0 disables it
                       'log': 0,             # extra logging functionality
                       'logpath': '',        # file system path for oracle.log file
                       'existing': '',       # Type modifications if using existing database data
                       'like': 'LIKEC',      # Use LIKE or LIKEC - Oracle ignores index for LIKEC on older dbs
-                      'session': []         # Add session optimisations applied to each fresh connection, eg.
+                      'session': [],        # Add session optimisations applied to each fresh connection, eg.
                                             #   ['alter session set cursor_sharing = similar',
                                             #   'alter session set session_cached_cursors = 20']
+                      'session_tags': {}    # More settings of the sessions tagged by database_pool.backends.
+                                            # oracle.wrapper.session_tag(tag), eg.
+                                            #   {'reporting': ['alter session set optimizer_mode = all_rows']}
                       }
 
     if user_defined_extras and len(user_defined_extras) != 0:
@@ -81,9 +98,10 @@ def get_logger(extras):
         pass
 
     # Add sql logging for all requests if DEBUG level
-    if extras.get('log') == 10 or settings.DEBUG:
+    # old-style middleware: only for the projects still on MIDDLEWARE_CLASSES, see database_pool.middleware
+    if (extras.get('log') == 10 or settings.DEBUG) and hasattr(settings, 'MIDDLEWARE_CLASSES'):
         # Add middleware if needed
         middleware_classes = list(settings.MIDDLEWARE_CLASSES)
-        middleware_classes.append('database_pool.oracle.log_sql.SQLLogMiddleware')
+        middleware_classes.append('database_pool.backends.oracle.log_sql.SQLLogMiddleware')
         settings.MIDDLEWARE_CLASSES = tuple(middleware_classes)
 
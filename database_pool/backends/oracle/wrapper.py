@@ -1,17 +1,67 @@
 """
 Oracle pooled connection database backend for Django.
-Requires cx_Oracle: http://www.python.net/crew/atuining/cx_Oracle/
+Requires python-oracledb(thin mode by default, no Oracle Client libraries needed):
+https://python-oracledb.readthedocs.io/, or cx_Oracle: https://oracle.github.io/python-cx_Oracle/
 """
 
 import os
-import _thread as thread
+import sys
+import time
+import types
+import decimal
+import weakref
+import datetime
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def cx_oracle_module(driver):
+    """
+    python-oracledb as the cx_Oracle module Django's Oracle backend imports(it's cx_Oracle's API compatible
+    successor): a module object of its own, python-oracledb itself is left untouched
+    """
+    module = types.ModuleType('cx_Oracle', driver.__doc__)
+    module.__dict__.update((name, value) for name, value in vars(driver).items() if not name.startswith('__'))
+    # the version of cx_Oracle it's compatible with, as Django checks it
+    module.version = '8.3.0'
+    # Django < 5.0 tests isinstance(param, Database.Binary), a function of recent python-oracledb versions
+    if not isinstance(driver.Binary, type):
+        module.Binary = bytes
+    return module
+
+
+@contextmanager
+def imported_as_cx_oracle(module):
+    """ `import cx_Oracle` gets `module` in the block only """
+    sys.modules['cx_Oracle'] = module
+
+    try:
+        yield
+    finally:
+        if sys.modules.get('cx_Oracle') is module:
+            del sys.modules['cx_Oracle']
+
 
 try:
-    import cx_Oracle as Database
-    from cx_Oracle import DatabaseError
-except ImportError as e:
-    from django.core.exceptions import ImproperlyConfigured
-    raise ImproperlyConfigured("Error loading cx_Oracle module: %s" % e)
+    import oracledb
+except ImportError:
+    oracledb = None
+
+if oracledb is not None and 'cx_Oracle' not in sys.modules:
+    Database = cx_oracle_module(oracledb)
+    is_oracledb = True
+else:
+    # the thick fallback: cx_Oracle, or cx_Oracle already imported by the project
+    try:
+        import cx_Oracle as Database
+    except ImportError as e:
+        raise ImproperlyConfigured("Error loading python-oracledb or cx_Oracle module: %s" % e)
+    is_oracledb = False
+
+DatabaseError = Database.DatabaseError
 
 try:
     from django.db.backends.signals import connection_created
@@ -23,16 +73,24 @@ from django.utils.encoding import smart_str
 from django.utils.encoding import force_str as force_unicode
 from django.db.backends.base.validation import BaseDatabaseValidation
 
-# Makes it explicit where the default oracle versions of these components are used
-from django.db.backends.oracle.base import DatabaseFeatures as OracleDatabaseFeatures
-from django.db.backends.oracle.base import DatabaseOperations as OracleDatabaseOperations
-from django.db.backends.oracle.base import DatabaseWrapper as OracleDatabaseWrapper
-from django.db.backends.oracle.client import DatabaseClient as OracleDatabaseClient
-from django.db.backends.oracle.introspection import DatabaseIntrospection as OracleDatabaseIntrospection
-from django.db.backends.oracle.base import FormatStylePlaceholderCursor as OracleFormatStylePlaceholderCursor
+# Django < 5.0 imports cx_Oracle: it gets python-oracledb's module while its Oracle backend is imported
+with imported_as_cx_oracle(Database) if is_oracledb else nullcontext():
+    # Makes it explicit where the default oracle versions of these components are used
+    from django.db.backends.oracle.base import DatabaseFeatures as OracleDatabaseFeatures
+    from django.db.backends.oracle.base import DatabaseOperations as OracleDatabaseOperations
+    from django.db.backends.oracle.base import DatabaseWrapper as OracleDatabaseWrapper
+    from django.db.backends.oracle.client import DatabaseClient as OracleDatabaseClient
+    from django.db.backends.oracle.introspection import DatabaseIntrospection as OracleDatabaseIntrospection
+    from django.db.backends.oracle.base import FormatStylePlaceholderCursor as OracleFormatStylePlaceholderCursor
+    from django.db.backends.oracle.utils import Oracle_datetime
+
+    from .creation import DatabaseCreation
+
+from database_pool.core.exceptions import PoolTimeout
+from database_pool.core.mixins import DBConnectionPool
 
-from .creation import DatabaseCreation
 from .utils import get_logger, get_extras
+from .sessions import DEFAULT_SESSION_TAG, SessionSetup, session_tag, session_user  # noqa: F401
 
 # Check whether cx_Oracle was compiled with the WITH_UNICODE option.  This will also be True in Python 3.0.
 if int(Database.version.split('.', 1)[0]) >= 5 and not hasattr(Database, 'UNICODE'):
@@ -43,6 +101,31 @@ else:
 # Oracle takes client-side character set encoding from the environment.
 os.environ['NLS_LANG'] = '.UTF8'
 
+def get_getmode(mode):
+    """ EXTRAS['getmode']: 'wait', 'nowait', 'forceget' or 'timedwait'(EXTRAS['wait_timeout'] milliseconds) """
+    return get_constant(('POOL_GETMODE_', 'SPOOL_ATTRVAL_'), mode)
+
+
+def get_constant(prefixes, name):
+    """ A constant of the driver, eg: cx_Oracle < 8.2 only has the SPOOL_ATTRVAL_ and ATTR_PURITY_ ones """
+    for prefix in prefixes:
+        if hasattr(Database, prefix + str(name).upper()):
+            return getattr(Database, prefix + str(name).upper())
+
+    raise ImproperlyConfigured("Unknown value '%s' of EXTRAS, expecting one of %s*" % (name, prefixes[0]))
+
+
+def pooled_dsn(dsn):
+    """ The DSN of a pooled server of Database Resident Connection Pooling(DRCP) """
+    if dsn.lstrip().startswith('('):
+        if 'SERVER=' not in dsn.upper():
+            dsn = dsn.replace('(CONNECT_DATA=', '(CONNECT_DATA=(SERVER=POOLED)', 1)
+    elif '/' in dsn and ':' not in dsn.rsplit('/', 1)[1]:
+        # Easy Connect: host[:port]/service_name[:server_type]
+        dsn += ':pooled'
+    # else a TNS alias, its entry sets (SERVER=POOLED)
+    return dsn
+
 
 class DatabaseFeatures(OracleDatabaseFeatures):
     """ Add extra options from default Oracle ones
@@ -78,7 +161,12 @@ class DatabaseWrapper(OracleDatabaseWrapper):
         'opened': '',
         'name': '',
         'timeout': '',
-        'tnsentry': ''
+        'tnsentry': '',
+        'dsn': '',
+        'getmode': '',
+        'ping_interval': '',
+        'max_lifetime_session': '',
+        'thin': ''
     }
     operators = {
         'exact': '= %s',
@@ -95,6 +183,24 @@ class DatabaseWrapper(OracleDatabaseWrapper):
         'iendswith': "LIKEC UPPER(%s) ESCAPE '\\'",
     }
     oracle_version = None
+    # the last pooled connection released by this wrapper was used with errors
+    _ping_needed = False
+    # alias -> CompiledQueryCache shared by the wrappers(threads) of the alias
+    query_caches = {}
+    # alias -> InlineLobHandler of its sessions, EXTRAS['fetch_lobs_inline']
+    lob_handlers = {}
+    # alias -> SessionSetup, the session callback of its pool
+    session_setups = {}
+    # the settings(EXTRAS['session_tags']) of the sessions acquired by this wrapper
+    session_tag = DEFAULT_SESSION_TAG
+    # the user of the sessions acquired by this wrapper through the proxy user(EXTRAS['proxy']), None: USER
+    session_user = None
+    # the pools of all the aliases, one per alias and process
+    conn_pool = DBConnectionPool()
+    # when self.connection was acquired, to measure how long it's held
+    _checkout_at = None
+    # the counters of the request being profiled(database_pool.middleware.QueryProfilerMiddleware)
+    query_profile = None
 
     def __init__(self, *args, **kwargs):
         """ Set up the various database components
@@ -107,6 +213,21 @@ class DatabaseWrapper(OracleDatabaseWrapper):
         self.extras = get_extras(user_defined_extras)
         self.logger = get_logger(self.extras)
 
+        query_cache_size = int(self.extras.get('query_cache_size', 500))
+        self.query_cache = self.query_caches.setdefault(
+            getattr(self, 'alias', 'common'), CompiledQueryCache(query_cache_size)
+        ) if query_cache_size > 0 else None
+
+        fetch_lobs_inline = self.extras.get('fetch_lobs_inline', 0)
+        if fetch_lobs_inline is True:
+            fetch_lobs_inline = InlineLobHandler.default_max_size
+        self.lob_handler = self.lob_handlers.setdefault(
+            getattr(self, 'alias', 'common'), InlineLobHandler(int(fetch_lobs_inline))
+        ) if fetch_lobs_inline else None
+        self.session_setup = self.session_setups.setdefault(
+            getattr(self, 'alias', 'common'), SessionSetup(self.extras, self.logger)
+        )
+
         like_operators = ['contains', 'icontains', 'startswith', 'istartswith', 'endswith', 'iendswith']
         if self.extras.get('like', 'LIKEC') != 'LIKEC':
             for key in like_operators:
@@ -134,73 +255,176 @@ class DatabaseWrapper(OracleDatabaseWrapper):
         else:
             self.poolprops['name'] = 'Session pool not found'
 
+        if self.query_cache is not None:
+            self.poolprops['query_cache'] = self.query_cache.stats()
+        self.poolprops['session_setups'] = self.session_setup.setups
+        if pool and self.extras.get('proxy', False):
+            self.poolprops['user_sessions'] = pool.user_sessions()
+
         return self.poolprops
 
     def _get_pool(self):
-        """ Get the connection pool or create it if it doesnt exist
-            Add thread lock to prevent server initial heavy load creating multiple pools
+        """ Get the connection pool or create it if it doesnt exist, only once per alias under the alias lock
+            of DBConnectionPool, so that the heavy load of a server start never builds several pools
         """
-        pool_name = '_pool_%s' % getattr(self, 'alias', 'common')
+        pool_name = getattr(self, 'alias', 'common')
 
-        if not hasattr(self.__class__, pool_name):
-            lock = thread.allocate_lock()
-            lock.acquire()
+        try:
+            return self.conn_pool.get_or_create(pool_name, self._build_pool)
+        except Exception as err:
+            settings_dict = self._get_pool_settings()
+            msg = """##### Database '%(NAME)s' login failed or database not found ##### 
+                     Using settings: %(USER)s @ %(HOST)s:%(PORT)s / %(NAME)s  
+                     Django start up cancelled
+                  """ % settings_dict
+            msg += '\n##### DUE TO ERROR: %s\n' % err
+            if self.logger:
+                self.logger.critical(msg)
+            else:
+                print(msg)
+            return None
 
-            if not hasattr(self.__class__, pool_name):
-                if self.extras['threaded']:
-                    Database.OPT_Threading = 1
-                else:
-                    Database.OPT_Threading = 0
-                # Use 1.2 style dict if its there, else make one
-                try:
-                    settings_dict = self.creation.connection.settings_dict
-                except:
-                    settings_dict = None
-
-                if not settings_dict.get('NAME', ''):
-                    settings_dict = {'HOST': settings.DATABASE_HOST,
-                                     'PORT': settings.DATABASE_PORT,
-                                     'NAME': settings.DATABASE_NAME,
-                                     'USER': settings.DATABASE_USER,
-                                     'PASSWORD': settings.DATABASE_PASSWORD,
-                                     }
-                if len(settings_dict.get('HOST', '').strip()) == 0:
-                    settings_dict['HOST'] = 'localhost'
-                if len(settings_dict.get('PORT', '').strip()) != 0:
-                    dsn = Database.makedsn(str(settings_dict['HOST']),
-                                           int(settings_dict['PORT']),
-                                           str(settings_dict.get('NAME', '')))
-                else:
-                    dsn = settings_dict.get('NAME', '')
+    def _get_pool_settings(self):
+        # Use 1.2 style dict if its there, else make one
+        try:
+            settings_dict = self.creation.connection.settings_dict
+        except:
+            settings_dict = None
+
+        if not settings_dict.get('NAME', ''):
+            settings_dict = {'HOST': settings.DATABASE_HOST,
+                             'PORT': settings.DATABASE_PORT,
+                             'NAME': settings.DATABASE_NAME,
+                             'USER': settings.DATABASE_USER,
+                             'PASSWORD': settings.DATABASE_PASSWORD,
+                             }
+        if len(settings_dict.get('HOST', '').strip()) == 0:
+            settings_dict['HOST'] = 'localhost'
 
-                try:
-                    pool = Database.SessionPool(str(settings_dict.get('USER', '')),
-                                                str(settings_dict.get('PASSWORD', '')),
-                                                dsn,
-                                                int(self.extras.get('min', 4)),
-                                                int(self.extras.get('max', 8)),
-                                                int(self.extras.get('increment', 1)),
-                                                threaded=self.extras.get('threaded', True))
-                except Exception as err:
-                    pool = None
-
-                if pool:
-                    if self.extras.get('timeout', 0):
-                        pool.timeout = self.extras['timeout']
-                    setattr(self.__class__, pool_name, pool)
-                else:
-                    msg = """##### Database '%(NAME)s' login failed or database not found ##### 
-                             Using settings: %(USER)s @ %(HOST)s:%(PORT)s / %(NAME)s  
-                             Django start up cancelled
-                          """ % settings_dict
-                    msg += '\n##### DUE TO ERROR: %s\n' % err
-                    if self.logger:
-                        self.logger.critical(msg)
-                    else:
-                        print(msg)
-                    return None
-                lock.release()
-        return getattr(self.__class__, pool_name)
+        return settings_dict
+
+    def _build_pool(self):
+        settings_dict = self._get_pool_settings()
+
+        if len(settings_dict.get('PORT', '').strip()) != 0:
+            dsn = Database.makedsn(str(settings_dict['HOST']),
+                                   int(settings_dict['PORT']),
+                                   str(settings_dict.get('NAME', '')))
+        else:
+            dsn = settings_dict.get('NAME', '')
+
+        if self.extras.get('drcp', False):
+            dsn = pooled_dsn(dsn)
+
+        return OracleSessionPool(getattr(self, 'alias', 'common'), self._create_session_pool(settings_dict, dsn),
+                                 max_sessions_per_user=int(self.extras.get('max_sessions_per_user', 0)),
+                                 getmode=str(self.extras.get('getmode', 'wait')),
+                                 wait_timeout=int(self.extras.get('wait_timeout', 0)),
+                                 logger=self.logger)
+
+    def _create_session_pool(self, settings_dict, dsn):
+        """ python-oracledb's pool(thin mode, or thick with EXTRAS['thick']), else cx_Oracle's SessionPool """
+        user = str(settings_dict.get('USER', ''))
+        password = str(settings_dict.get('PASSWORD', ''))
+        pool_params = {
+            'min': int(self.extras.get('min', 4)),
+            'max': int(self.extras.get('max', 8)),
+            'increment': int(self.extras.get('increment', 1)),
+        }
+        if self.extras.get('proxy', False):
+            # USER is the proxy user, the sessions of the other users are acquired through it
+            pool_params['homogeneous'] = False
+
+        if is_oracledb:
+            if self.extras.get('thick', False) and Database.is_thin_mode():
+                # the Oracle Client libraries, once per process and before the first connection
+                Database.init_oracle_client(lib_dir=self.extras.get('lib_dir') or None)
+
+            pool_params.update({
+                'getmode': get_getmode(self.extras.get('getmode', 'wait')),
+                'wait_timeout': int(self.extras.get('wait_timeout', 0)),
+                'timeout': int(self.extras.get('timeout', 0)),
+                # the connections idle for ping_interval seconds are pinged at acquire(), 0: always, -1: never
+                'ping_interval': int(self.extras.get('ping_interval', 60)),
+                'max_lifetime_session': int(self.extras.get('max_lifetime_session', 0)),
+            })
+            if self.extras.get('drcp', False):
+                pool_params.update({'server_type': 'pooled', **self._acquire_params()})
+
+            pool = Database.create_pool(user=user, password=password, dsn=dsn,
+                                        session_callback=self.session_setup, **pool_params)
+            self.session_setup.installed = True
+            return pool
+
+        if self.extras['threaded']:
+            Database.OPT_Threading = 1
+        else:
+            Database.OPT_Threading = 0
+
+        homogeneous = {'homogeneous': False} if 'homogeneous' in pool_params else {}
+        try:
+            pool = Database.SessionPool(user, password, dsn,
+                                        pool_params['min'], pool_params['max'], pool_params['increment'],
+                                        threaded=self.extras.get('threaded', True),
+                                        session_callback=self.session_setup, **homogeneous)
+            self.session_setup.installed = True
+        except TypeError:
+            # cx_Oracle < 8: the sessions are set up at every acquire
+            pool = Database.SessionPool(user, password, dsn,
+                                        pool_params['min'], pool_params['max'], pool_params['increment'],
+                                        threaded=self.extras.get('threaded', True), **homogeneous)
+
+        if self.extras.get('timeout', 0):
+            pool.timeout = self.extras['timeout']
+        # cx_Oracle >= 8.2 pings a connection at acquire() only if it was idle for
+        # ping_interval seconds, older versions need the explicit ping() of every acquire
+        if hasattr(pool, 'ping_interval'):
+            pool.ping_interval = int(self.extras.get('ping_interval', 60))
+        pool.getmode = get_getmode(self.extras.get('getmode', 'wait'))
+        if self.extras.get('wait_timeout', 0) and hasattr(pool, 'wait_timeout'):
+            pool.wait_timeout = int(self.extras['wait_timeout'])
+        if self.extras.get('max_lifetime_session', 0) and hasattr(pool, 'max_lifetime_session'):
+            pool.max_lifetime_session = int(self.extras['max_lifetime_session'])
+
+        return pool
+
+    def _acquire_params(self):
+        """ The DRCP connection class and purity of the sessions acquired, EXTRAS['cclass'] and ['purity'] """
+        if not self.extras.get('drcp', False):
+            return {}
+
+        return {
+            'cclass': self.extras.get('cclass') or None,
+            'purity': get_constant(('PURITY_', 'ATTR_PURITY_'), self.extras.get('purity', 'self')),
+        }
+
+    def set_session_tag(self, tag=None):
+        """ The settings(EXTRAS['session_tags']) of the sessions acquired from now on, None: the default ones.
+            A connection held with other settings is released, unless a transaction is in progress.
+        """
+        tag = tag or DEFAULT_SESSION_TAG
+        self.session_setup.check_tag(tag)
+
+        if tag == self.session_tag:
+            return
+
+        self.session_tag = tag
+        if self.connection is not None and not self.in_atomic_block:
+            self.close()
+
+    def set_session_user(self, user=None):
+        """ The user of the sessions acquired from now on through the proxy user(EXTRAS['proxy']),
+            None: USER itself. A connection held for another user is released, unless a transaction is in progress.
+        """
+        if user is not None and not self.extras.get('proxy', False):
+            raise ImproperlyConfigured("The sessions of other users need EXTRAS['proxy'] = True")
+
+        if user == self.session_user:
+            return
+
+        self.session_user = user
+        if self.connection is not None and not self.in_atomic_block:
+            self.close()
 
     pool = property(_get_pool)
 
@@ -228,7 +452,12 @@ class DatabaseWrapper(OracleDatabaseWrapper):
             if self.connection is None:
 
                 # Get a connection, after confirming that is a valid connection
+                start = time.perf_counter()
                 self.connection = self._get_alive_connection()
+                self._checkout_at = time.perf_counter()
+
+                if self.query_profile is not None:
+                    self.query_profile.observe_checkout(self._checkout_at - start)
 
                 if connection_created:
                     # Assume acquisition of existing connection = create for django signal
@@ -236,63 +465,36 @@ class DatabaseWrapper(OracleDatabaseWrapper):
                 if self.logger:
                     self.logger.info("Acquire pooled connection \n%s\n" % self.connection.dsn)
 
-                cursor = FormatStylePlaceholderCursor(self.connection, self.logger)
+                cursor = FormatStylePlaceholderCursor(self.connection, self.logger, self.query_cache)
 
-                # In case one connection in the pool dies we need to retry others in the pool
-                retry = 0
-                max_retry = self.extras.get('min', 4)
+                if not self.session_setup.installed:
+                    self.session_setup(self.connection, self.session_tag)
 
-                while retry < max_retry:
+                if self.oracle_version is None:
                     try:
-                        cursor.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD' "  
-                                       "NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS.FF'")
-                        retry = max_retry
-                    except Database.Error as error:
+                        # There's no way for the DatabaseOperations class to know the
+                        # currently active Oracle version, so we do some setups here.
+                        # TODO: Multi-db support will need a better solution (a way to
+                        # communicate the current version).
+                        self.oracle_version = int(self.connection.version.split('.')[0])
+                        # Django 1.7 or earlier has regex function changer for old Oracle
+                        if self.oracle_version <= 9:
+                            if hasattr(self.ops, 'regex_lookup_9'):
+                                self.ops.regex_lookup = self.ops.regex_lookup_9
+                        elif hasattr(self.ops, 'regex_lookup_10'):
+                            self.ops.regex_lookup = self.ops.regex_lookup_10
+                    except ValueError as err:
                         if self.logger:
-                            self.logger.warn("Failed to set session date due to error: %s" % error)
-                        # If we have exhausted all of our connections in our pool raise the error
-                        if retry == max_retry - 1:
-                            if self.logger:
-                                self.logger.critical("Exhausted %d connections in the connection pool")
-                            raise
-
-                    retry += 1
-
-                if self.extras.get('session', []):
-                    for sql in self.extras['session']:
-                        cursor.execute(sql)
-
-                try:
-                    # There's no way for the DatabaseOperations class to know the
-                    # currently active Oracle version, so we do some setups here.
-                    # TODO: Multi-db support will need a better solution (a way to
-                    # communicate the current version).
-                    self.oracle_version = int(self.connection.version.split('.')[0])
-                    # Django 1.7 or earlier has regex function changer for old Oracle
-                    if self.oracle_version <= 9:
-                        if hasattr(self.ops, 'regex_lookup_9'):
-                            self.ops.regex_lookup = self.ops.regex_lookup_9
-                    elif hasattr(self.ops, 'regex_lookup_10'):
-                        self.ops.regex_lookup = self.ops.regex_lookup_10
-                except ValueError as err:
-                    if self.logger:
-                        self.logger.warn(str(err))
-
-                try:
-                    self.connection.stmtcachesize = 20
-                except:
-                    # Django docs specify cx_Oracle version 4.3.1 or higher, but
-                    # stmtcachesize is available only in 4.3.2 and up.
-                    pass
+                            self.logger.warn(str(err))
             else:
-                cursor = FormatStylePlaceholderCursor(self.connection, self.logger)
+                cursor = FormatStylePlaceholderCursor(self.connection, self.logger, self.query_cache)
         else:
             if self.logger:
                 self.logger.critical('Pool couldnt be created - please check your Oracle connection or credentials')
             else:
                 raise Exception('Pool couldnt be created - please check your Oracle connection or credentials')
         if not cursor:
-            cursor = FormatStylePlaceholderCursor(self.connection, self.logger)
+            cursor = FormatStylePlaceholderCursor(self.connection, self.logger, self.query_cache)
         # Default arraysize of 1 is highly sub-optimal.
         cursor.arraysize = 100
         return cursor
@@ -308,19 +510,28 @@ class DatabaseWrapper(OracleDatabaseWrapper):
 
     def _get_alive_connection(self):
         """ Get a connection from the connection pool.
-            Make sure it's a valid connection (using ping()) before returning it.
+            Make sure it's a valid connection (using ping()) before returning it,
+            when the pool doesn't check the idle connections itself (ping_interval)
+            or the last connection used ended in errors.
             Pass on the autocommit -> needs this True for django 1.6 to use atomic transactions
         """
         connection_ok = False
         sanity_check = 0
         sanity_threshold = self.extras.get('max', 10)
+        ping = self._ping_needed or not hasattr(self.pool, 'ping_interval')
 
         while not connection_ok:
-            new_conn = self.pool.acquire()
+            acquire_params = self._acquire_params()
+            if self.session_setup.installed:
+                # a session tagged otherwise is set up again by the session callback
+                acquire_params['tag'] = self.session_tag
+            new_conn = self.pool.acquire(user=self.session_user, **acquire_params)
 
             try:
-                new_conn.ping()
+                if ping:
+                    new_conn.ping()
                 connection_ok = True
+                self._ping_needed = False
             except Database.Error as error:
                 sanity_check += 1
                 if sanity_check > sanity_threshold:
@@ -333,6 +544,10 @@ class DatabaseWrapper(OracleDatabaseWrapper):
             with self.wrap_database_errors:
                 new_conn.autocommit = self.autocommit
 
+        if self.lob_handler is not None:
+            # the handler of the session's connection, the cursors fall back to it(no round-trip)
+            new_conn.outputtypehandler = self.lob_handler
+
         return new_conn
 
     def close(self):
@@ -340,6 +555,8 @@ class DatabaseWrapper(OracleDatabaseWrapper):
         if self.connection is not None:
             if self.logger:
                 self.logger.debug("Release pooled connection\n%s\n" % self.connection.dsn)
+            # the server or the network may be in trouble, ping the next connection acquired
+            self._ping_needed = getattr(self, 'errors_occurred', False)
             try:
                 self.pool.release(self.connection)
             except Database.OperationalError as error:
@@ -348,6 +565,11 @@ class DatabaseWrapper(OracleDatabaseWrapper):
             finally:
                 self.connection = None
 
+                if self._checkout_at is not None:
+                    if self.query_profile is not None:
+                        self.query_profile.observe_checkin(self._checkout_at, time.perf_counter())
+                    self._checkout_at = None
+
     def _savepoint_commit(self, sid):
         """ Oracle doesn't support savepoint commits.  Ignore them. """
         pass
@@ -361,14 +583,335 @@ class DatabaseWrapper(OracleDatabaseWrapper):
                     self.logger.debug("Rollback failed due to:  %s" % str(error))
 
 
+class _UserSlots:
+    """ The sessions of a user out of the pool, kept while some are out or awaited """
+    __slots__ = ('semaphore', 'holders')
+
+    def __init__(self, max_sessions):
+        self.semaphore = threading.BoundedSemaphore(max_sessions)
+        # sessions out and threads waiting for one
+        self.holders = 0
+
+
+class OracleSessionPool:
+    """ The driver's pool of an alias, handing out the sessions of several users(proxy authentication):
+        at most max_sessions_per_user sessions of a user are out at once, so that a tenant can't take
+        the whole pool. With the gauges of a QueuePool(routers).
+    """
+
+    def __init__(self, alias, pool, max_sessions_per_user=0, getmode='wait', wait_timeout=0, logger=None):
+        self.alias = alias
+        self.pool = pool
+        self.logger = logger
+        self.max_sessions_per_user = max_sessions_per_user
+        # waiting for a user's session as the driver's getmode: wait, nowait or timedwait(milliseconds)
+        self.user_getmode = getmode.lower()
+        self.user_wait_timeout = wait_timeout
+
+        self.lock = threading.Lock()
+        # user -> _UserSlots, only the users with sessions out or awaited: one entry per tenant at most
+        self.user_slots = {}
+        # id(connection) -> (the user whose slot it holds, the finalizer giving the slot back if it's dropped)
+        self.slot_users = {}
+
+    def __getattr__(self, name):
+        # busy, opened, min, max, ping_interval... of the driver's pool
+        return getattr(self.pool, name)
+
+    def _hold_slots(self, user):
+        with self.lock:
+            slots = self.user_slots.get(user)
+            if slots is None:
+                slots = self.user_slots[user] = _UserSlots(self.max_sessions_per_user)
+
+            slots.holders += 1
+
+        return slots
+
+    def _leave_slots(self, user, acquired):
+        with self.lock:
+            slots = self.user_slots[user]
+            if acquired:
+                slots.semaphore.release()
+
+            slots.holders -= 1
+            if not slots.holders:
+                del self.user_slots[user]
+
+    def acquire(self, user=None, **params):
+        if not user or self.max_sessions_per_user <= 0:
+            return self.pool.acquire(user, **params) if user else self.pool.acquire(**params)
+
+        slots = self._hold_slots(user)
+        try:
+            if self.user_getmode == 'nowait':
+                acquired = slots.semaphore.acquire(False)
+            elif self.user_getmode == 'timedwait':
+                acquired = slots.semaphore.acquire(timeout=self.user_wait_timeout / 1000.0)
+            else:
+                acquired = slots.semaphore.acquire()
+        except BaseException:
+            self._leave_slots(user, False)
+            raise
+
+        if not acquired:
+            self._leave_slots(user, False)
+            raise PoolTimeout("Pool of %s: %d sessions of user %s already acquired"
+                              % (self.alias, self.max_sessions_per_user, user))
+
+        try:
+            conn = self.pool.acquire(user, **params)
+        except BaseException:
+            self._leave_slots(user, True)
+            raise
+
+        key = id(conn)
+        finalizer = weakref.finalize(conn, self._release_dropped_slot, key, user)
+        finalizer.atexit = False
+        self.slot_users[key] = (user, finalizer)
+        return conn
+
+    def _release_slot(self, conn):
+        entry = self.slot_users.pop(id(conn), None)
+
+        if entry is not None:
+            user, finalizer = entry
+            finalizer.detach()
+            self._leave_slots(user, True)
+
+    def _release_dropped_slot(self, key, user):
+        """ Finalizer of a session dropped without being released(its thread gone): its slot is given back
+            by a thread, the garbage collector may run while this thread holds the lock
+        """
+        # the entry is gone if release() raced with the collection
+        if self.slot_users.pop(key, None) is None:
+            return
+
+        if self.logger:
+            self.logger.warning("Pool of %s: a session of user %s was dropped without being released"
+                                % (self.alias, user))
+
+        try:
+            threading.Thread(target=self._leave_slots, args=(user, True), daemon=True).start()
+        except RuntimeError:
+            # the interpreter is shutting down
+            pass
+
+    def release(self, conn, *args, **kwargs):
+        try:
+            return self.pool.release(conn, *args, **kwargs)
+        finally:
+            self._release_slot(conn)
+
+    def drop(self, conn):
+        try:
+            return self.pool.drop(conn)
+        finally:
+            self._release_slot(conn)
+
+    def close(self, force=False):
+        self.pool.close(force)
+
+    def size(self):
+        return self.pool.min
+
+    def checkedin(self):
+        return self.pool.opened - self.pool.busy
+
+    def checkedout(self):
+        return self.pool.busy
+
+    def overflow(self):
+        return max(self.pool.opened - self.pool.min, 0)
+
+    def status(self):
+        return "Pool size: %d  Connections in pool: %d Current Overflow: %d Current Checked out connections: %d" % (
+            self.size(), self.checkedin(), self.overflow(), self.checkedout()
+        )
+
+    def user_sessions(self):
+        """ user -> its sessions out of the pool, with max_sessions_per_user """
+        users = [user for user, _ in list(self.slot_users.values())]
+        return {user: users.count(user) for user in set(users)}
+
+
+def get_db_type(*names):
+    """ The first DB type the driver has, eg: DB_TYPE_LONG(cx_Oracle >= 8, python-oracledb) or LONG_STRING """
+    for name in names:
+        if hasattr(Database, name):
+            return getattr(Database, name)
+
+    return None
+
+
+class InlineLobHandler:
+    """ Output type handler fetching the CLOB, NCLOB and BLOB columns as str/bytes in the round-trip of
+        the fetch, instead of a LOB locator read by one more round-trip per value.
+
+        A value longer than max_size(characters or bytes) is still returned, but the column of the statement
+        is fetched as LOB locators from then on, read in chunks(streamed) by Django as before.
+    """
+    default_max_size = 64 * 1024
+    # the (statement, column) switched back to locators kept at most, so that ad hoc statements can't grow it
+    max_streamed_columns = 1000
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        # (statement, column) whose values went over max_size
+        self.streamed = set()
+        # LOB type -> the type fetched inline
+        self.inline_types = {
+            lob_type: inline_type for lob_type, inline_type in [
+                (get_db_type('DB_TYPE_CLOB', 'CLOB'), get_db_type('DB_TYPE_LONG', 'LONG_STRING')),
+                (get_db_type('DB_TYPE_NCLOB', 'NCLOB'), get_db_type('DB_TYPE_LONG_NVARCHAR', 'DB_TYPE_LONG',
+                                                                    'LONG_STRING')),
+                (get_db_type('DB_TYPE_BLOB', 'BLOB'), get_db_type('DB_TYPE_LONG_RAW', 'LONG_BINARY')),
+            ] if lob_type is not None and inline_type is not None
+        }
+
+    def __call__(self, cursor, name, default_type, length, precision, scale):
+        inline_type = self.inline_types.get(default_type)
+        if inline_type is None:
+            return None
+
+        key = (getattr(cursor, 'statement', None), name)
+        if key in self.streamed:
+            return None
+
+        def outconverter(value):
+            if value is not None and len(value) > self.max_size and key not in self.streamed:
+                if len(self.streamed) >= self.max_streamed_columns:
+                    self.streamed.clear()
+                self.streamed.add(key)
+
+            return value
+
+        return cursor.var(inline_type, arraysize=cursor.arraysize, outconverter=outconverter)
+
+
+# the parameters whose input size(Django's OracleParam) only depends on their type
+CACHEABLE_PARAM_TYPES = frozenset([
+    type(None), bool, int, float, decimal.Decimal, str, bytes,
+    datetime.date, datetime.datetime, datetime.time, datetime.timedelta, Oracle_datetime,
+])
+# a longer str may be more than 4000 bytes, a CLOB: its input size is guessed at every execution
+MAX_CACHED_STR_LENGTH = 1000
+
+
+def get_param_signature(params):
+    """ The types of a statement's parameters, None if their input sizes can't be reused """
+    signature = tuple(map(type, params))
+
+    if not CACHEABLE_PARAM_TYPES.issuperset(signature):
+        return None
+
+    for param in params:
+        if param.__class__ is str and len(param) > MAX_CACHED_STR_LENGTH:
+            return None
+
+    return signature
+
+
+def get_bind_value(param, use_tz):
+    """ What Django's OracleParam binds for a parameter of CACHEABLE_PARAM_TYPES """
+    if param is True:
+        return 1
+    if param is False:
+        return 0
+    if use_tz and param.__class__ is datetime.datetime:
+        return Oracle_datetime.from_datetime(param)
+
+    return param
+
+
+class CompiledQueryCache:
+    """ LRU of the statements rewritten for Oracle(':argN' placeholders) and of their input sizes,
+        keyed on the SQL and the types of its parameters: the ORM runs the same statements over and over
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        # (sql, parameter types) -> (Oracle sql, input sizes or None)
+        self.statements = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.statements)
+
+    def get(self, key):
+        with self.lock:
+            compiled = self.statements.get(key)
+
+            if compiled is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.statements.move_to_end(key)
+
+        return compiled
+
+    def put(self, key, compiled):
+        with self.lock:
+            self.statements[key] = compiled
+
+            if len(self.statements) > self.size:
+                self.statements.popitem(last=False)
+
+    def stats(self):
+        return {'size': len(self.statements), 'hits': self.hits, 'misses': self.misses}
+
+
 class FormatStylePlaceholderCursor(OracleFormatStylePlaceholderCursor):
     """ Added just to allow use of % for like queries without params
         and use of logger if present.
     """
 
-    def __init__(self, connection, logger):
+    def __init__(self, connection, logger, query_cache=None):
+        # the handler of the connection, EXTRAS['fetch_lobs_inline']: Django's handler of the cursor overrides it
+        self.connection_handler = getattr(connection, 'outputtypehandler', None)
         OracleFormatStylePlaceholderCursor.__init__(self, connection)
         self.logger = logger
+        self.query_cache = query_cache
+
+    def _output_type_handler(self, cursor, name, default_type, length, precision, scale):
+        """ Django's handler of the numbers, then the connection's one """
+        var = OracleFormatStylePlaceholderCursor._output_type_handler(
+            cursor, name, default_type, length, precision, scale
+        )
+
+        if var is None and self.connection_handler is not None:
+            var = self.connection_handler(cursor, name, default_type, length, precision, scale)
+
+        return var
+
+    def compile(self, query, params):
+        """ :return: (Oracle sql, input sizes) of the statement from the query cache, None if not cacheable """
+        if self.query_cache is None or not isinstance(params, (list, tuple)):
+            return None
+
+        signature = get_param_signature(params)
+        if signature is None:
+            return None
+
+        key = (query, signature)
+        compiled = self.query_cache.get(key)
+
+        if compiled is None:
+            args = [(':arg%d' % i) for i in range(len(params))]
+            sql = self.cleanquery(query, args)
+
+            if sql is None:
+                # parameter parsing failed, logged by cleanquery()
+                return None
+
+            input_sizes = tuple(param.input_size for param in self._format_params(params))
+            compiled = (sql, input_sizes if any(input_sizes) else None)
+            self.query_cache.put(key, compiled)
+
+        return compiled
 
     def cleanquery(self, query, args=None):
         """ cx_Oracle wants no trailing ';' for SQL statements.  For PL/SQL, it
@@ -399,17 +942,29 @@ class FormatStylePlaceholderCursor(OracleFormatStylePlaceholderCursor):
                     raise Exception(err)
 
     def execute(self, query, params=()):
-        if params is None:
-            args = None
+        compiled = self.compile(query, params) if params is not None else None
+
+        if compiled is not None:
+            # a statement run before: no string work, the input sizes are known
+            query, input_sizes = compiled
+            if input_sizes is not None:
+                self.setinputsizes(*input_sizes)
+
+            use_tz = settings.USE_TZ
+            bind_params = [get_bind_value(param, use_tz) for param in params]
         else:
-            params = self._format_params(params)
-            args = [(':arg%d' % i) for i in range(len(params))]
+            if params is None:
+                args = None
+            else:
+                params = self._format_params(params)
+                args = [(':arg%d' % i) for i in range(len(params))]
 
-        query = self.cleanquery(query, args)
-        self._guess_input_sizes([params])
+            query = self.cleanquery(query, args)
+            self._guess_input_sizes([params])
+            bind_params = self._param_generator(params)
 
         try:
-            return self.cursor.execute(query, self._param_generator(params))
+            return self.cursor.execute(query, bind_params)
         except Database.Error as error:
             # cx_Oracle <= 4.4.0 wrongly raises a Database.Error for ORA-01400.
             if error.args[0].code == 1400 and not isinstance(error,
@@ -0,0 +1,70 @@
+"""
+psycopg 3 connections for the asyncio pool of database_pool.core.aio
+"""
+
+try:
+    import psycopg
+except ImportError as e:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured("Error loading psycopg(3) module for the asyncio pool: %s" % e)
+
+from django.conf import settings
+
+__all__ = ["get_async_connection_callbacks", "get_timezone_name"]
+
+
+def get_connection_params(settings_dict):
+    """ The same connection parameters as django.db.backends.postgresql uses """
+    conn_params = {
+        'dbname': settings_dict['NAME'] or 'postgres',
+        **settings_dict.get('OPTIONS', {}),
+    }
+
+    # psycopg2 only options
+    conn_params.pop('isolation_level', None)
+    conn_params.pop('cursor_factory', None)
+
+    if settings_dict.get('USER'):
+        conn_params['user'] = settings_dict['USER']
+    if settings_dict.get('PASSWORD'):
+        conn_params['password'] = settings_dict['PASSWORD']
+    if settings_dict.get('HOST'):
+        conn_params['host'] = settings_dict['HOST']
+    if settings_dict.get('PORT'):
+        conn_params['port'] = settings_dict['PORT']
+
+    return conn_params
+
+
+def get_timezone_name(settings_dict):
+    """ The time zone of the sessions, as DatabaseWrapper.timezone_name of Django: UTC with USE_TZ """
+    if not settings.USE_TZ:
+        return settings.TIME_ZONE
+
+    return settings_dict.get('TIME_ZONE') or 'UTC'
+
+
+def get_async_connection_callbacks(settings_dict):
+    conn_params = get_connection_params(settings_dict)
+    time_zone = get_timezone_name(settings_dict)
+
+    async def creator():
+        conn = await psycopg.AsyncConnection.connect(autocommit=True, **conn_params)
+
+        # the same session time zone as the sync connections(ensure_timezone())
+        if time_zone:
+            await conn.execute("SELECT set_config('TimeZone', %s, false)", [time_zone])
+
+        return conn
+
+    async def ping(conn):
+        if conn.closed:
+            return False
+
+        await conn.execute("SELECT 1")
+        return True
+
+    async def close(conn):
+        await conn.close()
+
+    return {'creator': creator, 'ping': ping, 'close': close}
@@ -1,13 +1,27 @@
-from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
 from django.db.backends.postgresql.base import DatabaseWrapper as Pg2DatabaseWrapper
 
+from database_pool.core.cache import PostgresStatementCache
 from database_pool.core.mixins import DBPoolWrapperMixin
+from database_pool.core.pool import Dialect, lazy_dialect
+from database_pool.core.reset import PostgresResetOnReturnMixin
 
 __all__ = ["DatabaseWrapper"]
 
 
 class DatabaseWrapper(DBPoolWrapperMixin, Pg2DatabaseWrapper):
-    class SQLAlchemyDialect(PGDialect_psycopg2):
+    # POOL_OPTIONS['STATEMENT_CACHE_SIZE']: statements run by PREPARE/EXECUTE
+    statement_cache_class = PostgresStatementCache
+
+    @lazy_dialect
+    def SQLAlchemyDialect():
+        from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+
+        class SQLAlchemyDialect(PostgresResetOnReturnMixin, PGDialect_psycopg2):
+            pass
+
+        return SQLAlchemyDialect
+
+    class NativeDialect(PostgresResetOnReturnMixin, Dialect):
         pass
 
 # from .wrapper import DatabaseWrapper
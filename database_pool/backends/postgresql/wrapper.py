@@ -21,15 +21,21 @@ __all__ = ["DatabaseWrapper"]
 log = logging.getLogger('django')
 pool_disposed = Signal()
 
+# the jsonb values are loaded by Django itself since 3.1.1
+REGISTER_JSONB = version.get_version_tuple(version.get_version()) >= (3, 1, 1)
+
 
 def _log(message, *args):
     log.debug(message, *args)
 
 
-# Only hook up the listeners if we are in debug mode.
-event.listen(QueuePool, 'checkout', partial(_log, 'retrieved from pool'))
-event.listen(QueuePool, 'checkin', partial(_log, 'returned to pool'))
-event.listen(QueuePool, 'connect', partial(_log, 'new connection'))
+def _listen_for_debug(db_pool):
+    """ Only hook up the listeners, on this pool only, if we are in debug mode """
+    if log.isEnabledFor(logging.DEBUG) and not getattr(db_pool, '_debug_listeners', False):
+        db_pool._debug_listeners = True
+        event.listen(db_pool, 'checkout', partial(_log, 'retrieved from pool'))
+        event.listen(db_pool, 'checkin', partial(_log, 'returned to pool'))
+        event.listen(db_pool, 'connect', partial(_log, 'new connection'))
 
 
 class DatabaseWrapper(Psycopg2DatabaseWrapper):
@@ -70,7 +76,7 @@ class DatabaseWrapper(Psycopg2DatabaseWrapper):
             pool = manage(Database, **pool_setting)
             setattr(self, "_db_pool", pool)
 
-        log.info("%s.DatabaseWrapper <db_pool>: %s", self.__class__.__module__, pool)
+        log.debug("%s.DatabaseWrapper <db_pool>: %s", self.__class__.__module__, pool)
         return pool
 
     def _close(self):
@@ -97,6 +103,7 @@ class DatabaseWrapper(Psycopg2DatabaseWrapper):
     def get_new_connection(self, conn_params):
         if not self._pool:
             self._pool = self.db_pool.get_pool(**conn_params)
+            _listen_for_debug(self._pool)
 
         # get new connection through pool, not creating a new one outside.
         self._pool_connection = self._pool.connect()
@@ -112,9 +119,10 @@ class DatabaseWrapper(Psycopg2DatabaseWrapper):
             if self.isolation_level != conn.isolation_level:
                 conn.set_session(isolation_level=self.isolation_level)
 
-        django_version = version.get_version_tuple(version.get_version())
-        if django_version >= (3, 1, 1):
+        # once per physical connection, the typecaster stays registered on it between checkouts
+        if REGISTER_JSONB and not self._pool_connection.info.get('jsonb_registered'):
             psycopg2.extras.register_default_jsonb(conn_or_curs=conn, loads=lambda x: x)
+            self._pool_connection.info['jsonb_registered'] = True
 
         return conn
 
@@ -122,8 +130,9 @@ class DatabaseWrapper(Psycopg2DatabaseWrapper):
         return self.timezone
 
     def _commit(self):
-        log_args = (self.__class__.__module__, self.connection, self.is_usable())
-        log.info("%s.DatabaseWrapper._commit -> connection: %s, is_usable: %s", *log_args)
+        if log.isEnabledFor(logging.DEBUG):
+            log_args = (self.__class__.__module__, self.connection, self.is_usable())
+            log.debug("%s.DatabaseWrapper._commit -> connection: %s, is_usable: %s", *log_args)
 
         if self.connection is not None and self.is_usable():
             with self.wrap_database_errors:
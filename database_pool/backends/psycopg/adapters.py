@@ -0,0 +1,56 @@
+"""
+Loaders of the results in binary format(POOL_OPTIONS['BINARY']) returning what Django expects,
+as its text loaders of django.db.backends.postgresql.psycopg_any do:
+    timestamptz     in the time zone of the connection(naive without USE_TZ)
+    jsonb           the document as a str, JSONField decodes it
+    inet, cidr      the address as a str, not an ipaddress object
+"""
+
+from psycopg.errors import DataError
+from psycopg.types.datetime import TimestamptzBinaryLoader
+from psycopg.types.json import JsonbBinaryLoader
+from psycopg.types.net import InetBinaryLoader, CidrBinaryLoader
+
+__all__ = ["register_binary_loaders", "register_binary_tzloader", "BaseBinaryTzLoader"]
+
+
+class BaseBinaryTzLoader(TimestamptzBinaryLoader):
+    timezone = None
+
+    def load(self, data):
+        return super().load(data).replace(tzinfo=self.timezone)
+
+
+class JsonbBinaryTextLoader(JsonbBinaryLoader):
+    def load(self, data):
+        if data and data[0] != 1:
+            raise DataError("unknown jsonb binary format: %s" % data[0])
+
+        return bytes(data[1:]).decode()
+
+
+class InetBinaryTextLoader(InetBinaryLoader):
+    def load(self, data):
+        # an address without prefix is printed as PostgreSQL does: '10.0.0.1', not '10.0.0.1/32'
+        return str(super().load(data))
+
+
+class CidrBinaryTextLoader(CidrBinaryLoader):
+    def load(self, data):
+        return str(super().load(data))
+
+
+def register_binary_tzloader(timezone, context):
+    class SpecificBinaryTzLoader(BaseBinaryTzLoader):
+        pass
+
+    SpecificBinaryTzLoader.timezone = timezone
+    context.adapters.register_loader('timestamptz', SpecificBinaryTzLoader)
+
+
+def register_binary_loaders(timezone, context):
+    """ Register the binary loaders on a connection(or a cursor) """
+    context.adapters.register_loader('jsonb', JsonbBinaryTextLoader)
+    context.adapters.register_loader('inet', InetBinaryTextLoader)
+    context.adapters.register_loader('cidr', CidrBinaryTextLoader)
+    register_binary_tzloader(timezone, context)
@@ -0,0 +1,221 @@
+"""
+PostgreSQL backend pooling psycopg 3 connections by psycopg_pool, instead of SQLAlchemy's QueuePool.
+Django 4.2+ only: older versions run PostgreSQL with psycopg2.
+
+    pip install django-database-conn-pool[psycopg]
+
+settings.py:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'database_pool.backends.psycopg',
+            'NAME': 'my_test',
+            ......
+            'POOL_OPTIONS': {
+                'POOL_SIZE': 10,                # min_size of psycopg_pool
+                'MAX_OVERFLOW': 15,             # max_size = POOL_SIZE + MAX_OVERFLOW
+                'TIMEOUT': 30,                  # seconds waiting for a connection, default: 30
+                'RECYCLE': 60 * 60,             # max_lifetime
+                'IDLE_TIMEOUT': 600,            # max_idle, the pool shrinks back to POOL_SIZE
+                'PRE_PING': True,               # connections idle for more than PRE_PING_IDLE seconds are checked
+                'PRE_PING_IDLE': 5,
+                'BINARY': True,                 # results in binary format, parameters bound server-side
+                'STATEMENT_CACHE_SIZE': 100,    # statements prepared by psycopg(prepare_threshold 5)
+            },
+        }
+    }
+
+Several statements are sent without waiting for each result in a pipeline(psycopg's pipeline mode):
+    from django.db import connection
+
+    with connection.pipeline(), connection.cursor() as cursor:
+        for item in items:
+            cursor.execute("UPDATE app_item SET position = %s WHERE id = %s", [item.position, item.pk])
+
+A statement whose result is read(rows, rowcount, RETURNING) still waits for it: the ORM reads the rowcount
+of its UPDATE and DELETE statements and the rows of its queries, so `filter().update()` gains nothing from
+a pipeline. It pays off for raw statements whose results are read later or not at all.
+
+The pool is psycopg_pool's(backends.psycopg.pool), driven by DBPoolWrapperMixin as the other backends' pools
+are: CHECKOUT_SCOPE, the hooks, the budget, the metrics, the adaptive pre-ping and the reset on return apply.
+"""
+
+from contextlib import contextmanager
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+if django.VERSION < (4, 2):
+    raise ImproperlyConfigured(
+        "database_pool.backends.psycopg requires Django 4.2 or newer(psycopg 3 support), "
+        "use database_pool.backends.postgresql with psycopg2 instead"
+    )
+
+try:
+    import psycopg
+    from psycopg.pq import Format
+    from psycopg.postgres import types as pg_types
+except ImportError as e:
+    raise ImproperlyConfigured("Error loading psycopg(3) module: %s" % e)
+
+from django.db.backends.postgresql.psycopg_any import is_psycopg3, IsolationLevel
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PgDatabaseWrapper,
+    Cursor as PgCursor,
+    ServerBindingCursor as PgServerBindingCursor,
+)
+
+from database_pool.core.cache import get_statement_cache_size
+from database_pool.core.mixins import DBPoolWrapperMixin
+from database_pool.core.pool import Dialect
+from database_pool.core.reset import PsycopgResetOnReturnMixin
+from database_pool.backends.psycopg.adapters import register_binary_loaders, register_binary_tzloader
+from database_pool.backends.psycopg.creation import DatabaseCreation
+from database_pool.backends.psycopg.pool import PsycopgPool, PooledConnectionMixin
+
+if not is_psycopg3:
+    raise ImproperlyConfigured("database_pool.backends.psycopg requires psycopg 3, Django is using psycopg2")
+
+__all__ = ["DatabaseWrapper"]
+
+TIMESTAMPTZ_OID = pg_types['timestamptz'].oid
+
+# executions of a statement before psycopg prepares it, with POOL_OPTIONS['STATEMENT_CACHE_SIZE']
+DEFAULT_PREPARE_THRESHOLD = 5
+
+
+class PooledConnection(PooledConnectionMixin, psycopg.Connection):
+    pass
+
+
+class PipelineCursorMixin:
+    """ In pipeline mode the attributes of a result are only set once the result is received """
+
+    @property
+    def rowcount(self):
+        self._fetch_pipeline()
+        return super().rowcount
+
+    @property
+    def description(self):
+        self._fetch_pipeline()
+        return super().description
+
+
+class Cursor(PipelineCursorMixin, PgCursor):
+    pass
+
+
+class ServerBindingCursor(PipelineCursorMixin, PgServerBindingCursor):
+    pass
+
+
+class PsycopgDatabaseWrapper(PgDatabaseWrapper):
+    """ Django's backend, whose connections are PooledConnections set up once for all their checkouts """
+
+    @property
+    def binary(self):
+        """ POOL_OPTIONS['BINARY']: results in binary format and parameters bound server-side """
+        return bool(self.settings_dict.get('POOL_OPTIONS', {}).get('BINARY', False))
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        options = self.settings_dict['OPTIONS']
+
+        # the cursors of the pipeline mode, binding the parameters server-side for the binary format
+        if 'cursor_factory' not in options:
+            server_side_binding = self.binary or options.get('server_side_binding') is True
+            conn_params['cursor_factory'] = ServerBindingCursor if server_side_binding else Cursor
+
+        # the session of a pooled connection isn't shared(unlike behind PgBouncer), psycopg can prepare
+        # the statements run often
+        if 'prepare_threshold' not in options and get_statement_cache_size(self.settings_dict) > 0:
+            conn_params['prepare_threshold'] = DEFAULT_PREPARE_THRESHOLD
+
+        return conn_params
+
+    def get_isolation_level(self):
+        """ OPTIONS['isolation_level'], None if it's the server's default """
+        options = self.settings_dict['OPTIONS']
+
+        if 'isolation_level' not in options:
+            return None
+
+        try:
+            return IsolationLevel(options['isolation_level'])
+        except ValueError:
+            raise ImproperlyConfigured(
+                "Invalid transaction isolation level %s specified. Use one of the psycopg.IsolationLevel values."
+                % options['isolation_level']
+            )
+
+    def get_new_connection(self, conn_params):
+        # as Django's, but the connection closed by psycopg_pool tells its record(backends.psycopg.pool)
+        isolation_level = self.get_isolation_level()
+        connection = PooledConnection.connect(**conn_params)
+
+        if isolation_level is not None:
+            connection.isolation_level = isolation_level
+
+        statement_cache_size = get_statement_cache_size(self.settings_dict)
+        if statement_cache_size > 0:
+            connection.prepared_max = statement_cache_size
+
+        if self.binary:
+            register_binary_loaders(self.timezone, connection)
+
+        return connection
+
+
+class DatabaseWrapper(DBPoolWrapperMixin, PsycopgDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    # psycopg_pool: the NativePool interface, no SQLAlchemy
+    native_pool = True
+
+    class NativeDialect(PsycopgResetOnReturnMixin, Dialect):
+        pass
+
+    def _get_pool_class(self):
+        return PsycopgPool
+
+    def _get_pool_params(self):
+        pool_params = super()._get_pool_params()
+
+        # POOL_OPTIONS['IDLE_TIMEOUT']: psycopg_pool's max_idle
+        pool_params['idle_timeout'] = self.settings_dict.get('POOL_OPTIONS', {}).get('IDLE_TIMEOUT')
+        pool_params['name'] = self.alias
+        return pool_params
+
+    def get_new_connection(self, conn_params):
+        # Django sets it while connecting, the connection checked out may have been opened by another wrapper
+        self.isolation_level = self.get_isolation_level() or IsolationLevel.READ_COMMITTED
+        return super().get_new_connection(conn_params)
+
+    def create_cursor(self, name=None):
+        cursor = super().create_cursor(name)
+
+        if self.binary:
+            cursor.format = Format.BINARY
+
+            # as Django does for the text loader: only if the connection's time zone differs
+            loader = self.connection.adapters.get_loader(TIMESTAMPTZ_OID, Format.BINARY)
+            if getattr(loader, 'timezone', None) != self.timezone:
+                register_binary_tzloader(self.timezone, cursor)
+
+        return cursor
+
+    @contextmanager
+    def pipeline(self):
+        """ Send the statements run in the block without waiting for each result(psycopg's pipeline mode) """
+        self.ensure_connection()
+
+        with self.wrap_database_errors:
+            with self.connection.pipeline():
+                yield
+
+    def dispose(self):
+        """ Close self.alias's pool and its connections, eg: before the test database is dropped """
+        self.close()
+
+        if self.alias in self.conn_pool:
+            self.conn_pool.pop(self.alias).dispose()
@@ -0,0 +1,161 @@
+"""
+psycopg_pool.ConnectionPool behind the interface of core.pool.NativePool, the pool DBPoolWrapperMixin drives:
+the checkouts are ConnectionRecords whose info lives as long as their connection, and the listeners
+of 'connect', 'checkin', 'invalidate' and 'close'(metrics, budget, adaptive pre-ping) see every connection
+psycopg_pool opens or closes by itself.
+
+psycopg_pool opens the connections in its workers by the mixin's creator(Django's get_new_connection, the
+budget and the hooks), keeps POOL_SIZE of them open, grows up to POOL_SIZE + MAX_OVERFLOW and shrinks
+back after IDLE_TIMEOUT, replaces the connections older than RECYCLE and the broken ones.
+"""
+
+import logging
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from psycopg_pool import ConnectionPool, PoolTimeout as PsycopgPoolTimeout
+except ImportError as e:
+    raise ImproperlyConfigured("Error loading psycopg_pool module: %s" % e)
+
+from database_pool.core.exceptions import PoolTimeout
+from database_pool.core.pool import NativePool, ConnectionRecord
+
+__all__ = ["PsycopgPool", "PsycopgConnectionRecord", "PooledConnectionMixin"]
+
+logger = logging.getLogger("django")
+
+# psycopg_pool's defaults of the options QueuePool doesn't have
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+
+class PooledConnectionMixin:
+    """ Mixin of the connection class: psycopg_pool closes its connections by close(), the record is told """
+    pool_record = None
+
+    def close(self):
+        record = self.pool_record
+
+        # closed by psycopg_pool(expired, shrunk, broken, pool closed): through its record,
+        # which closes the connection again once its listeners ran
+        if record is not None and record.dbapi_connection is self:
+            return record.close()
+
+        return super().close()
+
+
+class PsycopgConnectionRecord(ConnectionRecord):
+    """ A connection of psycopg_pool, opened once by its worker and never reconnected """
+
+    def __init__(self, pool):
+        super().__init__(pool)
+        # given back to psycopg_pool even once closed, it's replaced there
+        self.pooled_connection = None
+
+    def connect(self):
+        super().connect()
+
+        self.pooled_connection = self.dbapi_connection
+        self.dbapi_connection.pool_record = self
+
+    def get_connection(self):
+        return self.dbapi_connection
+
+
+class _RecordConnector:
+    """ The `connection_class` of psycopg_pool: each connection it opens gets its record """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def connect(self, conninfo='', **kwargs):
+        # the connection parameters are the creator's
+        record = PsycopgConnectionRecord(self.pool)
+        record.connect()
+        return record.dbapi_connection
+
+
+class PsycopgPool(NativePool):
+    """ The NativePool interface over a psycopg_pool.ConnectionPool, its waiters are served by psycopg_pool """
+
+    def __init__(self, creator, dialect=None, pool_size=5, max_overflow=10, timeout=None, recycle=-1,
+                 idle_timeout=None, name=None, **kwargs):
+        super().__init__(creator, dialect, pool_size=pool_size, max_overflow=max_overflow, recycle=recycle, **kwargs)
+
+        self._timeout = float(timeout if timeout is not None else DEFAULT_TIMEOUT)
+        self.pool = ConnectionPool(
+            connection_class=_RecordConnector(self),
+            min_size=pool_size,
+            max_size=pool_size + max(max_overflow, 0),
+            timeout=self._timeout,
+            max_lifetime=float(recycle) if recycle > 0 else float('inf'),
+            max_idle=float(idle_timeout if idle_timeout is not None else DEFAULT_IDLE_TIMEOUT),
+            name=name,
+            open=False,
+        )
+        self.pool.open(wait=False)
+
+    def size(self):
+        return self.pool.min_size
+
+    def checkedin(self):
+        return self.pool.get_stats()['pool_available']
+
+    def checkedout(self):
+        stats = self.pool.get_stats()
+        return stats['pool_size'] - stats['pool_available']
+
+    def overflow(self):
+        return self.pool.get_stats()['pool_size'] - self.pool.min_size
+
+    def connect(self):
+        """ :return: the PsycopgConnectionRecord checked out """
+        while True:
+            try:
+                conn = self.pool.getconn()
+            except PsycopgPoolTimeout as exc:
+                raise PoolTimeout(
+                    "Pool limit of size %d overflow %d reached, connection timed out, timeout %s, caused by: %s"
+                    % (self.pool.min_size, self.pool.max_size - self.pool.min_size, self._timeout, exc)
+                ) from exc
+
+            record = conn.pool_record
+
+            if record.starttime >= self._invalidate_time:
+                return record
+
+            # opened before a connection found dead: psycopg_pool opens another one in its place
+            record.invalidate()
+            self.pool.putconn(conn)
+
+    def _return(self, record):
+        """ Reset the record's connection(core.reset), then give it back to psycopg_pool """
+        if record.dbapi_connection is not None:
+            try:
+                self._dialect.do_rollback(record)
+            except Exception as exc:
+                logger.warning("Reset of the connection %s failed, it's closed, caused by: %s",
+                               record.dbapi_connection, exc)
+                record.invalidate(exc)
+
+        self.dispatch('checkin', record.dbapi_connection, record)
+
+        # a closed connection is replaced by psycopg_pool
+        self.pool.putconn(record.pooled_connection)
+
+    def reap(self, idle_timeout, min_idle=0, now=None):
+        # psycopg_pool closes the connections beyond POOL_SIZE idle for longer than IDLE_TIMEOUT by itself
+        return 0
+
+    def resize(self, size, max_overflow=None):
+        if max_overflow is not None:
+            self._max_overflow = max_overflow
+
+        self._size = size
+        self.pool.resize(size, size + max(self._max_overflow, 0))
+        return 0
+
+    def dispose(self):
+        """ Close psycopg_pool and all its connections, the pool can't be used anymore """
+        self.pool.close()
@@ -0,0 +1,343 @@
+"""
+Asyncio-native connection pools, for async views of ASGI deployments.
+
+The connections are handed out to coroutines, one pool per (event loop, alias), without any
+thread hop nor thread-local DatabaseWrapper. Only raw SQL is supported(the ORM is sync):
+
+    from database_pool.core.aio import async_cursor
+
+    async def my_view(request):
+        async with async_cursor('default') as cursor:
+            await cursor.execute("SELECT id, name FROM app_demo_pooldemomodel WHERE size > %s", [100])
+            rows = await cursor.fetchall()
+
+The backend of the alias must provide an `aio` module with `get_async_connection_callbacks(settings_dict)`,
+only `database_pool.backends.postgresql`(psycopg 3) does for now.
+The pool is configured by the same POOL_OPTIONS as the sync one(POOL_SIZE, MAX_OVERFLOW, TIMEOUT, RECYCLE,
+PRE_PING, PRE_PING_IDLE). The pools of a loop are closed with it(by loop.shutdown_asyncgens(), as asyncio.run()
+and the ASGI servers do), or explicitly by `await close_async_pools()`, eg: at the lifespan shutdown.
+"""
+
+import time
+import asyncio
+import logging
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from importlib import import_module
+
+from django.core.exceptions import ImproperlyConfigured
+
+from database_pool.core.exceptions import PoolTimeout
+from database_pool.core.mixins import DBConnectionPool
+
+__all__ = ["AsyncConnectionPool", "get_async_pool", "close_async_pools", "async_connection", "async_cursor"]
+
+logger = logging.getLogger("django")
+
+
+class AsyncConnectionPool:
+    """
+    A pool of `pool_size` connections plus at most `max_overflow` temporary ones,
+    the waiters are served in FIFO order.
+    """
+
+    def __init__(self, creator, ping=None, close=None, pool_size=10, max_overflow=15,
+                 timeout=None, recycle=60 * 60, pre_ping=True, pre_ping_idle=DBConnectionPool.DEFAULT_PRE_PING_IDLE,
+                 alias=None):
+        """
+        :param creator: coroutine function returning a new connection
+        :param ping: coroutine function(connection) -> bool, whether the connection is alive
+        :param close: coroutine function(connection), closing a connection
+        :param pre_ping_idle: as the sync pools, a connection is only pinged at checkout if it stayed idle
+            for more than `pre_ping_idle` seconds, or if its last use ended in an error
+        """
+        self.alias = alias
+        self._creator = creator
+        self._ping = ping
+        self._close = close
+
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping and ping is not None
+        self.pre_ping_idle = float(pre_ping_idle)
+
+        # idle connections: (connection, created at, released at)
+        self._idle = deque()
+        # id(connection) -> created at, of the checked out ones
+        self._in_use = {}
+        # id() of the checked out connections whose use ended in an error, pinged at their next checkout
+        self._ping_needed = set()
+        self._opened = 0
+        self._waiters = deque()
+        self._closed = False
+
+    def status(self):
+        return "AsyncConnectionPool(%s) size: %d, opened: %d, idle: %d, in use: %d, waiters: %d" % (
+            self.alias, self.pool_size, self._opened, len(self._idle), len(self._in_use), len(self._waiters)
+        )
+
+    async def acquire(self, timeout=None):
+        """ Check out a connection, waiting at most `timeout`(default: the pool's TIMEOUT) seconds """
+        if self._closed:
+            raise PoolTimeout("Pool of %s is closed" % self.alias)
+
+        while self._idle and not self._waiters:
+            conn, created_at, released_at = self._idle.pop()
+            ping_needed = id(conn) in self._ping_needed
+            self._ping_needed.discard(id(conn))
+
+            if await self._is_usable(conn, created_at, released_at, ping_needed):
+                self._in_use[id(conn)] = created_at
+                return conn
+
+            await self._discard(conn)
+
+        if self._opened < self.pool_size + self.max_overflow and not self._waiters:
+            return await self._open()
+
+        # wait for a connection being released(or a slot being freed)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            conn = await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout("Pool of %s: no connection available within %ss" % (self.alias, timeout)) from None
+        except asyncio.CancelledError:
+            # cancelled after having been served: give back what it got
+            if waiter.done() and not waiter.cancelled():
+                if waiter.result() is None:
+                    self._slot_freed()
+                else:
+                    asyncio.ensure_future(self.release(waiter.result()))
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        if conn is None:
+            # a slot was freed and reserved for this waiter, open a new connection
+            return await self._open(reserved=True)
+
+        return conn
+
+    async def release(self, conn, ping_needed=False):
+        """ Give a connection back, directly to the first waiter if any """
+        created_at = self._in_use.pop(id(conn), None)
+        if created_at is None:
+            return
+
+        if self._closed or getattr(conn, 'closed', False):
+            self._ping_needed.discard(id(conn))
+            await self._discard(conn)
+            return
+
+        if ping_needed and self._waiters:
+            # its last use failed: checked before being handed over, as acquire() would do
+            if not await self._is_usable(conn, created_at, time.monotonic(), True):
+                await self._discard(conn)
+                return
+
+            ping_needed = False
+
+            if self._closed:
+                await self._discard(conn)
+                return
+
+        if ping_needed:
+            self._ping_needed.add(id(conn))
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                self._in_use[id(conn)] = created_at
+                waiter.set_result(conn)
+                return
+
+        if self._opened > self.pool_size:
+            # an overflow connection
+            self._ping_needed.discard(id(conn))
+            await self._discard(conn)
+        else:
+            self._idle.append((conn, created_at, time.monotonic()))
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        conn = await self.acquire(timeout)
+
+        try:
+            yield conn
+        except BaseException:
+            await self.release(conn, ping_needed=True)
+            raise
+        else:
+            await self.release(conn)
+
+    async def close(self):
+        """ Close the idle connections, the checked out ones are closed when released """
+        self._closed = True
+
+        while self._idle:
+            conn = self._idle.pop()[0]
+            self._ping_needed.discard(id(conn))
+            await self._discard(conn)
+
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(PoolTimeout("Pool of %s is closed" % self.alias))
+
+    async def _open(self, reserved=False):
+        if not reserved:
+            self._opened += 1
+
+        try:
+            conn = await self._creator()
+        except BaseException:
+            self._slot_freed()
+            raise
+
+        self._in_use[id(conn)] = time.monotonic()
+        return conn
+
+    async def _is_usable(self, conn, created_at, released_at, ping_needed=False):
+        now = time.monotonic()
+
+        if self.recycle is not None and self.recycle > -1 and now - created_at > self.recycle:
+            return False
+
+        if self.pre_ping and (ping_needed or now - released_at >= self.pre_ping_idle):
+            try:
+                return await self._ping(conn)
+            except Exception as exc:
+                logger.info("Alias: [%s] async pre-ping failed, caused by: %s", self.alias, exc)
+                return False
+
+        return True
+
+    async def _discard(self, conn):
+        try:
+            if self._close is not None:
+                await self._close(conn)
+        except Exception as exc:
+            logger.warning("Alias: [%s] closing an async connection failed, caused by: %s", self.alias, exc)
+        finally:
+            self._slot_freed()
+
+    def _slot_freed(self):
+        self._opened -= 1
+
+        # a waiter may now open its own connection
+        while self._waiters:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                self._opened += 1
+                waiter.set_result(None)
+                break
+
+
+# event loop -> {alias: AsyncConnectionPool}
+_pools = weakref.WeakKeyDictionary()
+# event loop -> the async generator closing its pools at the loop's shutdown
+_closers = weakref.WeakKeyDictionary()
+
+
+def _get_pool_params(settings_dict):
+    pool_options = settings_dict.get('POOL_OPTIONS', {})
+    params = {}
+
+    for key in ('pool_size', 'max_overflow', 'timeout', 'recycle', 'pre_ping'):
+        default = DBConnectionPool.DEFAULT_POOL_PARAMS[key]
+        params[key] = pool_options.get(key.upper(), default)
+
+    params['pre_ping_idle'] = pool_options.get('PRE_PING_IDLE', DBConnectionPool.DEFAULT_PRE_PING_IDLE)
+    return params
+
+
+async def _close_with_loop():
+    """ Suspended until the loop shuts its async generators down(aclose()), then closes the loop's pools """
+    try:
+        yield
+    finally:
+        await close_async_pools()
+
+
+def _register_loop(loop):
+    closer = _close_with_loop()
+
+    # its first step registers it to the loop's shutdown_asyncgens()(sys.set_asyncgen_hooks)
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+
+    # the loop only keeps a weak reference to it
+    _closers[loop] = closer
+
+
+def get_async_pool(alias='default'):
+    """ The pool of alias bound to the running event loop, created on first use """
+    loop = asyncio.get_running_loop()
+    loop_pools = _pools.get(loop)
+
+    if loop_pools is None:
+        loop_pools = _pools[loop] = {}
+        _register_loop(loop)
+
+    try:
+        return loop_pools[alias]
+    except KeyError:
+        pass
+
+    from django.db import connections
+
+    settings_dict = connections.databases[alias]
+    engine = settings_dict['ENGINE']
+
+    try:
+        aio_module = import_module('%s.aio' % engine)
+    except ImportError:
+        raise ImproperlyConfigured("DATABASES.%s.ENGINE: %s, has no asyncio pool" % (alias, engine)) from None
+
+    callbacks = aio_module.get_async_connection_callbacks(settings_dict)
+    db_pool = AsyncConnectionPool(alias=alias, **callbacks, **_get_pool_params(settings_dict))
+    loop_pools[alias] = db_pool
+
+    logger.info("Alias: [%s]'s asyncio pool has been created: %s", alias, db_pool.status())
+    return db_pool
+
+
+async def close_async_pools():
+    """ Close the pools of the running event loop """
+    loop_pools = _pools.pop(asyncio.get_running_loop(), {})
+
+    for db_pool in list(loop_pools.values()):
+        await db_pool.close()
+
+
+@asynccontextmanager
+async def async_connection(using='default', timeout=None):
+    async with get_async_pool(using).connection(timeout) as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def async_cursor(using='default', timeout=None):
+    async with async_connection(using, timeout) as conn:
+        async with conn.cursor() as cursor:
+            yield cursor
+
+
+def _after_fork_in_child():
+    # the event loops(and the sockets of their pools) belong to the parent process
+    DBConnectionPool().inherited.append((dict(_pools), dict(_closers)))
+    _pools.clear()
+    _closers.clear()
+
+
+DBConnectionPool().fork_callbacks.append(_after_fork_in_child)
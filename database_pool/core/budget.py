@@ -0,0 +1,237 @@
+"""
+Host-wide budget of database connections, shared by all the processes of the host(eg: gunicorn workers).
+
+Every process has its own pools: 32 workers with POOL_SIZE 10 and MAX_OVERFLOW 15 may open 800
+connections against a server accepting 500. With a budget, a new connection is only opened once it
+got a share of the budget, otherwise it waits for one(up to TIMEOUT seconds) instead of being
+refused by the server:
+    'POOL_OPTIONS': {
+        'POOL_SIZE': 10,
+        'MAX_OVERFLOW': 15,
+        'BUDGET': {
+            'MAX_CONNECTIONS': 300,     # connections opened at once by all the processes of the host
+            'NAME': 'db1',              # the aliases sharing the budget, default: HOST:PORT of the alias
+            'TIMEOUT': 10,              # seconds, default: 10
+            'IDLE_TIMEOUT': 60,         # the idle connections are closed to give back their share(core.reaper)
+        },
+    }
+
+A share is a byte of the budget's file(under settings.DATABASE_POOL_BUDGET_DIR) locked by fcntl(),
+so the shares of a process which died are given back by the kernel. It's taken by the creator of
+the pool before connecting, and given back by the pool's close event: recycle, invalidation,
+overflow connection closed at checkin, idle connection reaped...
+"""
+
+import os
+import re
+import time
+import random
+import logging
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.core.exceptions import ImproperlyConfigured
+
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.exceptions import ConnectionBudgetExceeded
+
+__all__ = ["HostBudget", "get_budget", "get_budget_idle_timeout"]
+
+logger = logging.getLogger("django")
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_IDLE_TIMEOUT = 60.0
+# seconds between two attempts of a connection waiting for a share
+RETRY_INTERVAL = 0.05
+
+
+class HostBudget:
+    """ The shares of one budget file, taken and given back by the pools of this process """
+
+    def __init__(self, path, max_connections):
+        self.path = path
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        # the shares held by this process: fcntl() locks are per process, a process locking
+        # the same byte again would succeed
+        self.held = set()
+        # opened once and never closed: closing any descriptor of the file releases all the locks of the process
+        self._fd = None
+        # the pools of this process sharing the budget
+        self.pools = []
+
+    def _get_fd(self):
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        return self._fd
+
+    def try_acquire(self):
+        """ :return: the share taken, None if the budget is exhausted """
+        with self.lock:
+            fd = self._get_fd()
+            # not every process probes the shares in the same order
+            start = random.randrange(self.max_connections)
+
+            for offset in range(self.max_connections):
+                share = (start + offset) % self.max_connections
+
+                if share in self.held:
+                    continue
+
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, share)
+                except OSError:
+                    continue
+
+                self.held.add(share)
+                return share
+
+        return None
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            share = self.try_acquire()
+
+            if share is not None:
+                return share
+
+            # an idle connection of this process gives its share to the one waiting
+            if self._close_idle_connection():
+                continue
+
+            if time.monotonic() >= deadline:
+                raise ConnectionBudgetExceeded(
+                    "No share of the connection budget %s(%d connections) available within %ss"
+                    % (self.path, self.max_connections, timeout)
+                )
+
+            time.sleep(RETRY_INTERVAL)
+
+    def _close_idle_connection(self):
+        """ :return: whether an idle connection of the pools of this process was closed """
+        from database_pool.core.reaper import reap_pool
+
+        for db_pool in list(self.pools):
+            idle = db_pool.checkedin()
+
+            if idle and reap_pool(db_pool, 0, idle - 1):
+                return True
+
+        return False
+
+    def release(self, share):
+        with self.lock:
+            if share not in self.held:
+                return
+
+            self.held.discard(share)
+            fcntl.lockf(self._get_fd(), fcntl.LOCK_UN, 1, share)
+
+    def wrap_creator(self, creator, timeout):
+        """ :return: the creator of a pool taking a share before connecting """
+
+        def create_connection(connection_record):
+            share = self.acquire(timeout)
+
+            try:
+                dbapi_connection = creator()
+            except BaseException:
+                self.release(share)
+                raise
+
+            # the record's info is cleared before it reconnects, after its close event
+            connection_record.info['budget_share'] = share
+            return dbapi_connection
+
+        return create_connection
+
+    def attach(self, db_pool):
+        """ Give the share of a connection back when db_pool closes it """
+        from database_pool.core.pool import listen
+
+        def on_close(dbapi_connection, connection_record):
+            share = connection_record.info.pop('budget_share', None)
+
+            if share is not None:
+                self.release(share)
+
+        listen(db_pool, 'close', on_close)
+        self.pools.append(db_pool)
+
+    def after_fork_in_child(self):
+        # the locks are not inherited by the child, the descriptor is
+        self.lock = threading.Lock()
+        self.held = set()
+        self.pools = []
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget_directory():
+    from django.conf import settings
+
+    directory = getattr(settings, 'DATABASE_POOL_BUDGET_DIR', None)
+    if directory:
+        return directory
+
+    base_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(base_dir, 'django-database-pool-budget-%s' % uid)
+
+
+def get_budget(settings_dict):
+    """ :return: (the budget of POOL_OPTIONS['BUDGET'], its timeout), (None, None) if there is none """
+    options = settings_dict.get('POOL_OPTIONS', {}).get('BUDGET')
+
+    if not options:
+        return None, None
+
+    if fcntl is None:
+        raise ImproperlyConfigured("POOL_OPTIONS['BUDGET'] requires fcntl(POSIX systems only)")
+
+    max_connections = int(options['MAX_CONNECTIONS'])
+    name = options.get('NAME') or '%s:%s' % (settings_dict.get('HOST') or 'localhost', settings_dict.get('PORT') or '')
+    path = os.path.join(get_budget_directory(), '%s.budget' % re.sub(r'[^\w.-]', '_', str(name)))
+
+    with _budgets_lock:
+        budget = _budgets.get(path)
+
+        if budget is None:
+            budget = _budgets[path] = HostBudget(path, max_connections)
+        elif budget.max_connections != max_connections:
+            logger.warning("Connection budget %s: MAX_CONNECTIONS %s ignored, already %s",
+                           path, max_connections, budget.max_connections)
+
+    return budget, float(options.get('TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def get_budget_idle_timeout(settings_dict):
+    """ Seconds after which an idle connection gives its share back, None without budget """
+    options = settings_dict.get('POOL_OPTIONS', {}).get('BUDGET')
+
+    if not options:
+        return None
+
+    return float(options.get('IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT))
+
+
+def _after_fork_in_child():
+    global _budgets_lock
+    _budgets_lock = threading.Lock()
+
+    for budget in _budgets.values():
+        budget.after_fork_in_child()
+
+
+DBConnectionPool().fork_callbacks.append(_after_fork_in_child)
@@ -0,0 +1,203 @@
+"""
+Server-side prepared statements, cached per pooled DB-API connection.
+
+A pooled connection lives for hours, so the statements it prepared can be reused by every request
+checking it out. The cache is kept in the pool record's info of the connection: SQLAlchemy clears
+it when the connection is recycled, invalidated or reconnected, so a cache never outlives its session.
+
+The size is configured per alias, 0 disables the cache:
+    'POOL_OPTIONS': {
+        'STATEMENT_CACHE_SIZE': 100,    # PostgreSQL default: 0, Oracle default: 20
+    }
+
+    PostgreSQL  the statements of Django(with positional parameters) are run by PREPARE/EXECUTE,
+                new statements are only prepared in autocommit mode(outside transactions), so that
+                a statement which can't be prepared never aborts a transaction. The named(server-side)
+                cursors of QuerySet.iterator() run their statement as is: DECLARE takes no EXECUTE.
+                Not for PgBouncer in transaction pooling mode: the sessions are shared.
+    Oracle      cx_Oracle's own statement cache(`stmtcachesize`) of the connection, 0 disables it.
+    MySQL       not supported: neither PyMySQL nor mysqlclient can run server-side statements.
+
+Hits and misses are counted in the alias's metrics(statement_cache_hits, statement_cache_misses).
+"""
+
+import re
+import logging
+from collections import OrderedDict
+
+__all__ = ["StatementCache", "PostgresStatementCache", "OracleStatementCache", "get_statement_cache_size"]
+
+logger = logging.getLogger("django")
+
+# the statements PostgreSQL can prepare
+_PREPARABLE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b', re.IGNORECASE)
+# Django's placeholders and escaped percent signs of a statement with parameters
+_PLACEHOLDER = re.compile(r'%(s|%)')
+
+# SQLSTATE of a prepared statement gone(eg: DEALLOCATE ALL, DISCARD ALL) or of a plan invalidated
+# by a schema change("cached plan must not change result type")
+_STALE_STATEMENT_CODES = ('26000', '0A000')
+
+
+def get_statement_cache_size(settings_dict, default=0):
+    return int(settings_dict.get('POOL_OPTIONS', {}).get('STATEMENT_CACHE_SIZE', default))
+
+
+class StatementCache:
+    """ LRU of the statements prepared on one DB-API connection """
+    default_size = 0
+    # whether the cache runs the statements(a Django execute wrapper) or the driver does it alone
+    wraps_execute = False
+
+    def __init__(self, dbapi_connection, size, metrics=None):
+        self.dbapi_connection = dbapi_connection
+        self.size = size
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+
+        # sql -> name of its prepared statement, None if it can't be prepared
+        self.statements = OrderedDict()
+        self._counter = 0
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if self.metrics is not None:
+            self.metrics.incr('statement_cache_hits' if hit else 'statement_cache_misses')
+
+    def lookup(self, sql):
+        """ :return: (found, name of the prepared statement or None) """
+        try:
+            name = self.statements[sql]
+        except KeyError:
+            return False, None
+
+        self.statements.move_to_end(sql)
+        return True, name
+
+    def store(self, sql, prepared=True):
+        """ Name a new statement, :return: (its name, the name of the statement evicted or None) """
+        name = None
+
+        if prepared:
+            self._counter += 1
+            name = 'dbpool_%d' % self._counter
+
+        self.statements[sql] = name
+        evicted = None
+
+        if len(self.statements) > self.size:
+            _, evicted = self.statements.popitem(last=False)
+
+        return name, evicted
+
+    def forget(self, sql):
+        return self.statements.pop(sql, None)
+
+    def clear(self):
+        """ The session dropped all its prepared statements(eg: DISCARD ALL) """
+        self.statements.clear()
+
+
+class PostgresStatementCache(StatementCache):
+    """ Run Django's statements by PREPARE/EXECUTE, as an execute wrapper of the DatabaseWrapper """
+    wraps_execute = True
+
+    def __call__(self, execute, sql, params, many, context):
+        if many or not isinstance(params, (list, tuple)) or not _PREPARABLE.match(sql):
+            return execute(sql, params, many, context)
+
+        # a named cursor runs one statement only, as DECLARE ... CURSOR FOR <SELECT or VALUES>
+        if getattr(context['cursor'].cursor, 'name', None):
+            return execute(sql, params, many, context)
+
+        found, name = self.lookup(sql)
+        self.count(found and name is not None)
+
+        if not found:
+            # a new statement can't abort a transaction if PREPARE fails
+            if not context['connection'].get_autocommit():
+                return execute(sql, params, many, context)
+
+            name = self._prepare(context['cursor'].cursor, sql, len(params))
+
+        if name is None:
+            return execute(sql, params, many, context)
+
+        arguments = ' (%s)' % ', '.join(['%s'] * len(params)) if params else ''
+
+        try:
+            return execute('EXECUTE %s%s' % (name, arguments), params, many, context)
+        except Exception as exc:
+            if getattr(exc.__cause__ or exc, 'pgcode', None) not in _STALE_STATEMENT_CODES:
+                raise
+
+            # prepared again at its next use
+            self.forget(sql)
+
+            # a failed statement in autocommit mode changed nothing, it can be run again
+            if not context['connection'].get_autocommit():
+                raise
+
+            return execute(sql, params, many, context)
+
+    def _prepare(self, cursor, sql, num_params):
+        """ :return: name of the statement prepared, None if it can't be """
+        converted, placeholders = self._convert(sql)
+
+        if placeholders != num_params:
+            self.store(sql, prepared=False)
+            return None
+
+        name, evicted = self.store(sql)
+
+        try:
+            if evicted is not None:
+                cursor.execute('DEALLOCATE %s' % evicted)
+
+            cursor.execute('PREPARE %s AS %s' % (name, converted))
+        except Exception as exc:
+            # eg: the type of a parameter can't be inferred(SELECT %s), an unknown table...
+            logger.debug("Statement can't be prepared, run as is: %s, caused by: %s", sql, exc)
+            self.statements[sql] = None
+            return None
+
+        return name
+
+    @staticmethod
+    def _convert(sql):
+        """ Django's %s placeholders to $1, $2..., :return: (sql, number of placeholders) """
+        counter = [0]
+
+        def replace(match):
+            if match.group(1) == '%':
+                return '%'
+
+            counter[0] += 1
+            return '$%d' % counter[0]
+
+        return _PLACEHOLDER.sub(replace, sql), counter[0]
+
+
+class OracleStatementCache(StatementCache):
+    """
+    cx_Oracle caches the statements of the connection by itself, only its size is set,
+    again by the backend once Django's init_connection_state() reset it
+    """
+    default_size = 20
+
+    def __init__(self, dbapi_connection, size, metrics=None):
+        super().__init__(dbapi_connection, size, metrics)
+        dbapi_connection.stmtcachesize = size
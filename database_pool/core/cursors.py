@@ -0,0 +1,105 @@
+import re
+
+from django.db.backends.utils import CursorWrapper, CursorDebugWrapper
+
+__all__ = ["SESSION_STATE_RE", "changes_session_state", "SessionStateCursorWrapper",
+           "SessionStateCursorDebugWrapper", "TransactionScopedCursorWrapper", "TransactionScopedCursorDebugWrapper"]
+
+# Statements leaving state in the database session beyond the current transaction,
+# a connection which ran one of them must not be shared with other requests.
+SESSION_STATE_RE = re.compile(
+    r"^\s*(SET\b|RESET\b|CREATE\s+(GLOBAL\s+|LOCAL\s+)?TEMP|DECLARE\b|LISTEN\b|PREPARE\b|LOCK\b|USE\b)"
+    r"|\b(pg_advisory_lock|pg_advisory_lock_shared|GET_LOCK|set_config|DBMS_SESSION)\b",
+    re.IGNORECASE
+)
+# lower-cased, one of them is in every statement SESSION_STATE_RE finds beyond its first words
+SESSION_STATE_CALLS = ('pg_advisory_lock', 'get_lock', 'set_config', 'dbms_session')
+
+
+def changes_session_state(sql):
+    """
+    Whether `sql` leaves state in the session. Only str statements are checked(not eg: psycopg2's sql.Composed),
+    and the whole statement is only searched if it names one of SESSION_STATE_CALLS.
+    """
+    if not isinstance(sql, str):
+        return False
+
+    if SESSION_STATE_RE.match(sql):
+        return True
+
+    lowered = sql.lower()
+    return any(call in lowered for call in SESSION_STATE_CALLS) and SESSION_STATE_RE.search(sql) is not None
+
+
+class SessionStateCursorMixin:
+    """
+    Cursor telling the database wrapper when the session state is changed(pin_connection()):
+    the connection must not be given back before close(), and its session is reset at checkin.
+    """
+
+    def execute(self, sql, params=None):
+        if not self.db._pinned and changes_session_state(sql):
+            self.db.pin_connection()
+
+        return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        if not self.db._pinned and changes_session_state(sql):
+            self.db.pin_connection()
+
+        return super().executemany(sql, param_list)
+
+    def callproc(self, procname, params=None, kparams=None):
+        # procedures may change anything in the session
+        self.db.pin_connection()
+        return super().callproc(procname, params, kparams)
+
+    def _execute_with_wrappers(self, sql, params, many, executor):
+        # the pool's wrappers run innermost, the ones of db.execute_wrapper() blocks around them
+        return super()._execute_with_wrappers(sql, params, many, self.db._wrap_executor(executor))
+
+
+class TransactionScopedCursorMixin(SessionStateCursorMixin):
+    """
+    Cursor of a connection in CHECKOUT_SCOPE 'transaction' mode: the database wrapper keeps track of its
+    open cursors, so the pooled connection is only given back once the last one is closed(close() or the
+    `with` block). A cursor never closed, eg: `self.cursor().execute("BEGIN")` of sqlite, is forgotten once
+    collected, and the connection is given back by the next closing cursor, transaction or close().
+    The garbage collector never gives it back itself: it may run in another thread.
+    """
+
+    def __init__(self, cursor, db):
+        super().__init__(cursor, db)
+
+        # the checked out connection this cursor belongs to
+        self.pool_connection = db.connection
+        db._cursor_opened(self)
+
+    def close(self):
+        try:
+            return self.cursor.close()
+        finally:
+            self._forget()
+
+    def _forget(self):
+        pool_connection = self.__dict__.get('pool_connection')
+
+        if pool_connection is not None:
+            self.pool_connection = None
+            self.db._cursor_closed(self, pool_connection)
+
+
+class SessionStateCursorWrapper(SessionStateCursorMixin, CursorWrapper):
+    pass
+
+
+class SessionStateCursorDebugWrapper(SessionStateCursorMixin, CursorDebugWrapper):
+    pass
+
+
+class TransactionScopedCursorWrapper(TransactionScopedCursorMixin, CursorWrapper):
+    pass
+
+
+class TransactionScopedCursorDebugWrapper(TransactionScopedCursorMixin, CursorDebugWrapper):
+    pass
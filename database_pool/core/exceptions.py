@@ -1,2 +1,10 @@
 class PoolDoesNotExist(Exception):
     pass
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionBudgetExceeded(PoolTimeout):
+    """ No share of the host's connection budget(POOL_OPTIONS['BUDGET']) was given back in time """
@@ -0,0 +1,159 @@
+"""
+Per-alias pool event hooks: spans of checkout, connect, ping, query and checkin.
+
+Nothing is measured, formatted or allocated for an alias without subscribers, the pool only
+looks its hooks up in a dict. With subscribers, the checkouts are sampled: the spans of a sampled
+checkout(its ping, its queries and its checkin) are all delivered, the others are never built.
+
+    from database_pool.core.hooks import PoolHookRegistry
+
+    def on_span(span):
+        print(span.name, span.alias, span.duration, span.attributes)
+
+    PoolHookRegistry().subscribe('default', on_span, sample_rate=0.1)
+
+or, to export them to OpenTelemetry:
+
+    PoolHookRegistry().subscribe('default', opentelemetry_subscriber(), sample_rate=0.1)
+"""
+
+import time
+import random
+import logging
+import threading
+
+__all__ = ["Span", "PoolHooks", "PoolHookRegistry", "opentelemetry_subscriber"]
+
+logger = logging.getLogger("django")
+
+
+class Span:
+    """ One finished operation of a pool, the times are time.time() seconds """
+    __slots__ = ('name', 'alias', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name, alias, start, end, attributes, error=None):
+        self.name = name
+        self.alias = alias
+        self.start = start
+        self.end = end
+        self.attributes = attributes
+        self.error = error
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return '<Span %s[%s] %.6fs %s>' % (self.name, self.alias, self.duration, self.attributes)
+
+
+class PoolHooks:
+    """ Subscribers of one alias's spans """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.subscribers = []
+        self.sample_rate = 1.0
+        # the only attribute read on the hot path
+        self.enabled = False
+
+    def subscribe(self, callback, sample_rate=None):
+        if sample_rate is not None:
+            self.sample_rate = float(sample_rate)
+
+        self.subscribers = self.subscribers + [callback]
+        self.enabled = self.sample_rate > 0
+
+    def unsubscribe(self, callback):
+        self.subscribers = [subscriber for subscriber in self.subscribers if subscriber != callback]
+        self.enabled = bool(self.subscribers) and self.sample_rate > 0
+
+    def sample(self):
+        """ Whether the next checkout is traced """
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def emit(self, name, duration, error=None, **attributes):
+        """ Deliver the span of an operation which has just finished and lasted `duration` seconds """
+        end = time.time()
+        span = Span(name, self.alias, end - duration, end, attributes, error)
+
+        for subscriber in self.subscribers:
+            try:
+                subscriber(span)
+            except Exception as exc:
+                logger.error("Alias: [%s] pool hook %r failed, caused by: %s", self.alias, subscriber, exc)
+
+    def trace_query(self, execute, sql, params, many, context):
+        """ Execute wrapper of the queries of a traced checkout """
+        start = time.perf_counter()
+        error = None
+
+        try:
+            return execute(sql, params, many, context)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.emit('query', time.perf_counter() - start, error, statement=sql, many=many)
+
+
+class PoolHookRegistry(dict):
+    """ alias -> PoolHooks, the aliases never subscribed to have no entry """
+
+    def __new__(cls, *args, **kwargs):
+        if not hasattr(cls, "_instance"):
+            cls._instance = super(PoolHookRegistry, cls).__new__(cls, *args, **kwargs)
+            cls._instance.lock = threading.Lock()
+
+        return cls._instance
+
+    def subscribe(self, alias, callback, sample_rate=None):
+        """
+        Call `callback(span)` for the spans of alias's sampled checkouts,
+        sample_rate(0..1) applies to all the subscribers of alias
+        """
+        with self.lock:
+            hooks = self.get(alias)
+
+            if hooks is None:
+                hooks = self[alias] = PoolHooks(alias)
+
+            hooks.subscribe(callback, sample_rate)
+
+        return hooks
+
+    def unsubscribe(self, alias, callback):
+        with self.lock:
+            hooks = self.get(alias)
+
+            if hooks is not None:
+                hooks.unsubscribe(callback)
+
+
+def opentelemetry_subscriber(tracer=None):
+    """ A subscriber exporting the spans to OpenTelemetry(opentelemetry-api is required) """
+    try:
+        from opentelemetry import trace
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("Error loading opentelemetry module: %s" % e)
+
+    tracer = tracer or trace.get_tracer('database_pool')
+
+    def subscriber(span):
+        attributes = {'db.pool.alias': span.alias}
+        attributes.update(('db.pool.%s' % key, value) for key, value in span.attributes.items()
+                          if key != 'statement')
+
+        if 'statement' in span.attributes:
+            attributes['db.statement'] = span.attributes['statement']
+
+        otel_span = tracer.start_span('db.pool.%s' % span.name, start_time=int(span.start * 1e9),
+                                      attributes=attributes)
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(trace.Status(trace.StatusCode.ERROR, str(span.error)))
+
+        otel_span.end(end_time=int(span.end * 1e9))
+
+    return subscriber
@@ -0,0 +1,516 @@
+"""
+Per-alias pool metrics.
+
+The hot path(checkout and checkin) only updates a few integers under a short lock of its alias.
+Every process publishes a snapshot of its metrics, at most once per FLUSH_INTERVAL, into its own
+shared-memory segment(a mmap'ed file under METRICS_DIR), so `manage.py pool_stats` can aggregate
+the metrics of all worker processes. The last checkins of a burst are published by a timer.
+
+settings.py:
+    DATABASE_POOL_METRICS_DIR = '/dev/shm/my-project-db-pool'   # optional, default: per user and project
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import errno
+import atexit
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+
+__all__ = ["PoolMetrics", "PoolMetricsRegistry", "MetricsSegment", "render_prometheus", "aggregate_snapshots",
+           "histogram_quantile"]
+
+logger = logging.getLogger("django")
+
+# upper bounds(seconds) of the histogram buckets, the last bucket is +Inf
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HOLD_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COUNTERS = ('checkouts', 'connects', 'recycles', 'invalidations', 'pre_ping_failures', 'pings', 'idle_closed',
+            'statement_cache_hits', 'statement_cache_misses')
+
+# weight of the latest checkout in the moving average of the checkout wait
+EWMA_ALPHA = 0.2
+
+FLUSH_INTERVAL = 1.0
+SEGMENT_SIZE = 256 * 1024
+
+# segment layout: sequence(even when stable) + payload length + json payload
+_HEADER = struct.Struct('QI')
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class PoolMetrics:
+    """ Metrics of one alias's pool """
+
+    def __init__(self, alias, pool=None):
+        self.alias = alias
+        self.pool = pool
+        self.lock = threading.Lock()
+
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.hold = Histogram(HOLD_BUCKETS)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+        # exponentially weighted moving average of the recent checkout waits
+        self.wait_ewma = 0.0
+
+    def observe_checkout(self, wait):
+        with self.lock:
+            self.checkout_wait.observe(wait)
+            self.counters['checkouts'] += 1
+            self.wait_ewma += EWMA_ALPHA * (wait - self.wait_ewma)
+
+    def observe_checkin(self, hold):
+        with self.lock:
+            self.hold.observe(hold)
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def gauges(self):
+        """ Read from the pool itself, only when a snapshot is taken """
+        db_pool = self.pool
+
+        if db_pool is None:
+            return {'size': 0, 'in_use': 0, 'idle': 0, 'overflow': 0}
+
+        return {
+            'size': db_pool.size(),
+            'in_use': db_pool.checkedout(),
+            'idle': db_pool.checkedin(),
+            'overflow': max(db_pool.overflow(), 0),
+        }
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {
+                'checkout_wait': self.checkout_wait.snapshot(),
+                'hold': self.hold.snapshot(),
+                'counters': dict(self.counters),
+                'wait_ewma': self.wait_ewma,
+            }
+
+        snapshot['gauges'] = self.gauges()
+        return snapshot
+
+    def attach(self, db_pool):
+        """ Count connects, recycles, invalidations and pre-ping failures by the events of the pool """
+        from database_pool.core.pool import listen, is_native_pool, DisconnectionError
+
+        if is_native_pool(db_pool):
+            disconnection_error = DisconnectionError
+        else:
+            from sqlalchemy.exc import DisconnectionError as disconnection_error
+
+        self.pool = db_pool
+
+        def on_connect(dbapi_connection, connection_record):
+            record_info = connection_record.record_info
+
+            if not record_info.get('connected'):
+                record_info['connected'] = True
+                self.incr('connects')
+            elif record_info.pop('invalidated', False):
+                self.incr('connects')
+            else:
+                # the record reconnected without being invalidated: recycled
+                self.incr('connects')
+                self.incr('recycles')
+
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            connection_record.record_info['invalidated'] = True
+            self.incr('invalidations')
+
+            # a failed pre-ping is raised as a DisconnectionError by the pool
+            if isinstance(exception, disconnection_error):
+                self.incr('pre_ping_failures')
+
+        listen(db_pool, 'connect', on_connect)
+        listen(db_pool, 'invalidate', on_invalidate)
+
+
+class MetricsSegment:
+    """ The shared-memory segment where one process publishes its snapshot """
+
+    def __init__(self, directory, pid=None):
+        self.directory = directory
+        self.pid = pid or os.getpid()
+        self.path = os.path.join(directory, '%s.stats' % self.pid)
+        self.sequence = 0
+        self._mmap = None
+        # one writer at a time, or the readers could see an even sequence over a torn payload
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_directory(cls):
+        """ settings.DATABASE_POOL_METRICS_DIR, by default a directory per user and project """
+        from django.conf import settings
+
+        directory = getattr(settings, 'DATABASE_POOL_METRICS_DIR', None)
+        if directory:
+            return directory
+
+        base_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        uid = os.getuid() if hasattr(os, 'getuid') else 0
+        return os.path.join(base_dir, 'django-database-pool-%s-%s' % (uid, get_project_key()))
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(self.path, 'wb') as fp:
+            fp.truncate(SEGMENT_SIZE)
+
+        with open(self.path, 'r+b') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), SEGMENT_SIZE)
+
+    def write(self, snapshot):
+        payload = json.dumps({'pid': self.pid, 'time': time.time(), 'pools': snapshot}).encode()
+
+        if len(payload) > SEGMENT_SIZE - _HEADER.size:
+            logger.warning("Pool metrics snapshot is too large to be published: %d bytes", len(payload))
+            return
+
+        with self.lock:
+            if self._mmap is None:
+                self.open()
+
+            # seqlock: an odd sequence tells the readers a write is in progress
+            self.sequence += 1
+            _HEADER.pack_into(self._mmap, 0, self.sequence, 0)
+            self._mmap[_HEADER.size:_HEADER.size + len(payload)] = payload
+            self.sequence += 1
+            _HEADER.pack_into(self._mmap, 0, self.sequence, len(payload))
+
+    def close(self, unlink=True):
+        with self.lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+        if unlink:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def read(path, retries=10):
+        with open(path, 'rb') as fp:
+            data = fp.read()
+
+        for _ in range(retries):
+            if len(data) < _HEADER.size:
+                return None
+
+            sequence, length = _HEADER.unpack_from(data, 0)
+            if sequence and sequence % 2 == 0:
+                payload = data[_HEADER.size:_HEADER.size + length]
+
+                with open(path, 'rb') as fp:
+                    if _HEADER.unpack_from(fp.read(_HEADER.size), 0)[0] == sequence:
+                        try:
+                            return json.loads(payload.decode())
+                        except ValueError:
+                            # written again between the two reads of the header
+                            pass
+
+            time.sleep(0.001)
+            with open(path, 'rb') as fp:
+                data = fp.read()
+
+        return None
+
+    @classmethod
+    def read_all(cls, directory=None, cleanup=True):
+        """ Snapshots of all living processes, the segments of dead processes are removed """
+        directory = directory or cls.get_directory()
+        snapshots = []
+
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return snapshots
+
+        for name in names:
+            if not name.endswith('.stats'):
+                continue
+
+            path = os.path.join(directory, name)
+            pid = int(name.split('.')[0])
+
+            if not _pid_exists(pid):
+                if cleanup:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                continue
+
+            snapshot = cls.read(path)
+            if snapshot:
+                snapshots.append(snapshot)
+
+        return snapshots
+
+
+def get_project_key():
+    """ Short hash of the project's directory(the one of its settings module), so that projects don't mix """
+    from django.conf import settings
+
+    module = sys.modules.get(getattr(settings, 'SETTINGS_MODULE', None) or '')
+    path = getattr(module, '__file__', None)
+    root = os.path.dirname(os.path.realpath(path)) if path else os.getcwd()
+
+    return hashlib.sha1(root.encode()).hexdigest()[:12]
+
+
+def _pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+
+    return True
+
+
+class PoolMetricsRegistry(dict):
+    """ alias -> PoolMetrics of the current process """
+
+    def __new__(cls, *args, **kwargs):
+        if not hasattr(cls, "_instance"):
+            cls._instance = super(PoolMetricsRegistry, cls).__new__(cls, *args, **kwargs)
+            cls._instance.lock = threading.Lock()
+            cls._instance.segment = None
+            cls._instance.last_flush = 0.0
+            # taken by the thread publishing the snapshot
+            cls._instance.flush_lock = threading.Lock()
+            # publishes the checkins which came too soon after the last flush
+            cls._instance.timer = None
+
+            # a forked process starts with empty metrics and its own segment
+            from database_pool.core.mixins import DBConnectionPool
+            DBConnectionPool().fork_callbacks.append(cls._instance.after_fork_in_child)
+
+        return cls._instance
+
+    def get_or_create(self, alias):
+        try:
+            return self[alias]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if alias not in self:
+                self[alias] = PoolMetrics(alias)
+
+        return self[alias]
+
+    def snapshot(self):
+        return {alias: metrics.snapshot() for alias, metrics in list(self.items())}
+
+    def maybe_flush(self, now):
+        """
+        Called on checkin(time.perf_counter() time): publish the snapshot at most once per FLUSH_INTERVAL,
+        the checkins coming sooner are published by the timer
+        """
+        if now - self.last_flush < FLUSH_INTERVAL:
+            self._schedule_flush()
+            return
+
+        # another thread is publishing, maybe a snapshot taken before this checkin
+        if not self.flush_lock.acquire(blocking=False):
+            self._schedule_flush()
+            return
+
+        try:
+            if now - self.last_flush >= FLUSH_INTERVAL:
+                self._flush()
+        finally:
+            self.flush_lock.release()
+
+    def flush(self):
+        with self.flush_lock:
+            self._flush()
+
+    def _flush(self):
+        self.last_flush = time.perf_counter()
+
+        try:
+            if self.segment is None:
+                self.segment = MetricsSegment(MetricsSegment.get_directory())
+            self.segment.write(self.snapshot())
+        except Exception as exc:
+            logger.warning("Pool metrics couldn't be published, caused by: %s", exc)
+
+    def _schedule_flush(self):
+        if self.timer is not None:
+            return
+
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(FLUSH_INTERVAL, self._flush_by_timer)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _flush_by_timer(self):
+        self.timer = None
+        self.flush()
+
+    def to_prometheus(self):
+        return render_prometheus(self.snapshot())
+
+    def after_fork_in_child(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        # the parent's timer thread doesn't exist in the child
+        self.timer = None
+        self.clear()
+
+        # the parent's segment belongs to the parent
+        if self.segment is not None:
+            self.segment.close(unlink=False)
+            self.segment = None
+        self.last_flush = 0.0
+
+
+def aggregate_snapshots(process_snapshots):
+    """ Sum the per-process snapshots(as returned by MetricsSegment.read_all) by alias """
+    pools = {}
+
+    for process_snapshot in process_snapshots:
+        for alias, snapshot in process_snapshot['pools'].items():
+            total = pools.get(alias)
+
+            if total is None:
+                pools[alias] = json.loads(json.dumps(snapshot))
+                pools[alias]['processes'] = 1
+                continue
+
+            total['processes'] += 1
+
+            for histogram in ('checkout_wait', 'hold'):
+                total[histogram]['counts'] = [a + b for a, b in zip(total[histogram]['counts'],
+                                                                    snapshot[histogram]['counts'])]
+                total[histogram]['sum'] += snapshot[histogram]['sum']
+                total[histogram]['count'] += snapshot[histogram]['count']
+
+            for section in ('counters', 'gauges'):
+                for key, value in snapshot[section].items():
+                    total[section][key] = total[section].get(key, 0) + value
+
+    return pools
+
+
+def histogram_quantile(histogram, quantile):
+    """ Estimate a quantile from a histogram snapshot: the upper bound of the bucket reaching it """
+    if not histogram['count']:
+        return None
+
+    rank = quantile * histogram['count']
+    cumulative = 0
+
+    for bound, count in zip(list(histogram['buckets']) + [float('inf')], histogram['counts']):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+
+    return float('inf')
+
+
+def _format_float(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+def _escape_label(value):
+    # the text format's escapes of a label value: backslash, double-quote and line feed
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(snapshots, prefix='django_db_pool'):
+    """
+    Render snapshots in Prometheus text format(version 0.0.4).
+    :param snapshots: dict of alias -> snapshot
+    """
+    lines = []
+
+    def series(alias, extra=None):
+        labels = [('alias', alias)] + (extra or [])
+        return '{%s}' % ','.join('%s="%s"' % (key, _escape_label(value)) for key, value in labels)
+
+    def items():
+        return sorted(snapshots.items())
+
+    for name, help_text in [('checkout_wait', 'Time spent waiting for a connection from the pool.'),
+                            ('hold', 'Time a connection was held before being returned to the pool.')]:
+        metric = '%s_%s_seconds' % (prefix, name)
+        lines.append('# HELP %s %s' % (metric, help_text))
+        lines.append('# TYPE %s histogram' % metric)
+
+        for alias, snapshot in items():
+            histogram = snapshot[name]
+            cumulative = 0
+
+            for bound, count in zip(list(histogram['buckets']) + [float('inf')], histogram['counts']):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (metric, series(alias, [('le', _format_float(bound))]), cumulative))
+
+            lines.append('%s_sum%s %s' % (metric, series(alias), _format_float(histogram['sum'])))
+            lines.append('%s_count%s %d' % (metric, series(alias), histogram['count']))
+
+    metric = '%s_connections' % prefix
+    lines.append('# HELP %s Connections of the pool by state.' % metric)
+    lines.append('# TYPE %s gauge' % metric)
+    for alias, snapshot in items():
+        for state in ('in_use', 'idle', 'overflow'):
+            lines.append('%s%s %d' % (metric, series(alias, [('state', state)]), snapshot['gauges'][state]))
+
+    metric = '%s_size' % prefix
+    lines.append('# HELP %s Configured size of the pool.' % metric)
+    lines.append('# TYPE %s gauge' % metric)
+    for alias, snapshot in items():
+        lines.append('%s%s %d' % (metric, series(alias), snapshot['gauges']['size']))
+
+    for counter in COUNTERS:
+        metric = '%s_%s_total' % (prefix, counter)
+        lines.append('# TYPE %s counter' % metric)
+
+        for alias, snapshot in items():
+            lines.append('%s%s %d' % (metric, series(alias), snapshot['counters'].get(counter, 0)))
+
+    return '\n'.join(lines) + '\n'
+
+
+def _close_segment_at_exit():
+    registry = PoolMetricsRegistry._instance if hasattr(PoolMetricsRegistry, '_instance') else None
+
+    if registry is not None and registry.segment is not None and registry.segment.pid == os.getpid():
+        registry.segment.close()
+
+
+atexit.register(_close_segment_at_exit)
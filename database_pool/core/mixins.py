@@ -1,18 +1,103 @@
+import os
+import time
+import weakref
 import logging
+import functools
 import threading
 from copy import deepcopy
-from sqlalchemy import pool
+
+from django.conf import settings
 
 try:
     from django.utils.translation import ugettext_lazy as _
 except ImportError:
     from django.utils.translation import gettext_lazy as _
 
+from database_pool.core.cache import get_statement_cache_size
 from database_pool.core.exceptions import PoolDoesNotExist
+from database_pool.core.hooks import PoolHookRegistry
+from database_pool.core.metrics import PoolMetricsRegistry
+from database_pool.core.pool import ConnectionProxy, ConnectionRecord, listen, disconnection_error, is_native_pool
+from database_pool.middleware import current_profiling
+from database_pool.core.cursors import (
+    SessionStateCursorWrapper, SessionStateCursorDebugWrapper,
+    TransactionScopedCursorWrapper, TransactionScopedCursorDebugWrapper,
+)
 
 __all__ = ["DBPoolWrapperMixin"]
 
 
+def _detach_socket(dbapi_connection):
+    """
+    Point the descriptor of a connection inherited from the parent process to /dev/null:
+    the goodbye of the driver closing it reaches nobody, the parent's session on the socket is left alone.
+    :return: False if the connection has no descriptor(fileno()) to detach
+    """
+    try:
+        fd = dbapi_connection.fileno()
+    except Exception:
+        return False
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+
+    try:
+        os.dup2(devnull, fd)
+    except OSError:
+        return False
+    finally:
+        os.close(devnull)
+
+    return True
+
+
+def _idle_connections(db_pool):
+    """ The DB-API connections idle in a NativePool or a QueuePool, None: another kind of pool """
+    if is_native_pool(db_pool):
+        records = db_pool._idle
+    else:
+        records = getattr(getattr(db_pool, '_pool', None), 'queue', None)
+
+        if records is None:
+            return None
+
+    return [record.dbapi_connection for record in records if record.dbapi_connection is not None]
+
+
+def _close_inherited(inherited):
+    """
+    Close a pool or a checked out connection inherited from the parent process, once its sockets are detached.
+    :return: False if they can't be, `inherited` must stay referenced then: never closed, even by the
+    garbage collector
+    """
+    dbapi_connection = getattr(inherited, 'dbapi_connection', None)
+
+    if dbapi_connection is None:
+        # a pool: its idle connections, the checked out ones come by DBConnectionPool.inherit()
+        connections = _idle_connections(inherited)
+
+        if connections is None:
+            return False
+    elif not _detach_socket(dbapi_connection):
+        return False
+    elif isinstance(inherited, ConnectionProxy):
+        # its finalizer ignores the connections of another process
+        connections = [dbapi_connection]
+    else:
+        # a _ConnectionFairy: closed, then given back to the parent's pool without being reset
+        inherited.invalidate()
+        return True
+
+    detached = [conn for conn in connections if _detach_socket(conn)]
+
+    for conn in detached:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    return len(detached) == len(connections)
+
+
 class DBConnectionPool(dict):
     # The default parameters of pool
     DEFAULT_POOL_PARAMS = {
@@ -22,15 +107,43 @@ class DBConnectionPool(dict):
         'recycle': 60 * 60,
         'pool_size': 10,
         'max_overflow': 15,
+        # hand out the most recently returned connection first,
+        # so the others stay idle and can be closed by the reaper(POOL_OPTIONS['IDLE_TIMEOUT'])
+        'use_lifo': False,
     }
 
+    # with 'pre_ping', a connection is only pinged at checkout if it stayed idle in the pool
+    # for more than POOL_OPTIONS['PRE_PING_IDLE'] seconds, or if its last use ended in an error
+    DEFAULT_PRE_PING_IDLE = 5
+
+    # seconds a checkout of the native pool(POOL_OPTIONS['ENGINE'] = 'native') waits for a connection,
+    # then PoolTimeout; QueuePool keeps 'timeout' above
+    DEFAULT_NATIVE_TIMEOUT = 30
+
     def __new__(cls, *args, **kwargs):
         if not hasattr(cls, "_instance"):
             cls._instance = super(DBConnectionPool, cls).__new__(cls, *args, **kwargs)
 
             # Important:
-            # acquire this lock before modify pool_container
+            # this lock only guards the creation of the per-alias locks below,
+            # a pool itself is built under the lock of its own alias
             cls._instance.lock = threading.Lock()
+            cls._instance.alias_locks = {}
+
+            # the process which owns the pools, and a counter bumped on every fork,
+            # connections checked out by an older generation belong to the parent process
+            cls._instance.pid = os.getpid()
+            cls._instance.generation = 0
+            # what was inherited from the parent process and can't be closed safely(see _close_inherited)
+            cls._instance.inherited = []
+
+            # alias -> seconds spent on pre-warming, an alias is ready only when its pool is full
+            cls._instance.ready = {}
+            # called in the child process once the inherited pools have been dropped
+            cls._instance.fork_callbacks = []
+
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=cls._instance.after_fork_in_child)
 
         return cls._instance
 
@@ -43,17 +156,258 @@ class DBConnectionPool(dict):
         except KeyError:
             raise PoolDoesNotExist(_('No such pool: {pool_name}').format(pool_name=pool_name))
 
+    def get_lock(self, pool_name):
+        """ Lock of one alias, so that building pools of different aliases never block each other """
+        lock = self.alias_locks.get(pool_name)
+
+        if lock is None:
+            with self.lock:
+                lock = self.alias_locks.setdefault(pool_name, threading.Lock())
+
+        return lock
+
+    def get_or_create(self, pool_name, creator):
+        """
+        Return the pool of `pool_name`, build it by `creator()` if it doesn't exist yet.
+        The steady-state path is a plain dict lookup (atomic under the GIL) and takes no lock,
+        the alias lock is only acquired while the pool is being built (double-checked).
+        """
+        if self.pid != os.getpid():
+            # forked without running the `os.register_at_fork` hooks, eg: uWSGI without `py-call-osafterfork`
+            self.after_fork_in_child()
+
+        try:
+            return self[pool_name]
+        except KeyError:
+            pass
+
+        with self.get_lock(pool_name):
+            # another thread may have built it while we were waiting for the lock
+            if pool_name not in self:
+                self.put(pool_name, creator())
+
+        return self[pool_name]
+
+    def after_fork_in_child(self):
+        """
+        Forget the pools inherited from the parent process, they are rebuilt lazily in the child.
+        Their connections are closed once their sockets are detached: the driver's goodbye would end
+        the sessions the parent still uses. The ones which can't be detached are only kept referenced.
+        """
+        # the locks may have been held by another thread of the parent at the time of fork
+        self.lock = threading.Lock()
+        self.alias_locks = {}
+
+        inherited, self.inherited = self.inherited + list(self.values()), []
+        self.clear()
+        self.ready.clear()
+
+        for obj in inherited:
+            self.inherit(obj)
+
+        self.pid = os.getpid()
+        self.generation += 1
+
+        for callback in self.fork_callbacks:
+            callback()
+
+    def mark_ready(self, pool_name, elapsed=None):
+        self.ready[pool_name] = elapsed
+
+    def is_ready(self, pool_name):
+        return pool_name in self.ready
+
+    def inherit(self, obj):
+        """ A pool or a connection checked out in the parent process: never used, closed if it's safe """
+        if not _close_inherited(obj):
+            self.inherited.append(obj)
+
 
 class DBPoolWrapperMixin:
     # the pool's container, for maintaining the pools
     conn_pool = DBConnectionPool()
+    # the metrics of each alias's pool
+    pool_metrics = PoolMetricsRegistry()
+    # the span subscribers of each alias
+    pool_hooks = PoolHookRegistry()
     logger = logging.getLogger("django")
 
+    # generation of conn_pool which self.connection was checked out from
+    _pool_generation = 0
+    # when self.connection was checked out, to measure how long it's held
+    _checkout_at = None
+    # the hooks of alias if the checkout of self.connection is traced(sampled)
+    _tracing = None
+    # the counters of the request being profiled(database_pool.middleware.QueryProfilerMiddleware)
+    query_profile = None
+    # the checkout of self.connection: a _ConnectionFairy(SQLAlchemy's pool, it's self.connection as well)
+    # or a ConnectionRecord(native pool, self.connection is its ConnectionProxy)
+    _pool_record = None
+    # the dialect of the native pool(core.pool.Dialect), None: core.pool.Dialect
+    NativeDialect = None
+    # class of the prepared statements cache of the backend(core.cache), None: not supported,
+    # and the cache of self.connection if it runs the statements
+    statement_cache_class = None
+    _statement_cache = None
+
+    # CHECKOUT_SCOPE 'transaction' state: cursors still open on self.connection(a WeakSet, a cursor never
+    # closed is forgotten once collected), whether the connection is pinned to this wrapper until close(),
+    # and whether connect() or set_autocommit() is running
+    _open_cursors = None
+    _pinned = False
+    # whether the session state of self.connection was changed, it's reset at checkin if so(core.reset)
+    _session_dirty = False
+    _connecting = False
+    _switching_autocommit = False
+
+    @property
+    def transaction_scoped(self):
+        """
+        POOL_OPTIONS['CHECKOUT_SCOPE']:
+            'request'(default): the connection is held until Django closes it(at the end of the request)
+            'transaction': the connection goes back to the pool as soon as each autocommit statement
+                or outermost atomic() block is finished, the next cursor checks out again
+        """
+        return self.settings_dict.get('POOL_OPTIONS', {}).get('CHECKOUT_SCOPE') == 'transaction'
+
+    @property
+    def native_pool(self):
+        """ POOL_OPTIONS['ENGINE']: 'sqlalchemy'(default, QueuePool) or 'native'(core.pool.NativePool) """
+        return self.settings_dict.get('POOL_OPTIONS', {}).get('ENGINE', 'sqlalchemy') == 'native'
+
+    @property
+    def connection_info(self):
+        """ The info of self.connection in its pool, kept between checkouts until it's closed """
+        return self._pool_record.info
+
+    @property
+    def dbapi_connection(self):
+        return self._pool_record.dbapi_connection
+
+    @property
+    def pre_ping_idle(self):
+        """ Seconds of idleness after which a connection is pinged at checkout, None: never pinged """
+        pool_options = self.settings_dict.get('POOL_OPTIONS', {})
+
+        if not pool_options.get('PRE_PING', self.conn_pool.DEFAULT_POOL_PARAMS['pre_ping']):
+            return None
+
+        return float(pool_options.get('PRE_PING_IDLE', self.conn_pool.DEFAULT_PRE_PING_IDLE))
+
+    def pin_connection(self):
+        """
+        Keep self.connection until close() even in 'transaction' checkout scope,
+        eg: the session state was modified(SET, temporary tables, advisory locks...),
+        the session is reset when the connection goes back to the pool
+        """
+        if not self._connecting:
+            self._pinned = True
+            self._session_dirty = True
+
+    def _cursor_opened(self, cursor):
+        if self._open_cursors is None:
+            self._open_cursors = weakref.WeakSet()
+
+        self._open_cursors.add(cursor)
+
+    def _cursor_closed(self, cursor, pool_connection):
+        # a cursor of a connection already given back doesn't count anymore
+        if pool_connection is self.connection and self._open_cursors is not None:
+            self._open_cursors.discard(cursor)
+            self._release_if_idle()
+
+    def _release_if_idle(self):
+        """ Give self.connection back to the pool when nothing can depend on it anymore """
+        if (
+            self.connection is None
+            or self._connecting
+            or self._switching_autocommit
+            or self._pinned
+            or self._open_cursors
+            or self.in_atomic_block
+            or not self.autocommit
+        ):
+            return
+
+        self.close()
+
+    def make_cursor(self, cursor):
+        if self.transaction_scoped:
+            return TransactionScopedCursorWrapper(cursor, self)
+
+        return SessionStateCursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        if self.transaction_scoped:
+            return TransactionScopedCursorDebugWrapper(cursor, self)
+
+        return SessionStateCursorDebugWrapper(cursor, self)
+
+    def _wrap_executor(self, executor):
+        """
+        The pool's own execute wrappers around the driver's execute, called by the cursors(core.cursors):
+        the statement cache, the tracing of the checkout and the query profile of the request.
+        They're never pushed to self.execute_wrappers, Django's stack of the execute_wrapper() blocks.
+        """
+        if self._statement_cache is not None:
+            executor = functools.partial(self._statement_cache, executor)
+
+        if self._tracing is not None:
+            executor = functools.partial(self._tracing.trace_query, executor)
+
+        if self.query_profile is not None:
+            executor = functools.partial(self.query_profile, executor)
+
+        return executor
+
+    def connect(self):
+        self._connecting = True
+
+        try:
+            return super(DBPoolWrapperMixin, self).connect()
+        finally:
+            self._connecting = False
+
+    def init_connection_state(self):
+        """
+        Django's session setup(time zone, isolation level, NLS formats...) of a pooled connection is kept
+        by its session between checkouts: it only runs again once the connection was reconnected or its
+        session reset(core.reset), or if the settings changed.
+        """
+        info = self.connection_info
+        signature = self._connection_state_signature()
+
+        if info.get('init_state') == signature:
+            return
+
+        super(DBPoolWrapperMixin, self).init_connection_state()
+        info['init_state'] = signature
+
+    def _connection_state_signature(self):
+        """ The settings init_connection_state() depends on """
+        return self.timezone_name, settings.USE_TZ, repr(self.settings_dict.get('OPTIONS'))
+
+    def set_autocommit(self, autocommit, *args, **kwargs):
+        # eg: sqlite begins a transaction by a cursor which is released before `self.autocommit` is set
+        self._switching_autocommit = True
+
+        try:
+            result = super(DBPoolWrapperMixin, self).set_autocommit(autocommit, *args, **kwargs)
+        finally:
+            self._switching_autocommit = False
+
+        # the outermost atomic() block has just been finished
+        if autocommit and self.transaction_scoped:
+            self._release_if_idle()
+
+        return result
+
     def _set_dbapi_autocommit(self, autocommit):
-        args = (self.vendor, self.__class__.__name__, self.connection, autocommit)
-        self.logger.info("[%s] %s._set_dbapi_autocommit conn: %s, autocommit: %s", *args)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            args = (self.vendor, self.__class__.__name__, self.connection, autocommit)
+            self.logger.debug("[%s] %s._set_dbapi_autocommit conn: %s, autocommit: %s", *args)
 
-        self.connection.connection.autocommit = autocommit
+        self.dbapi_connection.autocommit = autocommit
 
     def _set_autocommit(self, autocommit):
         with self.wrap_database_errors:
@@ -65,9 +419,22 @@ class DBPoolWrapperMixin:
                 raise exc from None
 
     def _get_dialect(self):
+        if self.native_pool:
+            from database_pool.core.pool import Dialect
+            return (self.NativeDialect or Dialect)(dbapi=self.Database)
+
         dialect = self.SQLAlchemyDialect(dbapi=self.Database)
         return dialect
 
+    def _get_pool_class(self):
+        """ The class of self.alias's pool: NativePool, QueuePool or one with their interface """
+        if self.native_pool:
+            from database_pool.core.pool import NativePool
+            return NativePool
+
+        from sqlalchemy.pool import QueuePool
+        return QueuePool
+
     def _get_new_connection(self, conn_params):
         # method of connection initiation defined by django
         # django.db.backends.<database>.base.DatabaseWrapper
@@ -75,7 +442,100 @@ class DBPoolWrapperMixin:
 
         # method of connection initiation defined by
         # dj_db_conn_pool.backends.<database>.base.DatabaseWrapper
-        return get_new_connection(conn_params)
+        hooks = self.pool_hooks.get(self.alias)
+
+        if hooks is None or not hooks.sample():
+            return get_new_connection(conn_params)
+
+        start = time.perf_counter()
+        error = None
+
+        try:
+            return get_new_connection(conn_params)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            hooks.emit('connect', time.perf_counter() - start, error)
+
+    def _get_pool_params(self):
+        # make a copy of default parameters
+        pool_params = deepcopy(self.conn_pool.DEFAULT_POOL_PARAMS)
+
+        # parse parameters of current database from self.settings_dict
+        pool_setting = {
+            # transform the keys in POOL_OPTIONS to upper case
+            # to fit sqlalchemy.pool.QueuePool's arguments requirement
+            key.lower(): value
+            # traverse POOL_OPTIONS to get arguments
+            for key, value in
+            # self.settings_dict was created by Django
+            # is the connection parameters of self.alias
+            self.settings_dict.get('POOL_OPTIONS', {}).items()
+            # There are some limits of self.alias's pool's option(POOL_OPTIONS):
+            # the keys in POOL_OPTIONS must be capitalised
+            # and the keys's lowercase must be in conn_pool.pool_default_params
+            if key == key.upper() and key.lower() in self.conn_pool.DEFAULT_POOL_PARAMS
+        }
+
+        # replace pool_params's items with pool_setting's items
+        # to import custom parameters
+        pool_params.update(**pool_setting)
+
+        # the native pool's checkouts don't wait forever, unless TIMEOUT says so
+        if self.native_pool and 'timeout' not in pool_setting:
+            pool_params['timeout'] = self.conn_pool.DEFAULT_NATIVE_TIMEOUT
+
+        return pool_params
+
+    def _create_pool(self, conn_params):
+        """ Create self.alias's pool, called only once per alias under the alias lock """
+        # now we have all parameters of self.alias
+        pool_params = self._get_pool_params()
+
+        # super().get_new_connection was defined by
+        # db_pool.backends.<database>.base.DatabaseWrapper or
+        # django.db.backends.<database>.base.DatabaseWrapper
+        # the method of connection initiation
+        creator = lambda: self._get_new_connection(conn_params)  # noqa: E731
+
+        # POOL_OPTIONS['BUDGET']: a new connection first takes a share of the host's budget
+        from database_pool.core.budget import get_budget
+        budget, budget_timeout = get_budget(self.settings_dict)
+
+        if budget is not None:
+            creator = budget.wrap_creator(creator, budget_timeout)
+
+        # create self.alias's pool
+        alias_pool = self._get_pool_class()(
+            creator,
+            # the pool uses the dialect to maintain the connections
+            dialect=self._get_dialect(),
+            # parameters of self.alias,
+            # SQLAlchemy's pre-ping(on every checkout) is replaced by self._ensure_alive()
+            **dict(pool_params, pre_ping=False)
+        )
+
+        # the time a connection went back to the pool, for the adaptive pre-ping and the reaper
+        def on_checkin(dbapi_connection, connection_record):
+            connection_record.info['checkin_time'] = time.monotonic()
+
+        listen(alias_pool, 'checkin', on_checkin)
+
+        if budget is not None:
+            budget.attach(alias_pool)
+        self.pool_metrics.get_or_create(self.alias).attach(alias_pool)
+
+        # POOL_OPTIONS['AUTOSIZE']: resized in background within bounds
+        from database_pool.core.sizing import start_controller
+        start_controller(self.alias, alias_pool, self.settings_dict, pool_params['max_overflow'])
+
+        # POOL_OPTIONS['IDLE_TIMEOUT']: the connections idle for too long are closed in background
+        from database_pool.core.reaper import register_pool
+        register_pool(self.alias, alias_pool, self.settings_dict)
+
+        self.logger.info(_("Alias: [%s]'s pool has been created, parameter: %s"), self.alias, pool_params)
+        return alias_pool
 
     def get_new_connection(self, conn_params):
         """
@@ -88,67 +548,170 @@ class DBPoolWrapperMixin:
         then grab one connection from the pool and return it to django
         :return: connection of pool
         """
-        with self.conn_pool.lock:
-            # acquire the lock, check whether there exists the pool of current database
-            # note: the value of self.alias is the name of current database, one of setting.DATABASES
-            if self.alias not in self.conn_pool:
-                # self.alias's pool doesn't exist, time to create it
-
-                # make a copy of default parameters
-                pool_params = deepcopy(self.conn_pool.DEFAULT_POOL_PARAMS)
-
-                # parse parameters of current database from self.settings_dict
-                pool_setting = {
-                    # transform the keys in POOL_OPTIONS to upper case
-                    # to fit sqlalchemy.pool.QueuePool's arguments requirement
-                    key.lower(): value
-                    # traverse POOL_OPTIONS to get arguments
-                    for key, value in
-                    # self.settings_dict was created by Django
-                    # is the connection parameters of self.alias
-                    self.settings_dict.get('POOL_OPTIONS', {}).items()
-                    # There are some limits of self.alias's pool's option(POOL_OPTIONS):
-                    # the keys in POOL_OPTIONS must be capitalised
-                    # and the keys's lowercase must be in conn_pool.pool_default_params
-                    if key == key.upper() and key.lower() in self.conn_pool.DEFAULT_POOL_PARAMS
-                }
-
-                # replace pool_params's items with pool_setting's items
-                # to import custom parameters
-                pool_params.update(**pool_setting)
-
-                # now we have all parameters of self.alias
-                # create self.alias's pool
-                alias_pool = pool.QueuePool(
-                    # super().get_new_connection was defined by
-                    # db_pool.backends.<database>.base.DatabaseWrapper or
-                    # django.db.backends.<database>.base.DatabaseWrapper
-                    # the method of connection initiation
-                    lambda: self._get_new_connection(conn_params),
-                    # SQLAlchemy use the dialect to maintain the pool
-                    dialect=self._get_dialect(),
-                    # parameters of self.alias
-                    **pool_params
-                )
-
-                self.logger.info(_("Alias: [%s]'s pool has been created, parameter: %s"), self.alias, pool_params)
-
-                # pool has been created
-                # put into conn_pool for reusing
-                self.conn_pool.put(self.alias, alias_pool)
-
-        # get self.alias's pool from conn_pool
-        db_pool = self.conn_pool.get(self.alias)
-        self.logger.info(_("DbPool: %s"), db_pool)
+        # note: the value of self.alias is the name of current database, one of setting.DATABASES
+        # only the first call of an alias builds its pool (under that alias's lock),
+        # afterwards getting the pool is lock-free
+        db_pool = self.conn_pool.get_or_create(self.alias, lambda: self._create_pool(conn_params))
+
+        # sampled once per checkout: its ping, queries and checkin are traced as well
+        hooks = self.pool_hooks.get(self.alias)
+        self._tracing = hooks if hooks is not None and hooks.sample() else None
 
         # get one connection from the pool
+        start = time.perf_counter()
         conn = db_pool.connect()
 
-        self.logger.info(_("Alias: got [%s]'s connection from pool, conn: %s, type: %s"), self.alias, conn, type(conn))
-        return conn
+        if self._tracing is not None:
+            self._tracing.emit('checkout', time.perf_counter() - start, in_use=db_pool.checkedout())
+
+        conn = self._ensure_alive(db_pool, conn)
+
+        self._checkout_at = time.perf_counter()
+        self._session_dirty = False
+        self._pool_generation = self.conn_pool.generation
+        self.pool_metrics.get_or_create(self.alias).observe_checkout(self._checkout_at - start)
+
+        if self.query_profile is None:
+            # first checked out by a request being profiled(database_pool.middleware)
+            profiling = current_profiling.get()
+            if profiling is not None:
+                profiling.join(self)
+
+        if self.query_profile is not None:
+            self.query_profile.observe_checkout(self._checkout_at - start)
+
+        self._bind_statement_cache(conn)
+        self._pool_record = conn
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Alias: got [%s]'s connection from pool %s, conn: %s", self.alias, db_pool, conn)
+
+        # the native pool hands a proxy to Django, given back to the pool if it's dropped
+        return conn.checkout() if isinstance(conn, ConnectionRecord) else conn
+
+    def _ensure_alive(self, db_pool, conn):
+        """
+        Adaptive pre-ping: ping the connection checked out only if it stayed idle in the pool
+        for more than `pre_ping_idle` seconds, or if its last use ended in an error.
+        A dead connection is replaced, and so are(at their next checkout) all the connections
+        opened before it, like SQLAlchemy's pre-ping does.
+        """
+        idle_limit = self.pre_ping_idle
+
+        if idle_limit is None:
+            return conn
+
+        info = conn.info
+        checkin_time = info.get('checkin_time')
+
+        if not info.pop('ping_needed', False) and (
+            checkin_time is None or time.monotonic() - checkin_time < idle_limit
+        ):
+            return conn
+
+        self.pool_metrics.get_or_create(self.alias).incr('pings')
+        start = time.perf_counter()
+
+        try:
+            alive = db_pool._dialect.do_ping(conn.connection)
+            error = None
+        except Exception as exc:
+            alive, error = False, exc
+
+        if self._tracing is not None:
+            self._tracing.emit('ping', time.perf_counter() - start, error, alive=alive)
+
+        if alive:
+            return conn
+
+        self.logger.warning(_("Alias: [%s]'s pooled connection is dead, reconnecting, caused by: %s"),
+                            self.alias, error or 'failed ping')
+
+        # the dead connection goes back to the pool invalidated, it reconnects at its next checkout
+        db_pool._invalidate(conn, disconnection_error(db_pool, error or 'ping failed'))
+        return db_pool.connect()
+
+    def _bind_statement_cache(self, conn):
+        """ The prepared statements cache of the connection checked out, built on its first checkout """
+        cache_class = self.statement_cache_class
+
+        if cache_class is None:
+            return
+
+        # the record's info is cleared by SQLAlchemy when the connection is recycled or reconnected
+        cache = conn.info.get('statement_cache')
+
+        if cache is None or cache.dbapi_connection is not conn.connection:
+            size = get_statement_cache_size(self.settings_dict, cache_class.default_size)
+
+            if size <= 0:
+                return
+
+            metrics = self.pool_metrics.get_or_create(self.alias)
+            cache = conn.info['statement_cache'] = cache_class(conn.connection, size, metrics)
+
+        if cache.wraps_execute:
+            self._statement_cache = cache
+
+    def _drop_inherited_connection(self):
+        """ self.connection was checked out before fork, it belongs to the parent process """
+        if self.connection is not None and self._pool_generation != self.conn_pool.generation:
+            self.conn_pool.inherit(self.connection)
+            self.connection = None
+            self._pool_record = None
+
+    def ensure_connection(self):
+        self._drop_inherited_connection()
+        return super(DBPoolWrapperMixin, self).ensure_connection()
+
+    def _close(self):
+        if self.connection is not None:
+            # read by the dialect's do_rollback() when the connection is checked in(core.reset)
+            self.connection_info['session_dirty'] = self._session_dirty
+            self._session_dirty = False
+
+            if getattr(self, 'errors_occurred', False):
+                # the next checkout of this connection pings it first
+                self.connection_info['ping_needed'] = True
+
+        try:
+            if isinstance(self._pool_record, ConnectionRecord):
+                # closing the DB-API connection itself would close the physical connection
+                with self.wrap_database_errors:
+                    return self._pool_record.checkin()
+
+            return super(DBPoolWrapperMixin, self)._close()
+        finally:
+            self._pool_record = None
+
+            self._statement_cache = None
+
+            if self._checkout_at is not None:
+                now = time.perf_counter()
+                self.pool_metrics.get_or_create(self.alias).observe_checkin(now - self._checkout_at)
+                self.pool_metrics.maybe_flush(now)
+
+                if self.query_profile is not None:
+                    self.query_profile.observe_checkin(self._checkout_at, now)
+
+                if self._tracing is not None:
+                    self._stop_tracing(now - self._checkout_at)
+
+                self._checkout_at = None
+
+    def _stop_tracing(self, hold):
+        hooks, self._tracing = self._tracing, None
+        hooks.emit('checkin', hold, errors_occurred=getattr(self, 'errors_occurred', False))
 
     def close(self, *args, **kwargs):
-        conn = getattr(self.connection, 'connection', None)
-        self.logger.info(_("release %s's connection %s to its pool"), self.alias, conn)
+        self._drop_inherited_connection()
+
+        # the cursors still open die with the connection
+        self._open_cursors = None
+        self._pinned = False
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            conn = getattr(self.connection, 'connection', None)
+            self.logger.debug("release %s's connection %s to its pool", self.alias, conn)
 
         return super(DBPoolWrapperMixin, self).close(*args, **kwargs)
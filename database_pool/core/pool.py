@@ -0,0 +1,448 @@
+"""
+A native pool of DB-API connections, an alternative to SQLAlchemy's QueuePool selected per alias:
+    'POOL_OPTIONS': {
+        'ENGINE': 'native',     # default: 'sqlalchemy'
+        'POOL_SIZE': 10,
+        'MAX_OVERFLOW': 15,
+        ......
+    }
+
+The same options and behaviour as the QueuePool of DBPoolWrapperMixin: size and overflow, TIMEOUT,
+RECYCLE, USE_LIFO, the adaptive pre-ping, the reset on return(core.reset), the reaper, the adaptive
+sizing and the connection budget. But SQLAlchemy isn't imported, and Django gets a ConnectionProxy which
+only forwards the attributes to the DB-API connection, instead of a _ConnectionFairy and its events; the
+pool keeps what it knows about the connection in its ConnectionRecord. A proxy dropped without being given
+back(a thread gone without closing its connections) gives its record back to the pool.
+
+The waiters are served in arrival order: a connection given back(or room for a new one) is handed
+to the longest waiting thread, not to whichever thread gets the lock first.
+"""
+
+import os
+import time
+import inspect
+import logging
+import weakref
+import threading
+from collections import deque, defaultdict
+
+from database_pool.core.exceptions import PoolTimeout
+
+__all__ = ["NativePool", "ConnectionRecord", "ConnectionProxy", "Dialect", "DisconnectionError", "lazy_dialect", "listen",
+           "disconnection_error", "is_native_pool"]
+
+logger = logging.getLogger("django")
+
+
+class DisconnectionError(Exception):
+    """ A connection found dead by the pre-ping, as sqlalchemy.exc.DisconnectionError """
+
+
+class Dialect:
+    """ What the native pool needs from a backend: ping, reset and close the DB-API connections """
+    select_one = 'SELECT 1'
+
+    def __init__(self, dbapi=None):
+        self.dbapi = dbapi
+
+    def do_ping(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+
+        try:
+            cursor.execute(self.select_one)
+        finally:
+            cursor.close()
+
+        return True
+
+    def do_rollback(self, connection):
+        # a ConnectionRecord being checked in(core.reset), or the DB-API connection itself
+        getattr(connection, 'dbapi_connection', connection).rollback()
+
+    def do_close(self, dbapi_connection):
+        dbapi_connection.close()
+
+
+class lazy_dialect:
+    """
+    The SQLAlchemy dialect class of a backend, built by `factory` at its first use:
+    the aliases of the native pool never import SQLAlchemy.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.dialect_class = None
+        self.lock = threading.Lock()
+
+    def __get__(self, instance, owner):
+        if self.dialect_class is None:
+            with self.lock:
+                if self.dialect_class is None:
+                    self.dialect_class = self.factory()
+
+        return self.dialect_class
+
+
+class ConnectionRecord:
+    """ A connection of the pool, what Django checks out is its `dbapi_connection` """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.dbapi_connection = None
+        # cleared when the connection is closed, like the info of SQLAlchemy's _ConnectionRecord
+        self.info = {}
+        # kept for the record's whole life
+        self.record_info = {}
+        self.starttime = None
+        # of the ConnectionProxy checked out: gives the record back if the proxy is dropped
+        self._finalizer = None
+
+    @property
+    def connection(self):
+        return self.dbapi_connection
+
+    @property
+    def _connection_record(self):
+        # the dialect's do_rollback() is given the record being checked in(core.reset)
+        return self
+
+    def connect(self):
+        self.info.clear()
+        self.dbapi_connection = self.pool._creator(self)
+        self.starttime = time.monotonic()
+        self.pool.dispatch('connect', self.dbapi_connection, self)
+
+    def get_connection(self):
+        """ The connection checked out: opened, recycled or reopened if needed """
+        pool = self.pool
+
+        if self.dbapi_connection is not None and (
+            (pool._recycle > -1 and time.monotonic() - self.starttime > pool._recycle)
+            or self.starttime < pool._invalidate_time
+        ):
+            self.close()
+
+        if self.dbapi_connection is None:
+            self.connect()
+
+        return self.dbapi_connection
+
+    def invalidate(self, exception=None):
+        """ Close the connection, the record reconnects at its next checkout """
+        if self.dbapi_connection is not None:
+            self.pool.dispatch('invalidate', self.dbapi_connection, self, exception)
+            self.close()
+
+    def close(self):
+        dbapi_connection, self.dbapi_connection = self.dbapi_connection, None
+
+        if dbapi_connection is None:
+            return
+
+        self.pool.dispatch('close', dbapi_connection, self)
+        self.info.clear()
+
+        try:
+            self.pool._dialect.do_close(dbapi_connection)
+        except Exception as exc:
+            logger.warning("Closing the connection %s failed, caused by: %s", dbapi_connection, exc)
+
+    def checkout(self):
+        """ :return: the ConnectionProxy handed to Django """
+        return ConnectionProxy(self)
+
+    def checkin(self):
+        finalizer, self._finalizer = self._finalizer, None
+
+        # given back already by its finalizer
+        if finalizer is not None and not finalizer.detach():
+            return
+
+        self.pool._return(self)
+
+
+class ConnectionProxy:
+    """ The DB-API connection checked out, its attributes are the connection's ones """
+    __slots__ = ('dbapi_connection', '_connection_record', '__weakref__')
+
+    def __init__(self, record):
+        object.__setattr__(self, 'dbapi_connection', record.dbapi_connection)
+        object.__setattr__(self, '_connection_record', record)
+
+        finalizer = weakref.finalize(self, record.pool._checkin_dropped, record, os.getpid())
+        # nothing to give back at exit
+        finalizer.atexit = False
+        record._finalizer = finalizer
+
+    # the DB-API methods are forwarded without the lookup failing first, as __getattr__ does
+    def cursor(self, *args, **kwargs):
+        return self.dbapi_connection.cursor(*args, **kwargs)
+
+    def commit(self):
+        return self.dbapi_connection.commit()
+
+    def rollback(self):
+        return self.dbapi_connection.rollback()
+
+    def close(self):
+        return self.dbapi_connection.close()
+
+    def __getattr__(self, name):
+        return getattr(self.dbapi_connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.dbapi_connection, name, value)
+
+    def __repr__(self):
+        return '<ConnectionProxy of %r>' % (self.dbapi_connection,)
+
+
+class _Waiter:
+    __slots__ = ('event', 'record', 'may_connect')
+
+    def __init__(self):
+        self.event = threading.Event()
+        # handed over by the thread giving a record back, or the room to open a new one
+        self.record = None
+        self.may_connect = False
+
+
+class NativePool:
+    """ A deque of idle records, and the threads waiting for one in arrival order """
+
+    def __init__(self, creator, dialect=None, pool_size=5, max_overflow=10, timeout=30.0, recycle=-1,
+                 use_lifo=False, pre_ping=False, echo=False, **kwargs):
+        # SQLAlchemy's convention: a creator taking one argument gets the connection record
+        try:
+            takes_record = len(inspect.signature(creator).parameters) == 1
+        except (TypeError, ValueError):
+            takes_record = False
+
+        self._creator = creator if takes_record else (lambda record: creator())
+        self._dialect = dialect or Dialect()
+        self._size = pool_size
+        self._max_overflow = max_overflow
+        self._timeout = timeout
+        self._recycle = recycle
+        self._use_lifo = use_lifo
+        # the records opened before(pre-ping failure) are reconnected at their checkout
+        self._invalidate_time = 0
+
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._waiters = deque()
+        # the records of the pool: idle, checked out, or being connected
+        self._opened = 0
+        self._listeners = defaultdict(list)
+
+    def listen(self, identifier, fn):
+        """ 'connect', 'checkin', 'close': fn(dbapi_connection, record); 'invalidate': fn(..., exception) """
+        self._listeners[identifier].append(fn)
+
+    def dispatch(self, identifier, *args):
+        for fn in self._listeners.get(identifier, ()):
+            fn(*args)
+
+    def size(self):
+        return self._size
+
+    def checkedin(self):
+        return len(self._idle)
+
+    def checkedout(self):
+        return self._opened - len(self._idle)
+
+    def overflow(self):
+        return self._opened - self._size
+
+    def status(self):
+        return "Pool size: %d  Connections in pool: %d Current Overflow: %d Current Checked out connections: %d" % (
+            self.size(), self.checkedin(), self.overflow(), self.checkedout()
+        )
+
+    def _can_open(self):
+        return self._max_overflow < 0 or self._opened < self._size + self._max_overflow
+
+    def connect(self):
+        """ :return: the ConnectionRecord checked out """
+        record = self._acquire()
+
+        try:
+            record.get_connection()
+        except BaseException:
+            self._discard(record)
+            raise
+
+        return record
+
+    def _acquire(self):
+        with self._lock:
+            # nobody waits for longer
+            if not self._waiters:
+                if self._idle:
+                    return self._idle.pop() if self._use_lifo else self._idle.popleft()
+
+                if self._can_open():
+                    self._opened += 1
+                    return ConnectionRecord(self)
+
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        if not waiter.event.wait(self._timeout):
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise PoolTimeout(
+                        "Pool limit of size %d overflow %d reached, connection timed out, timeout %s"
+                        % (self._size, self._max_overflow, self._timeout)
+                    )
+
+            # served right after the timeout
+            waiter.event.wait()
+
+        if waiter.may_connect:
+            return ConnectionRecord(self)
+
+        return waiter.record
+
+    def _return(self, record):
+        """ Reset the record's connection, then hand it to a waiter, keep it idle or close it(overflow) """
+        if record.dbapi_connection is not None:
+            try:
+                self._dialect.do_rollback(record)
+            except Exception as exc:
+                logger.warning("Reset of the connection %s failed, it's closed, caused by: %s",
+                               record.dbapi_connection, exc)
+                record.invalidate(exc)
+
+        self.dispatch('checkin', record.dbapi_connection, record)
+
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.record = record
+                waiter.event.set()
+                return
+
+            if len(self._idle) < self._size:
+                self._idle.append(record)
+                return
+
+        # overflow connection
+        self._discard(record)
+
+    def _checkin_dropped(self, record, pid):
+        """
+        Finalizer of a ConnectionProxy dropped while checked out: its record is given back by a thread,
+        the garbage collector may run while this thread holds the pool's lock
+        """
+        # a child process drops the connections of its parent, they're never used there
+        if os.getpid() != pid:
+            return
+
+        record._finalizer = None
+        logger.warning("A connection of %r was dropped without being given back, it's returned to the pool",
+                       self)
+
+        try:
+            threading.Thread(target=self._return, args=(record,), name='database-pool-checkin', daemon=True).start()
+        except RuntimeError:
+            # the interpreter is shutting down
+            pass
+
+    def _discard(self, record):
+        """ Close a record which won't come back, its room goes to the first waiter """
+        try:
+            record.close()
+        finally:
+            self._release_room()
+
+    def _release_room(self):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.may_connect = True
+                waiter.event.set()
+            else:
+                self._opened -= 1
+
+    def _invalidate(self, record, exception=None):
+        """ A connection found dead: the ones opened before it are reconnected at their checkout """
+        self._invalidate_time = time.monotonic()
+        record.invalidate(exception)
+        record.checkin()
+
+    def reap(self, idle_timeout, min_idle=0, now=None):
+        """ core.reaper: close the records idle for longer than idle_timeout, keeping min_idle of them """
+        now = time.monotonic() if now is None else now
+        expired = []
+
+        with self._lock:
+            # the oldest idle record is the left end, in LIFO mode as well
+            while len(self._idle) > min_idle:
+                checkin_time = self._idle[0].info.get('checkin_time')
+
+                if checkin_time is None or now - checkin_time < idle_timeout:
+                    break
+
+                expired.append(self._idle.popleft())
+
+        for record in expired:
+            self._discard(record)
+
+        return len(expired)
+
+    def resize(self, size, max_overflow=None):
+        """ core.sizing: the surplus idle records are closed now, the others once given back """
+        with self._lock:
+            self._size = size
+
+            if max_overflow is not None:
+                self._max_overflow = max_overflow
+
+            surplus = [self._idle.popleft() for _ in range(max(len(self._idle) - size, 0))]
+
+        for record in surplus:
+            self._discard(record)
+
+        # a bigger pool lets waiters open new connections
+        while True:
+            with self._lock:
+                if not self._waiters or not self._can_open():
+                    break
+
+                self._opened += 1
+                waiter = self._waiters.popleft()
+                waiter.may_connect = True
+                waiter.event.set()
+
+        return len(surplus)
+
+    def dispose(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+
+        for record in idle:
+            self._discard(record)
+
+
+def is_native_pool(db_pool):
+    return isinstance(db_pool, NativePool)
+
+
+def listen(db_pool, identifier, fn):
+    """ Listen to an event of a NativePool or of a SQLAlchemy pool """
+    if is_native_pool(db_pool):
+        db_pool.listen(identifier, fn)
+    else:
+        from sqlalchemy import event
+        event.listen(db_pool, identifier, fn)
+
+
+def disconnection_error(db_pool, message):
+    if is_native_pool(db_pool):
+        return DisconnectionError(message)
+
+    from sqlalchemy import exc
+    return exc.DisconnectionError(message)
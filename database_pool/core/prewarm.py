@@ -0,0 +1,204 @@
+"""
+Pre-warming of the pools: open the connections of an alias's pool concurrently before
+any request needs them, so the first requests after a deploy don't pay the handshakes.
+
+It's opt-in by POOL_OPTIONS:
+    'POOL_OPTIONS': {
+        'POOL_SIZE': 10,
+        'PREWARM': True,    # or the number of connections, or a dict:
+        # 'PREWARM': {
+        #     'SIZE': 10,                 # connections to open, capped by POOL_SIZE (default: POOL_SIZE)
+        #     'WORKERS': 4,               # threads opening them
+        #     'QUERIES': ['SELECT 1'],    # warm-up queries run on every connection
+        #     'ON_READY': True,           # pre-warm in AppConfig.ready(), with DATABASE_POOL_PREWARM only
+        #     'AFTER_FORK': True,         # pre-warm again in a forked worker (in background)
+        # }
+    }
+
+and is only started by the server, never by manage.py commands or the tests: either call it once the
+application is loaded, eg: in wsgi.py/asgi.py or in gunicorn's `post_fork` hook
+    application = get_wsgi_application()
+    prewarm_pools()
+or set settings.DATABASE_POOL_PREWARM = True to start it in AppConfig.ready() of every process.
+The forked workers of a process which pre-warmed its pools pre-warm theirs again(AFTER_FORK).
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import load_backend
+
+from database_pool.core.mixins import DBPoolWrapperMixin, DBConnectionPool
+from database_pool.core.pool import ConnectionRecord
+
+__all__ = ["get_prewarm_options", "prewarm_pool", "prewarm_pools", "prewarm_on_ready"]
+
+logger = logging.getLogger("django")
+
+DEFAULT_PREWARM_OPTIONS = {
+    'SIZE': None,
+    'WORKERS': 4,
+    'QUERIES': [],
+    'ON_READY': True,
+    'AFTER_FORK': True,
+}
+
+# whether this process pre-warmed its pools, inherited by the forked workers
+_started = False
+
+
+def get_prewarm_options(settings_dict):
+    """ Normalize POOL_OPTIONS['PREWARM'] of one alias, None means pre-warming is off """
+    prewarm = settings_dict.get('POOL_OPTIONS', {}).get('PREWARM')
+
+    if not prewarm:
+        return None
+
+    options = dict(DEFAULT_PREWARM_OPTIONS)
+
+    if isinstance(prewarm, dict):
+        options.update({key.upper(): value for key, value in prewarm.items()})
+    elif prewarm is not True:
+        options['SIZE'] = int(prewarm)
+
+    return options
+
+
+def _create_connection(alias):
+    """ A new DatabaseWrapper of alias, not bound to the thread-local `connections` """
+    if hasattr(connections, 'create_connection'):
+        return connections.create_connection(alias)
+
+    # django < 3.2
+    db = connections.databases[alias]
+    backend = load_backend(db['ENGINE'])
+    return backend.DatabaseWrapper(db, alias)
+
+
+def _checkin(record):
+    """ Give a checkout of the pool back: a ConnectionRecord(native pool) or a _ConnectionFairy """
+    (record.checkin if isinstance(record, ConnectionRecord) else record.close)()
+
+
+def prewarm_pool(alias, options=None):
+    """
+    Fill alias's pool: check out `SIZE` connections concurrently(each one goes through
+    Django's connect(), so init_connection_state is run too), run the warm-up queries
+    and give them all back to the pool at once.
+    The queries use DB-API cursors and the connections are checked in directly: a cursor of Django
+    would give its connection back as soon as it's closed(CHECKOUT_SCOPE 'transaction').
+    :return: seconds spent, or None if the pool isn't full
+    """
+    conn_pool = DBConnectionPool()
+    main_wrapper = _create_connection(alias)
+
+    if not isinstance(main_wrapper, DBPoolWrapperMixin):
+        logger.warning("Alias: [%s] is not a pooled backend, skip pre-warming", alias)
+        return None
+
+    options = options or get_prewarm_options(main_wrapper.settings_dict) or dict(DEFAULT_PREWARM_OPTIONS)
+    pool_size = main_wrapper._get_pool_params()['pool_size']
+
+    # overflow connections would be closed at checkin, only the pool_size ones are kept
+    size = min(options['SIZE'] or pool_size, pool_size)
+    workers = max(1, min(int(options['WORKERS']), size))
+    queries = options['QUERIES'] or []
+
+    def open_one():
+        wrapper = _create_connection(alias)
+        wrapper.connect()
+
+        try:
+            if queries:
+                cursor = wrapper.connection.cursor()
+
+                try:
+                    for sql in queries:
+                        cursor.execute(sql)
+                finally:
+                    cursor.close()
+        except BaseException:
+            _checkin(wrapper._pool_record)
+            raise
+
+        # checked in by the main thread once all connections are checked out,
+        # the wrapper holds the checkout until then(a native pool's checkout dropped goes back to the pool)
+        return wrapper
+
+    start = time.perf_counter()
+    opened = []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-prewarm-%s' % alias) as executor:
+        futures = [executor.submit(open_one) for _ in range(size)]
+
+        for future in futures:
+            try:
+                opened.append(future.result())
+            except Exception as exc:
+                logger.error("Alias: [%s] pre-warming a connection failed, caused by: %s", alias, exc)
+
+    for wrapper in opened:
+        _checkin(wrapper._pool_record)
+
+    elapsed = time.perf_counter() - start
+    db_pool = conn_pool.get(alias) if alias in conn_pool else None
+
+    if db_pool is None or db_pool.checkedin() < size:
+        logger.warning("Alias: [%s]'s pool pre-warming is incomplete: %d/%d connections in %.3fs",
+                       alias, len(opened), size, elapsed)
+        return None
+
+    conn_pool.mark_ready(alias, elapsed)
+    logger.info("Alias: [%s]'s pool pre-warmed with %d connections in %.3fs", alias, size, elapsed)
+    return elapsed
+
+
+def prewarm_pools(aliases=None, after_fork=False):
+    """
+    Pre-warm the pools of all aliases having POOL_OPTIONS['PREWARM'], one after the other,
+    the pools already pre-warmed by this process are skipped.
+    :return: dict of alias -> seconds spent(None if the pool couldn't be filled)
+    """
+    global _started
+    _started = True
+
+    conn_pool = DBConnectionPool()
+    report = {}
+    trigger = 'AFTER_FORK' if after_fork else 'ON_READY'
+
+    for alias in aliases or connections:
+        options = get_prewarm_options(connections.databases[alias])
+
+        if not options or not options[trigger]:
+            continue
+
+        if conn_pool.is_ready(alias):
+            report[alias] = conn_pool.ready[alias]
+        else:
+            report[alias] = prewarm_pool(alias, options)
+
+    return report
+
+
+def prewarm_on_ready():
+    """ AppConfig.ready(): only with settings.DATABASE_POOL_PREWARM, so that manage.py commands don't open pools """
+    if getattr(settings, 'DATABASE_POOL_PREWARM', False):
+        prewarm_pools()
+
+
+def _prewarm_after_fork():
+    # the children of a process which never pre-warmed(eg: multiprocessing in a command) don't either
+    if not _started:
+        return
+
+    # don't delay the worker's boot, fill the pools in background
+    thread = threading.Thread(target=prewarm_pools, kwargs={'after_fork': True},
+                              name='db-prewarm-after-fork', daemon=True)
+    thread.start()
+
+
+DBConnectionPool().fork_callbacks.append(_prewarm_after_fork)
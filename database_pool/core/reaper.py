@@ -0,0 +1,155 @@
+"""
+Idle-connection reaper: closes the pooled connections idle for longer than IDLE_TIMEOUT,
+so the database doesn't keep hundreds of sessions for nothing between the peaks.
+
+It's opt-in by POOL_OPTIONS, best combined with LIFO checkout(the hottest connections are reused,
+the others stay idle long enough to be reaped):
+    'POOL_OPTIONS': {
+        'POOL_SIZE': 10,
+        'USE_LIFO': True,
+        'IDLE_TIMEOUT': 300,    # seconds
+        'MIN_IDLE': 2,          # idle connections always kept, default: 0
+    }
+"""
+
+import time
+import logging
+import threading
+
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.metrics import PoolMetricsRegistry
+
+__all__ = ["reap_pool", "register_pool"]
+
+logger = logging.getLogger("django")
+
+# bounds of the seconds between two rounds of the reaper
+MIN_REAP_INTERVAL = 1.0
+MAX_REAP_INTERVAL = 30.0
+
+
+def reap_pool(db_pool, idle_timeout, min_idle=0, now=None):
+    """
+    Close the connections of db_pool idle for longer than idle_timeout, keeping min_idle of them.
+    Either in FIFO or in LIFO mode the queue's oldest connection is its left end.
+    :return: number of connections closed
+    """
+    now = time.monotonic() if now is None else now
+
+    if hasattr(db_pool, 'reap'):
+        # core.pool.NativePool
+        return db_pool.reap(idle_timeout, min_idle, now)
+
+    queue = db_pool._pool
+    expired = []
+
+    with queue.mutex:
+        idle = queue.queue
+
+        while len(idle) > min_idle:
+            checkin_time = idle[0].info.get('checkin_time')
+
+            if checkin_time is None or now - checkin_time < idle_timeout:
+                break
+
+            expired.append(idle.popleft())
+
+        if expired:
+            queue.not_full.notify(len(expired))
+
+    for record in expired:
+        try:
+            record.close()
+        finally:
+            # the pool may open a new connection in its place
+            db_pool._dec_overflow()
+
+    return len(expired)
+
+
+class IdleReaper:
+    """ One thread per process reaping the pools of all aliases having IDLE_TIMEOUT """
+
+    def __init__(self):
+        # alias -> (pool, idle timeout, min idle)
+        self.pools = {}
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def register(self, alias, db_pool, idle_timeout, min_idle):
+        # the connections' checkin time is recorded by DBPoolWrapperMixin's checkin listener
+        with self.lock:
+            self.pools[alias] = (db_pool, idle_timeout, min_idle)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='db-pool-reaper')
+                self._thread.start()
+
+        # the interval may be shorter now
+        self._wakeup.set()
+
+    def interval(self):
+        with self.lock:
+            timeouts = [idle_timeout for _, idle_timeout, _ in self.pools.values()]
+
+        return min(max(min(timeouts) / 4, MIN_REAP_INTERVAL), MAX_REAP_INTERVAL)
+
+    def reap(self):
+        now = time.monotonic()
+
+        with self.lock:
+            pools = list(self.pools.items())
+
+        for alias, (db_pool, idle_timeout, min_idle) in pools:
+            try:
+                closed = reap_pool(db_pool, idle_timeout, min_idle, now)
+            except Exception as exc:
+                logger.error("Alias: [%s] reaping idle connections failed, caused by: %s", alias, exc)
+                continue
+
+            if closed:
+                PoolMetricsRegistry().get_or_create(alias).incr('idle_closed', closed)
+                logger.info("Alias: [%s] closed %d connection(s) idle for more than %ss, %d idle left",
+                            alias, closed, idle_timeout, db_pool.checkedin())
+
+    def _run(self):
+        while True:
+            try:
+                self._wakeup.wait(self.interval())
+                self._wakeup.clear()
+                self.reap()
+            except Exception as exc:
+                # the thread must outlive any failure, or no pool is reaped anymore
+                logger.error("Reaping idle connections failed, caused by: %s", exc)
+                time.sleep(MIN_REAP_INTERVAL)
+
+
+_reaper = IdleReaper()
+
+
+def register_pool(alias, db_pool, settings_dict):
+    """ Reap alias's new pool if POOL_OPTIONS['IDLE_TIMEOUT'] is set, or its connections share a budget """
+    from database_pool.core.budget import get_budget_idle_timeout
+
+    options = settings_dict.get('POOL_OPTIONS', {})
+    idle_timeout = options.get('IDLE_TIMEOUT')
+    budget_idle_timeout = get_budget_idle_timeout(settings_dict)
+
+    # an idle connection holds a share of the host's budget the other processes may need
+    if budget_idle_timeout is not None:
+        idle_timeout = min(float(idle_timeout or budget_idle_timeout), budget_idle_timeout)
+
+    if not idle_timeout:
+        return
+
+    _reaper.register(alias, db_pool, float(idle_timeout), int(options.get('MIN_IDLE', 0)))
+
+
+def _after_fork_in_child():
+    # the reaper's thread didn't survive the fork, a new one starts with the new pools
+    global _reaper
+    _reaper = IdleReaper()
+
+
+DBConnectionPool().fork_callbacks.append(_after_fork_in_child)
@@ -0,0 +1,136 @@
+"""
+Reset of the connections given back to the pool, by the cheapest correct means.
+
+SQLAlchemy's pool rolls back every connection checked in(reset_on_return='rollback'): one round-trip
+per request even when the request only ran autocommit reads. The DatabaseWrapper records whether
+the session state was changed during the checkout(SET, temporary tables, locks..., see
+core.cursors.SESSION_STATE_RE) in the connection's info, and the dialect of the pool:
+    - does nothing for a connection without transaction in progress and with an unchanged session
+    - rolls back a connection with a transaction in progress(or when the driver can't tell)
+    - resets a changed session: DISCARD ALL for PostgreSQL, COM_RESET_CONNECTION for MySQL(PyMySQL,
+      mysqlclient can't send it: the connection is only rolled back, as Django's persistent connections are),
+      the connection is invalidated(reconnected at its next checkout) by the other backends
+
+A connection checked in without the wrapper(eg: pre-warming) is rolled back as before.
+"""
+
+import logging
+
+__all__ = ["ResetOnReturnMixin", "PostgresResetOnReturnMixin", "PsycopgResetOnReturnMixin", "MySQLResetOnReturnMixin",
+           "OracleResetOnReturnMixin", "SESSION_INFO_KEYS"]
+
+logger = logging.getLogger("django")
+
+# keys of a connection's info describing its session, dropped when the session is reset
+SESSION_INFO_KEYS = ('statement_cache', 'init_state')
+
+# MySQL 5.7.3+, MariaDB 10.2.4+
+COM_RESET_CONNECTION = 0x1f
+# flag of the server status of the MySQL protocol
+SERVER_STATUS_IN_TRANS = 0x01
+
+
+class ResetOnReturnMixin:
+    """ Mixin of the SQLAlchemy dialect of a pool """
+
+    def do_rollback(self, dbapi_connection):
+        # called by the pool with the _ConnectionFairy being checked in, whose info is the record's one
+        info = getattr(dbapi_connection, 'info', None)
+        session_dirty = info.pop('session_dirty', None) if info is not None else None
+
+        if session_dirty is None:
+            return super().do_rollback(dbapi_connection)
+
+        raw_connection = dbapi_connection.dbapi_connection
+
+        if session_dirty:
+            if self.reset_session(raw_connection):
+                for key in SESSION_INFO_KEYS:
+                    info.pop(key, None)
+                return
+
+            # nothing to reset the session with: a new connection is opened at the next checkout
+            logger.debug("Session of %s can't be reset, the connection is invalidated", raw_connection)
+            dbapi_connection._connection_record.invalidate()
+            return
+
+        if self.in_transaction(raw_connection) is not False:
+            return super().do_rollback(dbapi_connection)
+
+    def in_transaction(self, raw_connection):
+        """ :return: whether a transaction is in progress, None if the driver doesn't tell """
+        in_transaction = getattr(raw_connection, 'in_transaction', None)
+        return in_transaction if isinstance(in_transaction, bool) else None
+
+    def reset_session(self, raw_connection):
+        """ Reset the session state of the connection, :return: False if it can't be done """
+        return False
+
+
+class PostgresResetOnReturnMixin(ResetOnReturnMixin):
+    def in_transaction(self, raw_connection):
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+        return raw_connection.get_transaction_status() != TRANSACTION_STATUS_IDLE
+
+    def reset_session(self, raw_connection):
+        if self.in_transaction(raw_connection):
+            raw_connection.rollback()
+
+        # DISCARD ALL can't run inside a transaction block
+        autocommit = raw_connection.autocommit
+        raw_connection.autocommit = True
+
+        try:
+            with raw_connection.cursor() as cursor:
+                cursor.execute('DISCARD ALL')
+        finally:
+            raw_connection.autocommit = autocommit
+
+        return True
+
+
+class PsycopgResetOnReturnMixin(PostgresResetOnReturnMixin):
+    """ psycopg 3 """
+
+    def in_transaction(self, raw_connection):
+        from psycopg.pq import TransactionStatus
+        return raw_connection.info.transaction_status != TransactionStatus.IDLE
+
+
+class OracleResetOnReturnMixin(ResetOnReturnMixin):
+    def in_transaction(self, raw_connection):
+        # python-oracledb only, cx_Oracle can't tell
+        return getattr(raw_connection, 'transaction_in_progress', None)
+
+
+class MySQLResetOnReturnMixin(ResetOnReturnMixin):
+    def in_transaction(self, raw_connection):
+        # None: closed, or mysqlclient which doesn't tell
+        server_status = getattr(raw_connection, 'server_status', None)
+        return bool(server_status & SERVER_STATUS_IN_TRANS) if server_status is not None else None
+
+    def reset_session(self, raw_connection):
+        if not hasattr(raw_connection, '_execute_command'):
+            # mysqlclient can't send COM_RESET_CONNECTION: only rolled back, the session variables, temporary
+            # tables and GET_LOCK() locks stay, as they do on Django's persistent connections(CONN_MAX_AGE)
+            raw_connection.rollback()
+            return True
+
+        # rolls back, drops the temporary tables, releases the locks, the session variables are reset
+        raw_connection._execute_command(COM_RESET_CONNECTION, b'')
+        raw_connection._read_ok_packet()
+
+        # the session settings of PyMySQL's connect()
+        raw_connection.set_character_set(raw_connection.charset, getattr(raw_connection, 'collation', None))
+
+        with raw_connection.cursor() as cursor:
+            if getattr(raw_connection, 'sql_mode', None) is not None:
+                cursor.execute("SET sql_mode=%s", (raw_connection.sql_mode,))
+
+            if raw_connection.init_command is not None:
+                cursor.execute(raw_connection.init_command)
+
+        if raw_connection.autocommit_mode is not None:
+            raw_connection.autocommit(raw_connection.autocommit_mode)
+
+        return True
@@ -0,0 +1,288 @@
+"""
+Adaptive sizing of the pools: a background controller per alias watches the checkout waits,
+the overflow use and the idle connections, and grows or shrinks the pool within bounds.
+
+It's opt-in by POOL_OPTIONS:
+    'POOL_OPTIONS': {
+        'POOL_SIZE': 10,            # the initial size
+        'MAX_OVERFLOW': 15,
+        'AUTOSIZE': {
+            'MIN_SIZE': 2,
+            'MAX_SIZE': 50,         # default: POOL_SIZE + MAX_OVERFLOW
+            'STEP': 2,              # connections added or removed per decision
+            'INTERVAL': 5,          # seconds between two decisions
+            'WAIT_THRESHOLD': 0.01, # seconds, a mean checkout wait above it grows the pool
+            'SHRINK_AFTER': 6,      # decisions in a row with STEP idle connections at least to shrink
+            'MAX_CONNECTIONS': None,# the server's limit, None: detected(max_connections, sessions...)
+            'RESERVED': 3,          # server connections left for the others(superuser, replication...)
+            'PROCESSES': 4,         # processes of this host(or more) sharing MAX_CONNECTIONS, default: 1
+        }
+    }
+
+The pool never keeps more than MAX_SIZE connections, POOL_SIZE + MAX_OVERFLOW included: the overflow
+shrinks as the pool grows. The pool of every process never opens more than (MAX_CONNECTIONS - RESERVED)
+/ PROCESSES connections; PROCESSES isn't detected, left unset it's 1 and every worker process may take the
+whole server(logged as a warning). Every decision is logged.
+"""
+
+import logging
+import threading
+
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.metrics import PoolMetricsRegistry
+
+__all__ = ["get_autosize_options", "resize_pool", "PoolSizeController", "start_controller"]
+
+logger = logging.getLogger("django")
+
+DEFAULT_AUTOSIZE_OPTIONS = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': None,
+    'STEP': 2,
+    'INTERVAL': 5,
+    'WAIT_THRESHOLD': 0.01,
+    'SHRINK_AFTER': 6,
+    'MAX_CONNECTIONS': None,
+    'RESERVED': 3,
+    # None: 1, with a warning
+    'PROCESSES': None,
+}
+
+# the server's connection limit, by vendor
+MAX_CONNECTIONS_QUERIES = {
+    'postgresql': "SHOW max_connections",
+    'mysql': "SELECT @@max_connections",
+    'oracle': "SELECT value FROM v$parameter WHERE name = 'sessions'",
+}
+
+
+def get_autosize_options(settings_dict):
+    """ Normalize POOL_OPTIONS['AUTOSIZE'] of one alias, None means adaptive sizing is off """
+    autosize = settings_dict.get('POOL_OPTIONS', {}).get('AUTOSIZE')
+
+    if not autosize:
+        return None
+
+    options = dict(DEFAULT_AUTOSIZE_OPTIONS)
+
+    if isinstance(autosize, dict):
+        options.update({key.upper(): value for key, value in autosize.items()})
+
+    return options
+
+
+def resize_pool(db_pool, size, max_overflow=None):
+    """
+    Change the size(and the max overflow) of a live QueuePool.
+    The connections already opened are kept: `_overflow` counts them beyond the size,
+    so it moves the opposite way. A smaller pool closes its surplus connections when they are
+    returned, the idle ones are closed right now.
+    """
+    if hasattr(db_pool, 'resize'):
+        # core.pool.NativePool
+        return db_pool.resize(size, max_overflow)
+
+    with db_pool._overflow_lock:
+        delta = size - db_pool._pool.maxsize
+
+        db_pool._pool.maxsize = size
+        db_pool._overflow -= delta
+
+        if max_overflow is not None:
+            db_pool._max_overflow = max_overflow
+
+    surplus = []
+    queue = db_pool._pool
+
+    with queue.mutex:
+        # the oldest idle connections first, in LIFO mode as well
+        while queue._qsize() > size:
+            surplus.append(queue.queue.popleft())
+
+        if surplus:
+            queue.not_full.notify(len(surplus))
+
+    for record in surplus:
+        try:
+            record.close()
+        finally:
+            db_pool._dec_overflow()
+
+    return len(surplus)
+
+
+class PoolSizeController:
+    """ Grows or shrinks the pool of one alias in this process """
+
+    def __init__(self, alias, db_pool, options, max_overflow):
+        self.alias = alias
+        self.db_pool = db_pool
+        self.options = options
+        self.max_overflow = max_overflow
+
+        self.min_size = max(int(options['MIN_SIZE']), 1)
+        # by default, never more connections kept than the configured peak
+        self.max_size = options['MAX_SIZE'] or db_pool.size() + max(max_overflow, 0)
+        # the connections this process may open, None until the server's limit is known
+        self.budget = None
+
+        self._idle_streak = 0
+        self._last_wait = (0.0, 0)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='db-pool-sizing-%s' % self.alias)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def detect_max_connections(self):
+        """ The server's connection limit, None if unknown """
+        if self.options['MAX_CONNECTIONS']:
+            return int(self.options['MAX_CONNECTIONS'])
+
+        # imported here: prewarm imports the backends machinery
+        from database_pool.core.prewarm import _create_connection
+
+        wrapper = _create_connection(self.alias)
+        sql = MAX_CONNECTIONS_QUERIES.get(wrapper.vendor)
+
+        if sql is None:
+            return None
+
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute(sql)
+                return int(cursor.fetchone()[0])
+        except Exception as exc:
+            logger.warning("Alias: [%s] can't detect the server's max connections, caused by: %s", self.alias, exc)
+            return None
+        finally:
+            wrapper.close()
+
+    def apply_budget(self):
+        """ Cap POOL_SIZE + MAX_OVERFLOW by this process's share of the server's max connections """
+        max_connections = self.detect_max_connections()
+
+        if max_connections is None:
+            return
+
+        if self.options['PROCESSES'] is None:
+            logger.warning("Alias: [%s] AUTOSIZE['PROCESSES'] isn't set: every process may open up to %d connections, "
+                           "the server's whole budget", self.alias, max_connections - int(self.options['RESERVED']))
+
+        processes = max(int(self.options['PROCESSES'] or 1), 1)
+        self.budget = max((max_connections - int(self.options['RESERVED'])) // processes, 1)
+        self.max_size = min(self.max_size, self.budget)
+        self.min_size = min(self.min_size, self.max_size)
+
+        size = self.db_pool.size()
+        if size > self.max_size or self._overflow_for(size) != self.db_pool._max_overflow:
+            self.resize(min(size, self.max_size), 'server max_connections %d, %d process(es), budget %d'
+                        % (max_connections, processes, self.budget))
+
+    def _overflow_for(self, size):
+        """ The max overflow of a pool of `size`: size + overflow never goes beyond max_size(the budget included) """
+        if self.max_overflow == -1 and self.budget is None:
+            return -1
+
+        room = max(self.max_size - size, 0)
+        return room if self.max_overflow == -1 else min(self.max_overflow, room)
+
+    def resize(self, size, reason):
+        old_size, old_overflow = self.db_pool.size(), self.db_pool._max_overflow
+        max_overflow = self._overflow_for(size)
+        closed = resize_pool(self.db_pool, size, max_overflow)
+
+        logger.info("Alias: [%s]'s pool resized: size %d -> %d, max overflow %d -> %d, %d idle closed, reason: %s",
+                    self.alias, old_size, size, old_overflow, max_overflow, closed, reason)
+
+    def _mean_wait(self):
+        """ Mean checkout wait since the last decision """
+        metrics = PoolMetricsRegistry().get(self.alias)
+
+        if metrics is None:
+            return 0.0, 0
+
+        with metrics.lock:
+            total, count = metrics.checkout_wait.sum, metrics.checkout_wait.count
+
+        last_total, last_count = self._last_wait
+        self._last_wait = (total, count)
+
+        checkouts = count - last_count
+        return ((total - last_total) / checkouts if checkouts else 0.0), checkouts
+
+    def tick(self):
+        """ Take one sizing decision """
+        options = self.options
+        step = max(int(options['STEP']), 1)
+
+        size = self.db_pool.size()
+        idle = self.db_pool.checkedin()
+        overflow = max(self.db_pool.overflow(), 0)
+        wait, checkouts = self._mean_wait()
+
+        if wait > options['WAIT_THRESHOLD'] or overflow:
+            self._idle_streak = 0
+
+            if size < self.max_size:
+                self.resize(min(size + step, self.max_size),
+                            'mean checkout wait %.4fs over %d checkouts, %d overflow' % (wait, checkouts, overflow))
+            return
+
+        if idle >= step:
+            self._idle_streak += 1
+        else:
+            self._idle_streak = 0
+
+        if self._idle_streak >= options['SHRINK_AFTER'] and size > self.min_size:
+            self._idle_streak = 0
+            self.resize(max(size - step, self.min_size),
+                        '%d idle for %d decisions, mean checkout wait %.4fs' % (idle, options['SHRINK_AFTER'], wait))
+
+    def _run(self):
+        try:
+            self.apply_budget()
+        except Exception as exc:
+            logger.error("Alias: [%s] applying the max connections budget failed, caused by: %s", self.alias, exc)
+
+        while not self._stop.wait(self.options['INTERVAL']):
+            try:
+                self.tick()
+            except Exception as exc:
+                logger.error("Alias: [%s] pool sizing failed, caused by: %s", self.alias, exc)
+
+
+# alias -> controller of this process
+_controllers = {}
+
+
+def start_controller(alias, db_pool, settings_dict, max_overflow):
+    """ Start the controller of alias's new pool if POOL_OPTIONS['AUTOSIZE'] is set """
+    options = get_autosize_options(settings_dict)
+
+    if options is None:
+        return None
+
+    previous = _controllers.pop(alias, None)
+    if previous is not None:
+        previous.stop()
+
+    controller = PoolSizeController(alias, db_pool, options, max_overflow)
+    _controllers[alias] = controller
+    controller.start()
+
+    logger.info("Alias: [%s]'s pool adaptive sizing started, size %d within [%d, %d]",
+                alias, db_pool.size(), controller.min_size, controller.max_size)
+    return controller
+
+
+def _after_fork_in_child():
+    # the controllers' threads didn't survive the fork, new ones start with the new pools
+    _controllers.clear()
+
+
+DBConnectionPool().fork_callbacks.append(_after_fork_in_child)
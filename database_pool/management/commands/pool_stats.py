@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from database_pool.core.metrics import MetricsSegment, aggregate_snapshots, render_prometheus, histogram_quantile
+
+
+class Command(BaseCommand):
+    help = "Show the connection pool metrics aggregated across all worker processes of this host"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['table', 'json', 'prometheus'], default='table',
+                            help='Output format, default: table')
+        parser.add_argument('--alias', action='append', dest='aliases',
+                            help='Only show this database alias, can be repeated')
+        parser.add_argument('--dir', dest='directory',
+                            help='Directory of the shared-memory segments, default: settings.DATABASE_POOL_METRICS_DIR')
+
+    def handle(self, *args, **options):
+        process_snapshots = MetricsSegment.read_all(options['directory'])
+        pools = aggregate_snapshots(process_snapshots)
+
+        if options['aliases']:
+            pools = {alias: pools[alias] for alias in options['aliases'] if alias in pools}
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps({'processes': len(process_snapshots), 'pools': pools}, indent=4))
+        elif options['format'] == 'prometheus':
+            self.stdout.write(render_prometheus(pools), ending='')
+        else:
+            self.write_table(pools, len(process_snapshots))
+
+    def write_table(self, pools, processes):
+        if not pools:
+            self.stdout.write("No pool metrics published by any process")
+            return
+
+        def millis(value):
+            if value is None:
+                return '-'
+            return '>%.0f' % (value * 1000) if value == float('inf') else '%.1f' % (value * 1000)
+
+        def percent(hits, misses):
+            return '%.1f' % (hits * 100.0 / (hits + misses)) if hits + misses else '-'
+
+        header = ('alias', 'procs', 'size', 'in_use', 'idle', 'overflow', 'checkouts', 'connects', 'recycles',
+                  'invalid', 'ping_fail', 'stmt_hit%', 'wait_p50', 'wait_p99', 'hold_p50', 'hold_p99')
+        rows = [header]
+
+        for alias, pool in sorted(pools.items()):
+            gauges, counters = pool['gauges'], pool['counters']
+            rows.append((
+                alias, pool['processes'], gauges['size'], gauges['in_use'], gauges['idle'], gauges['overflow'],
+                counters['checkouts'], counters['connects'], counters['recycles'], counters['invalidations'],
+                counters['pre_ping_failures'],
+                percent(counters.get('statement_cache_hits', 0), counters.get('statement_cache_misses', 0)),
+                millis(histogram_quantile(pool['checkout_wait'], 0.5)),
+                millis(histogram_quantile(pool['checkout_wait'], 0.99)),
+                millis(histogram_quantile(pool['hold'], 0.5)),
+                millis(histogram_quantile(pool['hold'], 0.99)),
+            ))
+
+        widths = [max(len(str(row[index])) for row in rows) for index in range(len(header))]
+        for row in rows:
+            self.stdout.write('  '.join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+        self.stdout.write("\n%d process(es), wait and hold in milliseconds (upper bound of the bucket)" % processes)
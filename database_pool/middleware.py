@@ -0,0 +1,232 @@
+"""
+Per-request profile of the database work of the pooled backends, cheap enough for production.
+
+settings.py:
+    MIDDLEWARE = [
+        'database_pool.middleware.QueryProfilerMiddleware',
+        ......
+    ]
+    DATABASE_POOL_PROFILER = {              # optional
+        'SAMPLE_RATE': 0.1,                 # share of the requests profiled, default: 1.0
+        'REPEATED_QUERY_THRESHOLD': 5,      # a statement run this many times by a request is reported, default: 5
+        'SERVER_TIMING': True,              # Server-Timing header of the profiled responses, default: True
+        'LOG_LEVEL': logging.INFO,          # of the log line of the profiled requests, default: INFO
+    }
+
+A profiled request counts per alias its queries and their time, the time its checkouts waited for a pooled
+connection, how long it held the connections, and the statements it ran over and over(the N+1 pattern of a
+loop over a queryset). The response gets a Server-Timing header, eg:
+    Server-Timing: db;dur=12.5;desc="9 queries", db-wait;dur=0.3, db-hold;dur=40.2
+and one line of JSON is logged by the "django" logger:
+    db profile {"method": "GET", "path": "/items/", "status": 200, "aliases": {"default": {"queries": 9, ...}}}
+
+The other requests only cost a random() call. The counters of a connection are allocated once and reset
+by every profiled request it serves. Only the connections of the aliases the thread already uses are
+profiled from the start, the others join at their first checkout: the profiler builds no DatabaseWrapper.
+A streaming response is profiled until the server closes it, without the Server-Timing header(sent already).
+"""
+
+import json
+import time
+import random
+import logging
+import contextvars
+
+from django.conf import settings
+from django.db import connections
+
+__all__ = ["QueryProfilerMiddleware", "QueryProfile", "RequestProfiling", "current_profiling"]
+
+logger = logging.getLogger("django")
+
+DEFAULT_REPEATED_QUERY_THRESHOLD = 5
+# the repeated statements logged at most, the longest are cut
+MAX_REPEATED_LOGGED = 5
+MAX_STATEMENT_LOGGED = 200
+
+# the profiling of the current request, joined by the connections checked out first during it(DBPoolWrapperMixin)
+current_profiling = contextvars.ContextVar('database_pool_profiling', default=None)
+
+
+class QueryProfile:
+    """ The counters of one connection(DatabaseWrapper) for the request being profiled """
+    __slots__ = ('alias', 'started', 'queries', 'db_time', 'checkouts', 'checkout_wait', 'hold_time', 'statements')
+
+    def __init__(self, alias):
+        self.alias = alias
+        # sql -> executions
+        self.statements = {}
+        self.reset()
+
+    def reset(self, started=None):
+        self.started = started
+        self.queries = 0
+        self.db_time = 0.0
+        self.checkouts = 0
+        self.checkout_wait = 0.0
+        self.hold_time = 0.0
+        self.statements.clear()
+
+    def observe_checkout(self, wait):
+        """ Called by the DatabaseWrapper once it checked a connection out """
+        self.checkouts += 1
+        self.checkout_wait += wait
+
+    def observe_checkin(self, checkout_at, now):
+        """ Called by the DatabaseWrapper once it gave the connection back(time.perf_counter() times) """
+        self.hold_time += now - max(checkout_at, self.started)
+
+    def __call__(self, execute, sql, params, many, context):
+        """ Execute wrapper of the connection """
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def repeated(self, threshold):
+        """ :return: [(sql, executions)] of the statements run at least `threshold` times, most run first """
+        repeated = [(sql, count) for sql, count in self.statements.items() if count >= threshold]
+        repeated.sort(key=lambda item: item[1], reverse=True)
+        return repeated
+
+
+class RequestProfiling:
+    """ The QueryProfiles of the connections used by the request being profiled """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # [(DatabaseWrapper, QueryProfile)]
+        self.profiles = []
+
+    def join(self, connection):
+        """ Profile a pooled DatabaseWrapper for the rest of the request """
+        profile = connection.__dict__.get('_query_profile_counters')
+        if profile is None:
+            profile = connection._query_profile_counters = QueryProfile(connection.alias)
+
+        profile.reset(self.started)
+        # run by the pool's own execute wrappers(DBPoolWrapperMixin._wrap_executor)
+        connection.query_profile = profile
+        self.profiles.append((connection, profile))
+        return profile
+
+
+def initialized_connections():
+    """ The DatabaseWrappers the thread already built, the other aliases are left alone """
+    try:
+        return connections.all(initialized_only=True)
+    except TypeError:
+        # Django < 4.1
+        wrappers = (getattr(connections._connections, alias, None) for alias in connections)
+        return [connection for connection in wrappers if connection is not None]
+
+
+class QueryProfilerMiddleware:
+    """ Profile a sample of the requests: Server-Timing header and a structured log line """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        options = getattr(settings, 'DATABASE_POOL_PROFILER', {})
+        self.sample_rate = float(options.get('SAMPLE_RATE', 1.0))
+        self.threshold = int(options.get('REPEATED_QUERY_THRESHOLD', DEFAULT_REPEATED_QUERY_THRESHOLD))
+        self.server_timing = bool(options.get('SERVER_TIMING', True))
+        self.log_level = options.get('LOG_LEVEL', logging.INFO)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        profiling = self.start()
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.stop(profiling)
+            raise
+
+        if response.streaming:
+            # the queries of the streamed content are profiled as well, until the server closes the response
+            response._resource_closers.append(lambda: self.finish(request, response, profiling))
+        else:
+            self.finish(request, response, profiling)
+
+        return response
+
+    def start(self):
+        profiling = RequestProfiling()
+
+        for connection in initialized_connections():
+            # the pooled backends only
+            if hasattr(connection, 'query_profile'):
+                profiling.join(connection)
+
+        current_profiling.set(profiling)
+        return profiling
+
+    def stop(self, profiling):
+        now = time.perf_counter()
+        current_profiling.set(None)
+
+        for connection, profile in profiling.profiles:
+            connection.query_profile = None
+
+            # still held, until request_finished closes it
+            checkout_at = getattr(connection, '_checkout_at', None)
+            if checkout_at is not None:
+                profile.observe_checkin(checkout_at, now)
+
+        return now
+
+    def finish(self, request, response, profiling):
+        now = self.stop(profiling)
+        self.report(request, response, profiling.profiles, now)
+
+    def report(self, request, response, profiles, now):
+        # the aliases the request didn't use are left out
+        used = [profile for _, profile in profiles if profile.queries or profile.checkouts]
+        if not used:
+            return
+
+        queries = sum(profile.queries for profile in used)
+        db_time = sum(profile.db_time for profile in used)
+        checkout_wait = sum(profile.checkout_wait for profile in used)
+        hold_time = sum(profile.hold_time for profile in used)
+
+        # the headers of a streaming response are sent already
+        if self.server_timing and not response.streaming:
+            timing = 'db;dur=%.1f;desc="%d queries", db-wait;dur=%.1f, db-hold;dur=%.1f' % (
+                db_time * 1000, queries, checkout_wait * 1000, hold_time * 1000,
+            )
+            if response.has_header('Server-Timing'):
+                timing = '%s, %s' % (response['Server-Timing'], timing)
+            response['Server-Timing'] = timing
+
+        if not logger.isEnabledFor(self.log_level):
+            return
+
+        aliases = {}
+        for profile in used:
+            repeated = profile.repeated(self.threshold)
+            aliases[profile.alias] = {
+                'queries': profile.queries,
+                'db_ms': round(profile.db_time * 1000, 3),
+                'checkouts': profile.checkouts,
+                'checkout_wait_ms': round(profile.checkout_wait * 1000, 3),
+                'hold_ms': round(profile.hold_time * 1000, 3),
+                'repeated': [{'sql': sql[:MAX_STATEMENT_LOGGED], 'count': count}
+                             for sql, count in repeated[:MAX_REPEATED_LOGGED]],
+            }
+
+        logger.log(self.log_level, "db profile %s", json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': queries,
+            'db_ms': round(db_time * 1000, 3),
+            'aliases': aliases,
+        }))
@@ -0,0 +1,305 @@
+"""
+Replica-aware database router, reads go to the least loaded pool of a replica group.
+
+settings.py:
+    DATABASE_ROUTERS = ['database_pool.routers.ReplicaPoolRouter']
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            ......
+            'POOL_OPTIONS': {
+                'POOL_SIZE': 10,
+                'REPLICAS': {
+                    'ALIASES': ['replica1', 'replica2'],
+                    'STRATEGY': 'in_use',         # or 'latency': the shortest recent checkout wait first
+                    'STICKY_SECONDS': 2,          # reads follow a write to the primary for this long
+                    'MAX_LAG': 10,                # seconds, a replica lagging more is evicted
+                    'LAG_CHECK_INTERVAL': 5,      # seconds, 0 disables the lag checks
+                },
+            }
+        },
+        'replica1': {...},
+        'replica2': {...},
+    }
+"""
+
+import time
+import random
+import logging
+import threading
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.metrics import PoolMetricsRegistry
+from database_pool.core.prewarm import _create_connection
+
+__all__ = ["ReplicaGroup", "ReplicaPoolRouter", "get_replica_group"]
+
+logger = logging.getLogger("django")
+
+DEFAULT_REPLICA_OPTIONS = {
+    'ALIASES': [],
+    'STRATEGY': 'in_use',
+    'STICKY_SECONDS': 2,
+    'MAX_LAG': 10,
+    'LAG_CHECK_INTERVAL': 5,
+}
+
+# replication lag in seconds by vendor, the statements are tried in turn until one runs
+LAG_QUERIES = {
+    'postgresql': (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END",
+    ),
+    # MySQL < 8.0.22 and MariaDB only know SHOW SLAVE STATUS
+    'mysql': ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"),
+}
+
+# monotonic time of the latest write of the current context, per primary alias
+_last_write = ContextVar('database_pool_last_write', default=None)
+
+
+class ReplicaGroup:
+    """ One primary and its replicas, with the replicas' health """
+
+    def __init__(self, primary, options):
+        self.primary = primary
+        self.replicas = list(options['ALIASES'])
+        self.strategy = options['STRATEGY']
+        self.sticky_seconds = options['STICKY_SECONDS']
+        self.max_lag = options['MAX_LAG']
+        self.lag_check_interval = options['LAG_CHECK_INTERVAL']
+
+        # alias -> reason, replicas not used for reads
+        self.evicted = {}
+        self.lags = {}
+        # alias -> the lag statement its server runs
+        self._lag_queries = {}
+        self._stop = threading.Event()
+        self._checker = None
+
+    def start(self):
+        if self.lag_check_interval and self.replicas and self._checker is None:
+            self._checker = threading.Thread(target=self._check_loop, daemon=True,
+                                             name='db-replica-lag-%s' % self.primary)
+            self._checker.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def healthy_replicas(self):
+        return [alias for alias in self.replicas if alias not in self.evicted]
+
+    def load(self, alias):
+        """ (in-use connections, recent checkout wait) of alias's pool in this process """
+        conn_pool = DBConnectionPool()
+        in_use = conn_pool[alias].checkedout() if alias in conn_pool else 0
+
+        metrics = PoolMetricsRegistry().get(alias)
+        wait = metrics.wait_ewma if metrics is not None else 0.0
+
+        return (wait, in_use) if self.strategy == 'latency' else (in_use, wait)
+
+    def choose(self):
+        """ The replica for the next read, or the primary if none is healthy """
+        candidates = self.healthy_replicas()
+
+        if not candidates:
+            return self.primary
+
+        loads = [(self.load(alias), alias) for alias in candidates]
+        best = min(load for load, _ in loads)
+
+        # spread the reads among the equally loaded replicas
+        return random.choice([alias for load, alias in loads if load == best])
+
+    def mark_write(self):
+        writes = dict(_last_write.get() or {})
+        writes[self.primary] = time.monotonic()
+        _last_write.set(writes)
+
+    def is_sticky(self):
+        writes = _last_write.get()
+        last_write = writes.get(self.primary) if writes else None
+
+        return last_write is not None and time.monotonic() - last_write < self.sticky_seconds
+
+    def check_lag(self, alias):
+        """
+        Replication lag of alias in seconds, None if unknown(no lag statement for its vendor,
+        or none its server runs). Raises if the replica is unreachable.
+        """
+        # a private wrapper, the checker thread mustn't share the thread-local connections
+        wrapper = _create_connection(alias)
+        queries = LAG_QUERIES.get(wrapper.vendor)
+
+        if not queries:
+            return None
+
+        known = self._lag_queries.get(alias)
+        if known is not None:
+            queries = (known,)
+
+        try:
+            # the errors of the connection itself go up: the replica is unreachable
+            wrapper.ensure_connection()
+
+            for sql in queries:
+                try:
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(sql)
+                        lag = self._read_lag(wrapper.vendor, cursor)
+                except DatabaseError as exc:
+                    # the statement failed, not the connection
+                    if not wrapper.is_usable():
+                        raise
+
+                    logger.debug("Replica [%s] of [%s] can't run %r: %s", alias, self.primary, sql, exc)
+                    continue
+
+                self._lag_queries[alias] = sql
+                return lag
+
+            # eg: the user of the alias lacks the privilege, the replica is still used
+            logger.warning("Replica [%s] of [%s]: lag unknown, no lag statement ran", alias, self.primary)
+            self._lag_queries.pop(alias, None)
+            return None
+        finally:
+            wrapper.close()
+
+    @staticmethod
+    def _read_lag(vendor, cursor):
+        if vendor == 'mysql':
+            row = cursor.fetchone()
+            if row is None:
+                return 0.0
+
+            columns = [column[0] for column in cursor.description]
+            for column in ('Seconds_Behind_Source', 'Seconds_Behind_Master'):
+                if column in columns:
+                    lag = row[columns.index(column)]
+                    # NULL: the replication is broken
+                    return float('inf') if lag is None else float(lag)
+
+            return None
+
+        lag = cursor.fetchone()[0]
+        return 0.0 if lag is None else float(lag)
+
+    def check_all(self):
+        for alias in self.replicas:
+            try:
+                lag = self.check_lag(alias)
+            except Exception as exc:
+                self._evict(alias, 'unreachable: %s' % exc)
+                continue
+
+            self.lags[alias] = lag
+
+            if lag is not None and lag > self.max_lag:
+                self._evict(alias, 'lagging %.1fs behind' % lag)
+            elif self.evicted.pop(alias, None) is not None:
+                logger.warning("Replica [%s] of [%s] is back in service, lag: %s", alias, self.primary, lag)
+
+    def _evict(self, alias, reason):
+        if alias not in self.evicted:
+            logger.warning("Replica [%s] of [%s] is evicted from reads: %s", alias, self.primary, reason)
+
+        self.evicted[alias] = reason
+
+    def _check_loop(self):
+        while not self._stop.wait(self.lag_check_interval):
+            self.check_all()
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_replica_group(primary=DEFAULT_DB_ALIAS):
+    """ The replica group declared by POOL_OPTIONS['REPLICAS'] of primary, None if there's none """
+    try:
+        return _groups[primary]
+    except KeyError:
+        pass
+
+    with _groups_lock:
+        if primary not in _groups:
+            replicas = connections.databases[primary].get('POOL_OPTIONS', {}).get('REPLICAS')
+            group = None
+
+            if replicas:
+                options = dict(DEFAULT_REPLICA_OPTIONS)
+
+                if isinstance(replicas, dict):
+                    options.update({key.upper(): value for key, value in replicas.items()})
+                else:
+                    options['ALIASES'] = list(replicas)
+
+                group = ReplicaGroup(primary, options)
+                group.start()
+
+            _groups[primary] = group
+
+    return _groups[primary]
+
+
+def _after_fork_in_child():
+    # the lag checkers didn't survive the fork, the groups are rebuilt lazily
+    _groups.clear()
+
+
+DBConnectionPool().fork_callbacks.append(_after_fork_in_child)
+
+
+class ReplicaPoolRouter:
+    """
+    Reads go to the replica of `primary_alias`'s group with the fewest in-use connections
+    (or the shortest recent checkout wait), except shortly after a write of the same context.
+    Writes and migrations go to the primary.
+    """
+    primary_alias = DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        group = get_replica_group(self.primary_alias)
+
+        if group is None:
+            return None
+
+        if group.is_sticky():
+            # read your writes
+            return group.primary
+
+        return group.choose()
+
+    def db_for_write(self, model, **hints):
+        group = get_replica_group(self.primary_alias)
+
+        if group is None:
+            return None
+
+        group.mark_write()
+        return group.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        group = get_replica_group(self.primary_alias)
+
+        if group is None:
+            return None
+
+        aliases = {group.primary, *group.replicas}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        group = get_replica_group(self.primary_alias)
+
+        if group is not None and db in group.replicas:
+            return False
+
+        return None
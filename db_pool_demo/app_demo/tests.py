@@ -1,144 +1,55 @@
-import time
-import random
-from datetime import tzinfo
+"""
+Smoke tests of the benchmark suite against the demo database(settings.DATABASES['default']),
+the measures themselves are run by:
 
-from django.conf import settings
-from django.test import TestCase
-from django.utils import timezone
-from faker import Faker
-
-from app_demo.models import PoolDemoModel
-
-tzinfo = timezone.get_default_timezone()
-
-
-class MySQLDBPoolTestCase(TestCase):
-    def setUp(self) -> None:
-        self._faker = Faker(locale='zh_CN')
-
-    def tearDown(self) -> None:
-        # super().tearDown()
-        pass
-
-    def test_insert_with_model(self):
-        for i in range(100):
-            if i % 2 == 0:
-                obj = PoolDemoModel.objects.create(
-                    name=self._faker.address(),
-                    size=random.randint(100, 100000),
-                    od_date=self._faker.date_time(tzinfo=tzinfo, end_datetime=None),
-                    remark="model_one_create_commit"
-                )
-                # self.assertEqual(obj.id, 100, msg="DD:%s" % obj.id)
-                # obj.refresh_from_db()
-            else:
-                obj = PoolDemoModel(
-                    name=self._faker.address(),
-                    size=random.randint(100, 100000),
-                    od_date=self._faker.date_time(tzinfo=tzinfo, end_datetime=None),
-                    remark="model_one_save_commit"
-                )
-                obj.save()
-
-        bulk_objs = []
-        for i in range(100):
-            obj = PoolDemoModel(
-                name=self._faker.address(),
-                size=random.randint(100, 100000),
-                od_date=self._faker.date_time(tzinfo=tzinfo, end_datetime=None),
-                remark="model_bulk_create_commit"
-            )
-            bulk_objs.append(obj)
-
-        PoolDemoModel.objects.bulk_create(bulk_objs)
-
-    def test_insert_with_sql(self):
-        pass
-
-    def test_query_with_model(self):
-        pass
-
-    def test_query_with_sql(self):
-        pass
-
-    def test_update_with_model(self):
-        pass
-
-    def test_update_with_sql(self):
-        pass
-
-    def test_delete_with_model(self):
-        pass
-
-    def test_delete_with_sql(self):
-        pass
-
-
-class PgDBPoolTest(TestCase):
-    def setUp(self) -> None:
-        self._faker = Faker(locale='zh_CN')
+    $ python benchmarks/suite.py --backend mysql
+"""
 
-    def tearDown(self) -> None:
-        super().tearDown()
-
-    def test_insert_with_model(self):
-        max_cnt = 2000
-
-        for i in range(max_cnt):
-            pass
-
-    def test_insert_with_sql(self):
-        pass
-
-    def test_query_with_model(self):
-        pass
+import os
+import sys
+import json
 
-    def test_query_with_sql(self):
-        pass
-
-    def test_update_with_model(self):
-        pass
-
-    def test_update_with_sql(self):
-        pass
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase
 
-    def test_delete_with_model(self):
-        pass
+sys.path.insert(0, os.path.join(settings.BASE_DIR, "benchmarks"))
 
-    def test_delete_with_sql(self):
-        pass
+import suite  # noqa: E402
 
 
-class PracleDBPoolTest(TestCase):
+class BenchmarkSuiteTestCase(TransactionTestCase):
     def setUp(self) -> None:
-        self._faker = Faker(locale='zh_CN')
+        self.sql = "SELECT 1 FROM DUAL" if connection.vendor == 'oracle' else "SELECT 1"
 
     def tearDown(self) -> None:
-        super().tearDown()
-
-    def test_insert_with_model(self):
-        max_cnt = 2000
+        connection.close()
 
-        for i in range(max_cnt):
-            pass
+    def test_request(self):
+        checkout, request = suite.run_request(self.sql, queries=2)
 
-    def test_insert_with_sql(self):
-        pass
+        self.assertGreaterEqual(request, checkout)
+        # close_old_connections() gave the connection back at the end of the request
+        self.assertIsNone(connection.connection)
 
-    def test_query_with_model(self):
-        pass
+    def test_threads(self):
+        for num_threads in (1, 8):
+            result = suite.run_threads(num_threads, duration=0.2, sql=self.sql, queries=2)
 
-    def test_query_with_sql(self):
-        pass
+            self.assertGreater(result['requests'], 0)
+            self.assertLessEqual(result['checkout_p50_ms'], result['checkout_p99_ms'])
+            self.assertAlmostEqual(result['queries_per_second'], result['requests_per_second'] * 2)
 
-    def test_update_with_model(self):
-        pass
+    def test_churn(self):
+        result = suite.run_churn(10)
 
-    def test_update_with_sql(self):
-        pass
+        self.assertEqual(result['count'], 10)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
 
-    def test_delete_with_model(self):
-        pass
+    def test_compare(self):
+        results = {'pooled': {'threads': {'1': suite.run_threads(1, 0.2, self.sql, 1)}, 'churn': suite.run_churn(5)}}
+        slower = json.loads(json.dumps(results))
+        slower['pooled']['threads']['1']['requests_per_second'] /= 2
 
-    def test_delete_with_sql(self):
-        pass
+        self.assertEqual(suite.compare({'results': results}, {'results': results}, 0.1), 0)
+        self.assertEqual(suite.compare({'results': results}, {'results': slower}, 0.1), 1)
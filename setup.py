@@ -18,6 +18,8 @@ setup(
         "Programming Language :: Python :: 3.10",
         "Framework :: Django :: 3",
         "Framework :: Django :: 4.0",
+        "Framework :: Django :: 4.1",
+        "Framework :: Django :: 4.2",
         "License :: OSI Approved :: MIT License",
         "Topic :: Software Development :: Libraries :: Python Modules",
         "Intended Audience :: Developers"
@@ -31,9 +33,17 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=[
-        'django>=3.0,<=4.0.8',
+        'django>=3.0,<5.0',
         'sqlalchemy==1.4.44',
         'cx-Oracle==8.3.0',
         'psycopg2==2.9.5'
     ],
+    extras_require={
+        # asyncio pool of the postgresql backend
+        'asyncio': ['psycopg>=3.1'],
+        # database_pool.backends.psycopg, Django 4.2+
+        'psycopg': ['psycopg>=3.1', 'psycopg-pool>=3.2'],
+        # the Oracle wrapper in thin mode, cx_Oracle stays the thick fallback
+        'oracledb': ['oracledb>=1.0'],
+    },
 )
@@ -0,0 +1,11 @@
+import os
+import logging
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+django.setup()
+
+# the pools log every creation at INFO, database_pool logs its settings at WARNING
+logging.getLogger('django').setLevel(logging.ERROR)
+logging.getLogger().setLevel(logging.ERROR)
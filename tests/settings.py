@@ -0,0 +1,34 @@
+"""
+Settings of the unit tests: the pooled backend of the fake driver(database_pool.backends.fake),
+no database server is needed.
+
+    $ python -m pytest tests
+"""
+
+import os
+import tempfile
+
+SECRET_KEY = 'database-pool-tests'
+
+INSTALLED_APPS = [
+    'database_pool',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'database_pool.backends.fake',
+        'NAME': 'file:tests?mode=memory&cache=shared',
+        'POOL_OPTIONS': {
+            'ENGINE': 'native',
+            'ECHO': False,
+        },
+    },
+}
+
+USE_TZ = True
+TIME_ZONE = 'UTC'
+ALLOWED_HOSTS = ['*']
+
+# the files shared by the processes of the host, kept apart from the other projects
+DATABASE_POOL_METRICS_DIR = os.path.join(tempfile.gettempdir(), 'django-database-pool-tests-%s' % os.getpid())
+DATABASE_POOL_BUDGET_DIR = DATABASE_POOL_METRICS_DIR
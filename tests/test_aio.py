@@ -0,0 +1,133 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from django.test import override_settings
+
+from database_pool.core import aio
+from database_pool.core.aio import AsyncConnectionPool, get_async_pool
+
+
+class Connection:
+    closed = False
+
+
+class Driver:
+    """ The callbacks of an asyncio pool, counting the pings and closes """
+
+    def __init__(self):
+        self.pings = 0
+        self.closed = []
+        self.alive = True
+
+    async def creator(self):
+        return Connection()
+
+    async def ping(self, conn):
+        self.pings += 1
+        return self.alive
+
+    async def close(self, conn):
+        conn.closed = True
+        self.closed.append(conn)
+
+    def callbacks(self):
+        return {'creator': self.creator, 'ping': self.ping, 'close': self.close}
+
+
+class AsyncConnectionPoolTestCase(unittest.TestCase):
+    def test_pre_ping_after_idleness_or_error(self):
+        driver = Driver()
+        db_pool = AsyncConnectionPool(pool_size=1, pre_ping_idle=60, **driver.callbacks())
+
+        async def main():
+            async with db_pool.connection():
+                pass
+
+            # recently used: not pinged
+            async with db_pool.connection():
+                pass
+            self.assertEqual(driver.pings, 0)
+
+            # its last use failed
+            with self.assertRaises(ValueError):
+                async with db_pool.connection():
+                    raise ValueError()
+
+            async with db_pool.connection():
+                pass
+            self.assertEqual(driver.pings, 1)
+
+            # idle for too long
+            conn, created_at, released_at = db_pool._idle.pop()
+            db_pool._idle.append((conn, created_at, released_at - 61))
+
+            async with db_pool.connection():
+                pass
+            self.assertEqual(driver.pings, 2)
+
+        asyncio.run(main())
+
+    def test_failed_connection_pinged_before_reaching_a_waiter(self):
+        driver = Driver()
+        db_pool = AsyncConnectionPool(pool_size=1, max_overflow=0, pre_ping_idle=60, **driver.callbacks())
+
+        async def use(alive):
+            conn = await db_pool.acquire()
+            waiting = asyncio.ensure_future(db_pool.acquire())
+            await asyncio.sleep(0)
+            self.assertEqual(len(db_pool._waiters), 1)
+
+            driver.alive = alive
+            await db_pool.release(conn, ping_needed=True)
+            served = await waiting
+            await db_pool.release(served)
+            return conn, served
+
+        async def main():
+            # still alive: handed over once pinged
+            conn, served = await use(True)
+            self.assertIs(served, conn)
+            self.assertEqual(driver.pings, 1)
+
+            # broken: closed, the waiter opens a new one
+            conn, served = await use(False)
+            self.assertIsNot(served, conn)
+            self.assertEqual(driver.pings, 2)
+            self.assertEqual(driver.closed, [conn])
+            self.assertEqual(db_pool._opened, 1)
+
+        asyncio.run(main())
+
+    def test_pools_closed_with_their_loop(self):
+        driver = Driver()
+        aio_module = mock.Mock(get_async_connection_callbacks=lambda settings_dict: driver.callbacks())
+
+        async def main():
+            db_pool = get_async_pool('default')
+
+            async with db_pool.connection() as conn:
+                pass
+
+            return db_pool, conn
+
+        with mock.patch.object(aio, 'import_module', return_value=aio_module):
+            db_pool, conn = asyncio.run(main())
+
+        self.assertTrue(db_pool._closed)
+        self.assertEqual(driver.closed, [conn])
+
+
+class TimeZoneTestCase(unittest.TestCase):
+    def test_django_timezone_name(self):
+        try:
+            from database_pool.backends.postgresql.aio import get_timezone_name
+        except Exception as exc:
+            raise unittest.SkipTest('psycopg(3) is required: %s' % exc)
+
+        with override_settings(USE_TZ=True, TIME_ZONE='Asia/Shanghai'):
+            self.assertEqual(get_timezone_name({'TIME_ZONE': None}), 'UTC')
+            self.assertEqual(get_timezone_name({'TIME_ZONE': 'Europe/Paris'}), 'Europe/Paris')
+
+        with override_settings(USE_TZ=False, TIME_ZONE='Asia/Shanghai'):
+            self.assertEqual(get_timezone_name({'TIME_ZONE': None}), 'Asia/Shanghai')
@@ -0,0 +1,30 @@
+import unittest
+
+from database_pool.core.budget import get_budget
+from database_pool.core.exceptions import ConnectionBudgetExceeded
+
+from tests.utils import make_wrapper, unique_alias
+
+
+class HostBudgetTestCase(unittest.TestCase):
+    def test_budget_shared_by_aliases(self):
+        budget = {'MAX_CONNECTIONS': 2, 'NAME': unique_alias('budget'), 'TIMEOUT': 0.1}
+        wrappers = [make_wrapper(POOL_SIZE=2, BUDGET=budget) for _ in range(2)]
+
+        wrappers[0].connect()
+        wrappers[1].connect()
+
+        host_budget, _ = get_budget(wrappers[0].settings_dict)
+        self.assertEqual(len(host_budget.held), 2)
+
+        third = make_wrapper(POOL_SIZE=2, BUDGET=budget)
+        with self.assertRaises(ConnectionBudgetExceeded):
+            third.connect()
+
+        # a connection idle in its pool gives its share to the one waiting
+        wrappers[0].close()
+        third.connect()
+        self.assertEqual(len(host_budget.held), 2)
+
+        third.close()
+        wrappers[1].close()
@@ -0,0 +1,184 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db.utils import ProgrammingError
+
+from database_pool.core.cache import StatementCache, PostgresStatementCache
+
+from tests.utils import make_wrapper
+
+try:
+    import cx_Oracle
+except ImportError:
+    cx_Oracle = None
+
+
+class StaleStatement(Exception):
+    pgcode = '26000'
+
+
+class PostgresStatementCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = PostgresStatementCache(object(), size=2)
+        # the statements reaching the driver: PREPARE/DEALLOCATE by the cache's cursor, the others by `execute`
+        self.prepared = []
+        self.executed = []
+        self.autocommit = True
+
+        self.context = {
+            'connection': SimpleNamespace(get_autocommit=lambda: self.autocommit),
+            'cursor': SimpleNamespace(cursor=SimpleNamespace(execute=self.prepared.append, name=None)),
+        }
+
+    def execute(self, sql, params, many, context):
+        self.executed.append(sql)
+
+    def call(self, sql, params=(1,)):
+        return self.cache(self.execute, sql, list(params), False, self.context)
+
+    def test_prepared_once(self):
+        self.call('SELECT a FROM t WHERE id = %s')
+        self.call('SELECT a FROM t WHERE id = %s')
+
+        self.assertEqual(self.prepared, ['PREPARE dbpool_1 AS SELECT a FROM t WHERE id = $1'])
+        self.assertEqual(self.executed, ['EXECUTE dbpool_1 (%s)'] * 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_lru_deallocated(self):
+        for table in ('a', 'b', 'c'):
+            self.call('SELECT * FROM %s WHERE id = %%s' % table)
+
+        self.assertEqual(self.prepared[-2:], ['DEALLOCATE dbpool_1', 'PREPARE dbpool_3 AS SELECT * FROM c WHERE id = $1'])
+        self.assertEqual(len(self.cache), 2)
+
+    def test_not_prepared_in_transaction(self):
+        self.autocommit = False
+        self.call('SELECT 1 WHERE 1 = %s')
+
+        self.assertEqual(self.prepared, [])
+        self.assertEqual(self.executed, ['SELECT 1 WHERE 1 = %s'])
+
+    def test_stale_statement_run_again(self):
+        self.call('SELECT 1 WHERE 1 = %s')
+
+        def execute(sql, params, many, context):
+            if sql.startswith('EXECUTE'):
+                raise StaleStatement()
+            self.executed.append(sql)
+
+        self.cache(execute, 'SELECT 1 WHERE 1 = %s', [1], False, self.context)
+        self.assertEqual(self.executed[-1], 'SELECT 1 WHERE 1 = %s')
+        self.assertEqual(len(self.cache), 0)
+
+
+class NamedCursor:
+    """ psycopg2's named cursor: execute() only once, its statement is DECLAREd """
+
+    def __init__(self, cursor, name):
+        self.cursor = cursor
+        self.name = name
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        if self.statements:
+            raise ProgrammingError("can't call .execute() on named cursors more than once")
+
+        self.statements.append(sql)
+        return self.cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class NamedCursorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = make_wrapper(POOL_SIZE=1, STATEMENT_CACHE_SIZE=10)
+        self.wrapper.statement_cache_class = PostgresStatementCache
+        self.named_cursors = []
+
+        create_cursor = self.wrapper.create_cursor
+
+        def create_named_cursor(name=None):
+            cursor = create_cursor(name)
+            if name is not None:
+                cursor = NamedCursor(cursor, name)
+                self.named_cursors.append(cursor)
+            return cursor
+
+        self.wrapper.create_cursor = create_named_cursor
+        # as the postgresql backend's chunked_cursor(), used by QuerySet.iterator()
+        self.wrapper.chunked_cursor = lambda: self.wrapper._cursor(name='_django_curs_1')
+        self.addCleanup(self.wrapper.close)
+
+    def iterate(self, sql):
+        with self.wrapper.chunked_cursor() as cursor:
+            cursor.execute(sql, [1])
+            return cursor.fetchall()
+
+    def test_statement_not_prepared(self):
+        self.assertEqual(self.iterate('SELECT 1 WHERE 1 = %s'), [(1,)])
+        self.assertEqual(self.named_cursors[-1].statements, ['SELECT 1 WHERE 1 = %s'])
+
+    def test_prepared_statement_not_executed(self):
+        self.wrapper.ensure_connection()
+        # prepared by a former request
+        self.wrapper._statement_cache.store('SELECT 2 WHERE 1 = %s')
+
+        self.assertEqual(self.iterate('SELECT 2 WHERE 1 = %s'), [(2,)])
+        self.assertEqual(self.named_cursors[-1].statements, ['SELECT 2 WHERE 1 = %s'])
+
+
+class RecordingStatementCache(StatementCache):
+    wraps_execute = True
+    default_size = 10
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[sql] = None
+        return execute(sql, params, many, context)
+
+
+class BoundStatementCacheTestCase(unittest.TestCase):
+    def test_cache_of_pooled_connection(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+        wrapper.statement_cache_class = RecordingStatementCache
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        cache = wrapper._statement_cache
+        wrapper.close()
+
+        self.assertIsNone(wrapper._statement_cache)
+        self.assertEqual(wrapper.execute_wrappers, [])
+
+        # the connection checked out again keeps its cache
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 2')
+
+        self.assertIs(wrapper._statement_cache, cache)
+        self.assertEqual(list(cache.statements), ['SELECT 1', 'SELECT 2'])
+        wrapper.close()
+
+
+@unittest.skipIf(cx_Oracle is None, 'cx_Oracle is not installed')
+class OracleStatementCacheTestCase(unittest.TestCase):
+    def test_size_after_django_init(self):
+        from django.db.backends.oracle.base import DatabaseWrapper as OracleDatabaseWrapper
+        from database_pool.backends.oracle.base import DatabaseWrapper
+
+        settings_dict = dict(make_wrapper().settings_dict, POOL_OPTIONS={'STATEMENT_CACHE_SIZE': 50})
+        wrapper = DatabaseWrapper(settings_dict, 'oracle')
+
+        dbapi_connection = SimpleNamespace(stmtcachesize=50)
+        wrapper.connection = dbapi_connection
+        wrapper._pool_record = SimpleNamespace(info={}, dbapi_connection=dbapi_connection)
+
+        def init_connection_state(self):
+            # as Django's
+            self.connection.stmtcachesize = 20
+
+        with mock.patch.object(OracleDatabaseWrapper, 'init_connection_state', init_connection_state):
+            wrapper.init_connection_state()
+
+        self.assertEqual(dbapi_connection.stmtcachesize, 50)
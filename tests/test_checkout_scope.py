@@ -0,0 +1,77 @@
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from tests.utils import make_wrapper
+
+
+class TransactionScopedCheckoutTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = make_wrapper(CHECKOUT_SCOPE='transaction', POOL_SIZE=1)
+
+    def tearDown(self):
+        self.wrapper.close()
+
+    def test_released_after_autocommit_statement(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertIsNotNone(self.wrapper.connection)
+
+        self.assertIsNone(self.wrapper.connection)
+
+    def test_held_until_transaction_finished(self):
+        wrapper = self.wrapper
+
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIsNotNone(wrapper.connection)
+        wrapper.commit()
+        wrapper.set_autocommit(True)
+        self.assertIsNone(wrapper.connection)
+
+    def test_session_state_pins_the_connection(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMP TABLE pinned (id integer)')
+
+        self.assertIsNotNone(self.wrapper.connection)
+        self.assertTrue(self.wrapper._pinned)
+
+        # the temporary table is dropped by the reset at checkin
+        self.wrapper.close()
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_temp_master WHERE name = 'pinned'")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_cursor_collected_in_another_thread(self):
+        wrapper = self.wrapper
+        cursor = wrapper.cursor()
+        cursor.execute('SELECT 1')
+        connection = wrapper.connection
+        errors = []
+
+        def drop(cursors):
+            try:
+                cursors.pop()
+            except Exception as exc:
+                errors.append(exc)
+
+        cursors = [cursor]
+        del cursor
+
+        # the errors of a finalizer are only reported to sys.unraisablehook
+        with mock.patch.object(sys, 'unraisablehook', lambda unraisable: errors.append(unraisable.exc_value)):
+            thread = threading.Thread(target=drop, args=(cursors,))
+            thread.start()
+            thread.join()
+
+        # never given back by the garbage collector, but by the next closing cursor
+        self.assertEqual(errors, [])
+        self.assertIs(wrapper.connection, connection)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIsNone(wrapper.connection)
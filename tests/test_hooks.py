@@ -0,0 +1,48 @@
+import unittest
+
+from database_pool.core.hooks import PoolHookRegistry
+
+from tests.utils import make_wrapper
+
+
+class PoolHooksTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = make_wrapper()
+        self.spans = []
+        PoolHookRegistry().subscribe(self.wrapper.alias, self.spans.append, sample_rate=1.0)
+        self.addCleanup(PoolHookRegistry().unsubscribe, self.wrapper.alias, self.spans.append)
+
+    def test_spans_of_checkout(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.wrapper.close()
+        names = [span.name for span in self.spans]
+
+        self.assertEqual(names[:2], ['connect', 'checkout'])
+        self.assertIn('query', names)
+        self.assertEqual(names[-1], 'checkin')
+
+    def test_execute_wrapper_blocks_unchanged(self):
+        calls = []
+
+        def user_wrapper(execute, sql, params, many, context):
+            calls.append(sql)
+            return execute(sql, params, many, context)
+
+        # the connection is checked out(and traced) inside the block, given back outside of it
+        with self.wrapper.execute_wrapper(user_wrapper):
+            with self.wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        self.assertEqual(self.wrapper.execute_wrappers, [])
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 2')
+
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.execute_wrappers, [])
+
+        self.assertEqual(calls, ['SELECT 1'])
+        statements = [span.attributes['statement'] for span in self.spans if span.name == 'query']
+        self.assertEqual(statements, ['SELECT 1', 'SELECT 2'])
@@ -0,0 +1,117 @@
+import os
+import time
+import struct
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from django.test import override_settings
+
+from database_pool.core import metrics
+from database_pool.core.metrics import MetricsSegment, PoolMetrics, PoolMetricsRegistry, render_prometheus
+
+from tests.utils import make_wrapper
+
+
+class YieldingHeader(struct.Struct):
+    def pack_into(self, *args):
+        time.sleep(0)
+        return super().pack_into(*args)
+
+
+class MetricsSegmentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.segment = MetricsSegment(self.directory)
+
+    def tearDown(self):
+        self.segment.close()
+        os.rmdir(self.directory)
+
+    def test_concurrent_writers(self):
+        snapshots = [{'alias-%d' % i: {'value': 'x' * (i * 500)}} for i in range(4)]
+        errors = []
+
+        def writer(snapshot):
+            for _ in range(100):
+                self.segment.write(snapshot)
+
+        threads = [threading.Thread(target=writer, args=(snapshot,)) for snapshot in snapshots]
+        # the other writers run between the payload and the header of a write
+        header = mock.patch.object(metrics, '_HEADER', YieldingHeader(metrics._HEADER.format))
+        header.start()
+        self.addCleanup(header.stop)
+
+        for thread in threads:
+            thread.start()
+
+        while any(thread.is_alive() for thread in threads):
+            try:
+                snapshot = MetricsSegment.read(self.segment.path, retries=2)
+            except ValueError as exc:
+                errors.append(exc)
+            else:
+                if snapshot is not None:
+                    self.assertIn(snapshot['pools'], snapshots)
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.segment.sequence, 2 * 100 * len(snapshots))
+
+        # the header of the last write went last
+        sequence, _ = metrics._HEADER.unpack_from(self.segment._mmap, 0)
+        self.assertEqual(sequence, self.segment.sequence)
+        self.assertIn(MetricsSegment.read(self.segment.path)['pools'], snapshots)
+
+    def test_write_in_progress(self):
+        self.segment.write({'default': {}})
+
+        # an odd sequence: the reader gives up rather than reading a torn payload
+        metrics._HEADER.pack_into(self.segment._mmap, 0, self.segment.sequence + 1, 0)
+        self.assertIsNone(MetricsSegment.read(self.segment.path, retries=2))
+
+    @override_settings(DATABASE_POOL_METRICS_DIR=None, SETTINGS_MODULE='tests.settings')
+    def test_default_directory_per_project(self):
+        directory = MetricsSegment.get_directory()
+
+        with override_settings(SETTINGS_MODULE='tests.other_settings'), \
+                mock.patch.object(os, 'getcwd', return_value='/srv/other-project'):
+            self.assertNotEqual(MetricsSegment.get_directory(), directory)
+
+        self.assertEqual(MetricsSegment.get_directory(), directory)
+
+
+class PoolMetricsRegistryTestCase(unittest.TestCase):
+    def test_last_checkins_published_by_timer(self):
+        registry = PoolMetricsRegistry()
+        wrapper = make_wrapper()
+        registry.flush()
+
+        # a burst right after a flush
+        for _ in range(3):
+            wrapper.connect()
+            wrapper.close()
+
+        deadline = time.monotonic() + metrics.FLUSH_INTERVAL * 3
+        checkouts = None
+
+        while checkouts != 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            pools = MetricsSegment.read(registry.segment.path)['pools']
+            checkouts = pools.get(wrapper.alias, {}).get('counters', {}).get('checkouts')
+
+        self.assertEqual(checkouts, 3)
+
+
+class RenderPrometheusTestCase(unittest.TestCase):
+    def test_alias_label_escaped(self):
+        alias = 'db\\"main"\nreplica'
+        text = render_prometheus({alias: PoolMetrics(alias).snapshot()})
+
+        self.assertIn('django_db_pool_size{alias="db\\\\\\"main\\"\\nreplica"} 0', text)
+        # one sample per line, whatever the alias
+        for line in text.splitlines():
+            self.assertRegex(line, r'^(# (HELP|TYPE) |django_db_pool_\w+\{alias="([^"\\\n]|\\.)*"[,}])')
@@ -0,0 +1,94 @@
+import json
+import threading
+import unittest
+
+from django.db import connections
+from django.test import RequestFactory
+from django.http import HttpResponse, StreamingHttpResponse
+
+from database_pool.middleware import QueryProfilerMiddleware
+
+
+def in_thread(fn):
+    """ Run fn in a new thread: none of the aliases are initialized there """
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=fn()))
+    thread.start()
+    thread.join()
+    return result['value']
+
+
+class QueryProfilerMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_queries(self, count):
+        connection = connections['default']
+
+        with connection.cursor() as cursor:
+            for i in range(count):
+                cursor.execute('SELECT %s', [i])
+                cursor.fetchone()
+
+    def call(self, view):
+        middleware = QueryProfilerMiddleware(view)
+        middleware.log_level = 40
+
+        with self.assertLogs('django', 'ERROR') as logs:
+            response = middleware(self.factory.get('/items/'))
+            response.close()
+
+        return response, json.loads(logs.records[-1].getMessage().split(' ', 2)[2])
+
+    def test_profiled_request(self):
+        def view(request):
+            self.run_queries(6)
+            return HttpResponse()
+
+        response, profile = in_thread(lambda: self.call(view))
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="6 queries"', response['Server-Timing'])
+        self.assertEqual(profile['queries'], 6)
+        self.assertEqual(profile['aliases']['default']['checkouts'], 1)
+        self.assertEqual(profile['aliases']['default']['repeated'], [{'sql': 'SELECT %s', 'count': 6}])
+
+    def test_uninitialized_aliases_left_alone(self):
+        def request():
+            middleware = QueryProfilerMiddleware(lambda request: HttpResponse())
+            response = middleware(self.factory.get('/'))
+            # before request_finished, which builds them all on Django < 4.1
+            return response, hasattr(connections._connections, 'default')
+
+        response, initialized = in_thread(request)
+
+        self.assertFalse(initialized)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_streaming_response(self):
+        def view(request):
+            def content():
+                for i in range(3):
+                    self.run_queries(1)
+                    yield str(i)
+
+            return StreamingHttpResponse(content())
+
+        def request():
+            middleware = QueryProfilerMiddleware(view)
+            middleware.log_level = 40
+
+            with self.assertLogs('django', 'ERROR') as logs:
+                response = middleware(self.factory.get('/export/'))
+                # nothing is reported before the content is streamed
+                self.assertEqual(b''.join(response.streaming_content), b'012')
+                self.assertEqual(logs.records, [])
+                response.close()
+
+            return response, logs.records
+
+        response, records = in_thread(request)
+        profile = json.loads(records[-1].getMessage().split(' ', 2)[2])
+
+        self.assertEqual(profile['queries'], 3)
+        self.assertFalse(response.has_header('Server-Timing'))
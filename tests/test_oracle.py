@@ -0,0 +1,345 @@
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+
+from database_pool.backends.oracle import sessions
+from database_pool.backends.oracle.sessions import DEFAULT_SESSION_TAG, SessionSetup, session_tag
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+
+@unittest.skipIf(oracledb is None, 'python-oracledb is not installed')
+class CxOracleModuleTestCase(unittest.TestCase):
+    def test_python_oracledb_left_untouched(self):
+        version, binary = oracledb.version, oracledb.Binary
+
+        from database_pool.backends.oracle import wrapper
+        from django.db.backends.oracle import base, introspection
+
+        if not wrapper.is_oracledb:
+            self.skipTest('cx_Oracle was imported first, the wrapper uses it')
+
+        self.assertNotIn('cx_Oracle', sys.modules)
+        self.assertEqual((oracledb.version, oracledb.Binary), (version, binary))
+
+        # Django's Oracle backend got its own module
+        self.assertIs(base.Database, wrapper.Database)
+        self.assertIs(introspection.cx_Oracle, wrapper.Database)
+        self.assertEqual(wrapper.Database.version, '8.3.0')
+        self.assertIsInstance(wrapper.Database.Binary, type)
+        self.assertIs(wrapper.Database.connect, oracledb.connect)
+
+
+class Session:
+    dsn = 'oracle'
+
+    def __init__(self, fail=False):
+        self.statements = []
+        self.fail = fail
+
+    def cursor(self):
+        return SimpleNamespace(execute=self.execute, close=lambda: None)
+
+    def execute(self, sql):
+        if self.fail:
+            raise RuntimeError('ORA-02248: invalid option for ALTER SESSION')
+        self.statements.append(sql)
+
+    def ping(self):
+        pass
+
+
+class DriverPool:
+    """ The sessions of python-oracledb's pool """
+    ping_interval = 60
+
+    def __init__(self):
+        self.released = []
+        self.acquired = []
+
+    def acquire(self, user=None, **params):
+        self.acquired.append(params)
+        return Session()
+
+    def release(self, conn, *args, **kwargs):
+        self.released.append(conn)
+
+    def drop(self, conn):
+        self.released.append(conn)
+
+
+SESSION_TAGS = {'reporting': ['ALTER SESSION SET OPTIMIZER_MODE = ALL_ROWS;']}
+
+
+class SessionSetupTestCase(unittest.TestCase):
+    def test_session_set_up_with_its_tag(self):
+        setup = SessionSetup({'session': ["ALTER SESSION SET TIME_ZONE = 'UTC'"], 'session_tags': SESSION_TAGS})
+        setup.installed = True
+
+        session = Session()
+        setup(session, 'reporting')
+
+        self.assertEqual(session.statements, [
+            SessionSetup.date_formats,
+            "ALTER SESSION SET TIME_ZONE = 'UTC'",
+            'ALTER SESSION SET OPTIMIZER_MODE = ALL_ROWS',
+        ])
+        self.assertEqual((session.tag, session.stmtcachesize, setup.setups), ('reporting', 20, 1))
+
+        # tagged otherwise: all its settings set again
+        setup(session, None)
+        self.assertEqual(session.tag, DEFAULT_SESSION_TAG)
+        self.assertEqual(session.statements[3:], [SessionSetup.date_formats, "ALTER SESSION SET TIME_ZONE = 'UTC'"])
+
+    def test_not_installed(self):
+        # called at every acquire(cx_Oracle < 8): the session isn't tagged
+        session = Session()
+        SessionSetup({})(session)
+        self.assertFalse(hasattr(session, 'tag'))
+
+    def test_failure_logged(self):
+        import logging
+        setup = SessionSetup({}, logging.getLogger('django'))
+
+        with self.assertLogs('django', 'WARNING') as logs, self.assertRaises(RuntimeError):
+            setup(Session(fail=True))
+
+        self.assertIn('ORA-02248', logs.output[0])
+
+    def test_unknown_tag(self):
+        setup = SessionSetup({'session_tags': SESSION_TAGS})
+        setup.check_tag('reporting')
+        setup.check_tag(DEFAULT_SESSION_TAG)
+
+        with self.assertRaises(ImproperlyConfigured):
+            setup.check_tag('batch')
+
+
+class SessionTagTestCase(unittest.TestCase):
+    def test_tag_restored(self):
+        connection = SimpleNamespace(session_tag=DEFAULT_SESSION_TAG, tags=[])
+
+        def set_session_tag(tag=None):
+            connection.tags.append(tag)
+            connection.session_tag = tag or DEFAULT_SESSION_TAG
+
+        connection.set_session_tag = set_session_tag
+
+        with mock.patch.object(sessions, 'connections', {'oracle': connection}):
+            with self.assertRaises(ValueError):
+                with session_tag('reporting', using='oracle'):
+                    self.assertEqual(connection.session_tag, 'reporting')
+                    raise ValueError()
+
+        self.assertEqual(connection.tags, ['reporting', DEFAULT_SESSION_TAG])
+
+    def test_decorator(self):
+        connection = mock.Mock(session_tag=DEFAULT_SESSION_TAG)
+
+        @session_tag('reporting', using='oracle')
+        def report():
+            return 'report'
+
+        with mock.patch.object(sessions, 'connections', {'oracle': connection}):
+            self.assertEqual(report(), 'report')
+
+        self.assertEqual(connection.set_session_tag.call_args_list,
+                         [mock.call('reporting'), mock.call(DEFAULT_SESSION_TAG)])
+
+
+@unittest.skipIf(oracledb is None, 'python-oracledb is not installed')
+class SetSessionTagTestCase(unittest.TestCase):
+    def setUp(self):
+        from django.db import connections
+        from database_pool.backends.oracle.wrapper import DatabaseWrapper
+        from database_pool.core.mixins import DBConnectionPool
+        from tests.utils import unique_alias
+
+        alias = unique_alias('oracle')
+        settings_dict = dict(connections['default'].settings_dict, EXTRAS={'session_tags': SESSION_TAGS})
+        self.wrapper = DatabaseWrapper(settings_dict, alias)
+        # as if the pool called the session callback
+        self.wrapper.session_setup.installed = True
+
+        self.pool = DriverPool()
+        DBConnectionPool().put(alias, self.pool)
+        self.addCleanup(DBConnectionPool().pop, alias, None)
+
+    def test_session_acquired_with_its_tag(self):
+        self.wrapper.set_session_tag('reporting')
+        self.wrapper.connection = self.wrapper._get_alive_connection()
+        self.assertEqual(self.pool.acquired[-1]['tag'], 'reporting')
+
+        # held with other settings: released
+        session = self.wrapper.connection
+        self.wrapper.set_session_tag(None)
+        self.assertEqual(self.wrapper.session_tag, DEFAULT_SESSION_TAG)
+        self.assertIsNone(self.wrapper.connection)
+        self.assertEqual(self.pool.released, [session])
+
+        self.wrapper._get_alive_connection()
+        self.assertEqual(self.pool.acquired[-1]['tag'], DEFAULT_SESSION_TAG)
+
+    def test_kept_in_transaction(self):
+        self.wrapper.connection = self.wrapper._get_alive_connection()
+        self.wrapper.in_atomic_block = True
+
+        self.wrapper.set_session_tag('reporting')
+        self.assertIsNotNone(self.wrapper.connection)
+        self.assertEqual(self.pool.released, [])
+
+    def test_unknown_tag(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper.set_session_tag('batch')
+
+        self.assertEqual(self.wrapper.session_tag, DEFAULT_SESSION_TAG)
+
+
+@unittest.skipIf(oracledb is None, 'python-oracledb is not installed')
+class OracleSessionPoolTestCase(unittest.TestCase):
+    def make_pool(self, **params):
+        from database_pool.backends.oracle.wrapper import OracleSessionPool
+        return OracleSessionPool('oracle', DriverPool(), **dict({'max_sessions_per_user': 1}, **params))
+
+    def test_sessions_per_user_capped(self):
+        from database_pool.core.exceptions import PoolTimeout
+        pool = self.make_pool(getmode='nowait')
+
+        first = pool.acquire('tenant1')
+        with self.assertRaises(PoolTimeout):
+            pool.acquire('tenant1')
+
+        other = pool.acquire('tenant2')
+        self.assertEqual(pool.user_sessions(), {'tenant1': 1, 'tenant2': 1})
+
+        pool.release(first)
+        pool.release(pool.acquire('tenant1'))
+        pool.drop(other)
+        self.assertEqual(pool.user_sessions(), {})
+
+    def test_idle_users_forgotten(self):
+        pool = self.make_pool(getmode='nowait')
+
+        for tenant in range(100):
+            pool.release(pool.acquire('tenant%d' % tenant))
+
+        self.assertEqual(pool.user_slots, {})
+        self.assertEqual(pool.slot_users, {})
+
+    def test_dropped_session_gives_slot_back(self):
+        import logging
+        pool = self.make_pool(getmode='timedwait', wait_timeout=5000, logger=logging.getLogger('django'))
+
+        session = pool.acquire('tenant1')
+        with self.assertLogs('django', 'WARNING'):
+            # its thread gone without releasing it
+            del session
+
+        session = pool.acquire('tenant1')
+        pool.release(session)
+        self.assertEqual(pool.user_slots, {})
+
+
+@unittest.skipIf(oracledb is None, 'python-oracledb is not installed')
+class CompiledQueryCacheTestCase(unittest.TestCase):
+    def make_cursor(self, size=2):
+        from types import SimpleNamespace
+        from database_pool.backends.oracle.wrapper import FormatStylePlaceholderCursor, CompiledQueryCache
+
+        connection = SimpleNamespace(cursor=lambda: SimpleNamespace())
+        return FormatStylePlaceholderCursor(connection, None, CompiledQueryCache(size))
+
+    def test_statement_compiled_once(self):
+        cursor = self.make_cursor()
+
+        compiled = cursor.compile('SELECT * FROM item WHERE id = %s AND name = %s;', [1, 'a'])
+        self.assertEqual(compiled, ('SELECT * FROM item WHERE id = :arg0 AND name = :arg1', None))
+
+        self.assertIs(cursor.compile('SELECT * FROM item WHERE id = %s AND name = %s;', [2, 'b']), compiled)
+        self.assertEqual(cursor.query_cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+        # other parameter types: compiled on their own
+        cursor.compile('SELECT * FROM item WHERE id = %s AND name = %s;', [2, None])
+        self.assertEqual(len(cursor.query_cache), 2)
+
+    def test_least_recently_used_evicted(self):
+        cursor = self.make_cursor(size=2)
+
+        for sql in ('SELECT 1 FROM dual WHERE 1 = %s', 'SELECT 2 FROM dual WHERE 2 = %s'):
+            cursor.compile(sql, [1])
+
+        cursor.compile('SELECT 1 FROM dual WHERE 1 = %s', [1])
+        cursor.compile('SELECT 3 FROM dual WHERE 3 = %s', [1])
+
+        keys = [sql for sql, _ in cursor.query_cache.statements]
+        self.assertEqual(keys, ['SELECT 1 FROM dual WHERE 1 = %s', 'SELECT 3 FROM dual WHERE 3 = %s'])
+
+    def test_uncacheable_parameters(self):
+        from database_pool.backends.oracle.wrapper import MAX_CACHED_STR_LENGTH
+        cursor = self.make_cursor()
+
+        # a long str may be a CLOB, a list has no input size of its type
+        self.assertIsNone(cursor.compile('SELECT %s FROM dual', ['x' * (MAX_CACHED_STR_LENGTH + 1)]))
+        self.assertIsNone(cursor.compile('SELECT %s FROM dual', [[1, 2]]))
+        self.assertIsNone(cursor.compile('SELECT %s FROM dual', {'a': 1}))
+        self.assertEqual(len(cursor.query_cache), 0)
+
+    def test_bind_values(self):
+        import datetime
+        from django.db.backends.oracle.utils import Oracle_datetime
+        from database_pool.backends.oracle.wrapper import get_bind_value
+
+        self.assertEqual([get_bind_value(value, False) for value in (True, False, 3)], [1, 0, 3])
+
+        now = datetime.datetime(2024, 1, 1, 12, 0)
+        self.assertIsInstance(get_bind_value(now, True), Oracle_datetime)
+        self.assertIs(get_bind_value(now, False), now)
+
+
+@unittest.skipIf(oracledb is None, 'python-oracledb is not installed')
+class InlineLobHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        from types import SimpleNamespace
+        from database_pool.backends.oracle.wrapper import InlineLobHandler, Database
+
+        self.handler = InlineLobHandler(max_size=4)
+        self.clob = Database.DB_TYPE_CLOB
+
+        def var(inline_type, arraysize, outconverter):
+            return SimpleNamespace(type=inline_type, outconverter=outconverter)
+
+        self.cursor = SimpleNamespace(statement='SELECT body FROM item', arraysize=100, var=var)
+
+    def fetch(self, name='BODY', statement=None):
+        if statement is not None:
+            self.cursor.statement = statement
+        return self.handler(self.cursor, name, self.clob, None, None, None)
+
+    def test_lob_fetched_inline(self):
+        var = self.fetch()
+        self.assertIsNotNone(var)
+        self.assertEqual(var.outconverter('abc'), 'abc')
+
+        # other types are Django's
+        self.assertIsNone(self.handler(self.cursor, 'ID', oracledb.DB_TYPE_NUMBER, None, None, None))
+
+    def test_long_value_streamed_from_then_on(self):
+        var = self.fetch()
+        # still returned
+        self.assertEqual(var.outconverter('abcdef'), 'abcdef')
+
+        self.assertIsNone(self.fetch())
+        self.assertIsNotNone(self.fetch(name='SUMMARY'))
+
+    def test_streamed_columns_capped(self):
+        self.handler.max_streamed_columns = 3
+
+        for i in range(10):
+            self.fetch(statement='SELECT body FROM item%d' % i).outconverter('abcdef')
+            self.assertLessEqual(len(self.handler.streamed), 3)
@@ -0,0 +1,136 @@
+import gc
+import time
+import threading
+import unittest
+
+from database_pool.core.pool import NativePool, ConnectionProxy
+from database_pool.core.exceptions import PoolTimeout
+
+from tests.utils import make_wrapper, unique_alias
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class NativePoolTestCase(unittest.TestCase):
+    def test_overflow_connection_closed_at_checkin(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=1, timeout=1)
+        first, second = db_pool.connect(), db_pool.connect()
+        self.assertEqual(db_pool.overflow(), 1)
+
+        connections = [first.dbapi_connection, second.dbapi_connection]
+        second.checkin()
+        first.checkin()
+
+        # the pool keeps POOL_SIZE connections, the one given back last is closed
+        self.assertEqual([connection.closed for connection in connections], [True, False])
+        self.assertEqual(db_pool.checkedin(), 1)
+        self.assertEqual(db_pool.checkedout(), 0)
+
+    def test_timeout(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=0, timeout=0.05)
+        record = db_pool.connect()
+
+        start = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            db_pool.connect()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        record.checkin()
+        db_pool.connect().checkin()
+
+    def test_waiters_served_in_arrival_order(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=0, timeout=5)
+        record = db_pool.connect()
+        served = []
+
+        def waiter(name):
+            checked_out = db_pool.connect()
+            served.append(name)
+            checked_out.checkin()
+
+        threads = []
+        for name in range(5):
+            thread = threading.Thread(target=waiter, args=(name,))
+            thread.start()
+            threads.append(thread)
+
+            # queued one after the other
+            while len(db_pool._waiters) <= name:
+                time.sleep(0.001)
+
+        record.checkin()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(served, list(range(5)))
+
+    def test_dropped_proxy_gives_connection_back(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=0, timeout=5)
+        record = db_pool.connect()
+        proxy = record.checkout()
+        self.assertFalse(proxy.closed)
+
+        with self.assertLogs('django', 'WARNING'):
+            del proxy
+
+        # handed over to the waiter by the finalizer's thread
+        self.assertIs(db_pool.connect(), record)
+
+    def test_proxy_given_back_once(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=0, timeout=1)
+        record = db_pool.connect()
+        proxy = record.checkout()
+
+        record.checkin()
+        # detached: the record isn't given back twice
+        del proxy
+
+        self.assertEqual(db_pool.checkedin(), 1)
+        self.assertEqual(db_pool.checkedout(), 0)
+
+    def test_dropped_proxy_of_parent_process_kept(self):
+        db_pool = NativePool(Connection, pool_size=1, max_overflow=0, timeout=1)
+        record = db_pool.connect()
+
+        # as a child process dropping the checkouts of its parent
+        db_pool._checkin_dropped(record, pid=-1)
+        self.assertEqual(db_pool.checkedout(), 1)
+
+    def test_default_timeout(self):
+        # the native pool waits 30 seconds at most, QueuePool keeps waiting
+        self.assertEqual(make_wrapper()._get_pool_params()['timeout'], 30)
+        self.assertIsNone(make_wrapper(ENGINE='sqlalchemy')._get_pool_params()['timeout'])
+        self.assertIsNone(make_wrapper(TIMEOUT=None)._get_pool_params()['timeout'])
+        self.assertEqual(make_wrapper(ENGINE='sqlalchemy', TIMEOUT=5)._get_pool_params()['timeout'], 5)
+
+    def test_dropped_wrapper_gives_connection_back(self):
+        alias = unique_alias()
+        # the pool's creator keeps the wrapper which built it
+        creator = make_wrapper(alias, POOL_SIZE=1, MAX_OVERFLOW=0)
+        creator.ensure_connection()
+        creator.close()
+
+        wrapper = make_wrapper(alias, POOL_SIZE=1, MAX_OVERFLOW=0)
+        wrapper.ensure_connection()
+        self.assertIsInstance(wrapper.connection, ConnectionProxy)
+
+        # a thread gone without closing its connection
+        with self.assertLogs('django', 'WARNING'):
+            del wrapper
+            gc.collect()
+
+        other = make_wrapper(alias, POOL_SIZE=1, MAX_OVERFLOW=0, TIMEOUT=5)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        other.close()
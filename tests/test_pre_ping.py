@@ -0,0 +1,66 @@
+import unittest
+
+from tests.utils import fake_server, make_wrapper
+
+
+class AdaptivePrePingTestCase(unittest.TestCase):
+    def check_out(self, wrapper):
+        """ Check a connection out and in, :return: its info, kept by the pool """
+        wrapper.ensure_connection()
+        info = wrapper.connection_info
+        wrapper.close()
+        return info
+
+    def check_pre_ping(self, engine):
+        wrapper = make_wrapper(ENGINE=engine, POOL_SIZE=1, MAX_OVERFLOW=0, PRE_PING_IDLE=60)
+        server = fake_server(wrapper)
+        info = self.check_out(wrapper)
+
+        # recently used: not pinged
+        self.check_out(wrapper)
+        self.assertEqual(server.stats()['pings'], 0)
+
+        # idle for too long
+        info['checkin_time'] -= 61
+        self.check_out(wrapper)
+        self.assertEqual(server.stats()['pings'], 1)
+
+        # its last use ended in an error
+        wrapper.ensure_connection()
+        wrapper.errors_occurred = True
+        wrapper.close()
+        wrapper.errors_occurred = False
+
+        self.check_out(wrapper)
+        self.assertEqual(server.stats()['pings'], 2)
+
+        # dead: invalidated, then reconnected
+        connects = server.stats()['connects']
+        server.disconnect_all()
+        info['checkin_time'] -= 61
+
+        with self.assertLogs('django', 'WARNING'):
+            wrapper.ensure_connection()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        wrapper.close()
+        # the failed ping never reached the server
+        self.assertEqual(server.stats()['pings'], 2)
+        self.assertEqual(server.stats()['connects'], connects + 1)
+
+    def test_native_pool(self):
+        self.check_pre_ping('native')
+
+    def test_queue_pool(self):
+        self.check_pre_ping('sqlalchemy')
+
+    def test_disabled(self):
+        wrapper = make_wrapper(POOL_SIZE=1, PRE_PING=False)
+        server = fake_server(wrapper)
+        info = self.check_out(wrapper)
+
+        info['checkin_time'] -= 3600
+        self.check_out(wrapper)
+        self.assertEqual(server.stats()['pings'], 0)
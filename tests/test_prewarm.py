@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+from database_pool.core import prewarm
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.prewarm import prewarm_pool
+
+from tests.utils import fake_server, make_wrapper, unique_alias
+
+
+class PrewarmPoolTestCase(unittest.TestCase):
+    def prewarm(self, size=3, **pool_options):
+        alias = unique_alias('prewarm')
+        pool_options = dict(POOL_SIZE=size, PREWARM={'SIZE': size + 2, 'QUERIES': ['SELECT 1']}, **pool_options)
+
+        with mock.patch.object(prewarm, '_create_connection', lambda alias: make_wrapper(alias, **pool_options)):
+            elapsed = prewarm_pool(alias)
+
+        db_pool = DBConnectionPool().get(alias)
+        self.addCleanup(db_pool.dispose)
+        self.assertIsNotNone(elapsed)
+        self.assertTrue(DBConnectionPool().is_ready(alias))
+        return db_pool, fake_server(make_wrapper(alias))
+
+    def check_prewarm(self, **pool_options):
+        db_pool, server = self.prewarm(**pool_options)
+
+        # SIZE capped by POOL_SIZE, every connection ran the warm-up queries
+        self.assertEqual((db_pool.checkedin(), db_pool.checkedout()), (3, 0))
+        self.assertEqual(server.stats()['connects'], 3)
+        self.assertGreaterEqual(server.stats()['statements'], 3)
+
+    def test_native_pool(self):
+        self.check_prewarm()
+
+    def test_queue_pool(self):
+        self.check_prewarm(ENGINE='sqlalchemy')
+
+    def test_transaction_scope(self):
+        # the connections are held until they're all open, whatever the checkout scope
+        self.check_prewarm(CHECKOUT_SCOPE='transaction')
+        self.check_prewarm(ENGINE='sqlalchemy', CHECKOUT_SCOPE='transaction')
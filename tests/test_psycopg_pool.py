@@ -0,0 +1,115 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+try:
+    from psycopg.pq import TransactionStatus
+    from database_pool.backends.psycopg.pool import PsycopgPool, PooledConnectionMixin
+except Exception:
+    PsycopgPool = None
+
+    class PooledConnectionMixin:
+        pass
+
+from database_pool.core.exceptions import PoolTimeout
+from database_pool.core.pool import ConnectionRecord
+
+
+class StubConnectionBase:
+    """ What psycopg_pool reads of a psycopg connection """
+
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.pgconn = SimpleNamespace(transaction_status=TransactionStatus.IDLE)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+        self.pgconn.transaction_status = TransactionStatus.UNKNOWN
+
+
+class StubConnection(PooledConnectionMixin, StubConnectionBase):
+    pass
+
+
+@unittest.skipIf(PsycopgPool is None, 'psycopg_pool is not installed')
+class PsycopgPoolTestCase(unittest.TestCase):
+    def make_pool(self, **params):
+        self.opened = []
+        self.events = []
+
+        def creator():
+            conn = StubConnection()
+            self.opened.append(conn)
+            return conn
+
+        pool = PsycopgPool(creator, **dict({'pool_size': 1, 'max_overflow': 0, 'timeout': 2}, **params))
+        self.addCleanup(pool.dispose)
+
+        for event in ('connect', 'checkin', 'invalidate', 'close'):
+            pool.listen(event, lambda *args, event=event: self.events.append(event))
+
+        return pool
+
+    def test_checkout_keeps_record(self):
+        pool = self.make_pool()
+
+        record = pool.connect()
+        self.assertIsInstance(record, ConnectionRecord)
+        self.assertEqual(pool.checkedout(), 1)
+
+        record.info['init_state'] = 'done'
+        record.checkin()
+
+        again = pool.connect()
+        self.assertIs(again, record)
+        self.assertEqual(again.info['init_state'], 'done')
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(self.events, ['connect', 'checkin'])
+
+        # the dialect resets the connection given back
+        again.checkin()
+        self.assertEqual(self.opened[0].rollbacks, 2)
+
+    def test_timeout(self):
+        pool = self.make_pool(timeout=0.2)
+        record = pool.connect()
+
+        start = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.connect()
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        record.checkin()
+
+    def test_closed_by_psycopg_pool(self):
+        pool = self.make_pool(recycle=0.05)
+        record = pool.connect()
+
+        time.sleep(0.1)
+        # expired: psycopg_pool closes it and opens another one
+        record.checkin()
+
+        self.assertTrue(self.opened[0].closed)
+        self.assertIsNone(record.dbapi_connection)
+        self.assertIn('close', self.events)
+
+        replacement = pool.connect()
+        self.assertIsNot(replacement, record)
+        self.assertIs(replacement.dbapi_connection, self.opened[1])
+        replacement.checkin()
+
+    def test_invalidated_connection_replaced(self):
+        pool = self.make_pool()
+        record = pool.connect()
+
+        pool._invalidate(record)
+        self.assertEqual(self.events[-3:], ['invalidate', 'close', 'checkin'])
+
+        replacement = pool.connect()
+        self.assertIsNot(replacement, record)
+        self.assertTrue(self.opened[0].closed)
+        replacement.checkin()
@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from database_pool.core import reaper
+from database_pool.core.metrics import PoolMetricsRegistry
+from database_pool.core.reaper import IdleReaper, reap_pool
+
+from tests.utils import make_wrapper
+
+
+def make_pool(test, engine='native', **pool_options):
+    wrapper = make_wrapper(ENGINE=engine, **pool_options)
+    wrapper.ensure_connection()
+    wrapper.close()
+    db_pool = wrapper.conn_pool.get(wrapper.alias)
+    test.addCleanup(db_pool.dispose)
+    return wrapper.alias, db_pool
+
+
+def give_back(conn):
+    (conn.checkin if hasattr(conn, 'checkin') else conn.close)()
+
+
+class LifoCheckoutTestCase(unittest.TestCase):
+    def check_order(self, engine, use_lifo):
+        db_pool = make_pool(self, engine, POOL_SIZE=2, MAX_OVERFLOW=0, USE_LIFO=use_lifo)[1]
+
+        first, last = db_pool.connect(), db_pool.connect()
+        first_connection, last_connection = first.dbapi_connection, last.dbapi_connection
+        give_back(first)
+        give_back(last)
+
+        conn = db_pool.connect()
+        self.addCleanup(give_back, conn)
+        return conn.dbapi_connection is (last_connection if use_lifo else first_connection)
+
+    def test_native_pool(self):
+        self.assertTrue(self.check_order('native', use_lifo=True))
+        self.assertTrue(self.check_order('native', use_lifo=False))
+
+    def test_queue_pool(self):
+        self.assertTrue(self.check_order('sqlalchemy', use_lifo=True))
+        self.assertTrue(self.check_order('sqlalchemy', use_lifo=False))
+
+
+class ReapPoolTestCase(unittest.TestCase):
+    def check_reap(self, engine):
+        db_pool = make_pool(self, engine, POOL_SIZE=3, MAX_OVERFLOW=0)[1]
+
+        checked_out = [db_pool.connect() for _ in range(3)]
+        for conn in checked_out:
+            give_back(conn)
+        self.assertEqual(db_pool.checkedin(), 3)
+
+        # not idle for long enough
+        self.assertEqual(reap_pool(db_pool, 60), 0)
+
+        # min_idle kept
+        self.assertEqual(reap_pool(db_pool, 60, min_idle=1, now=time.monotonic() + 61), 2)
+        self.assertEqual(db_pool.checkedin(), 1)
+
+        # the closed connections' room can be used again
+        checked_out = [db_pool.connect() for _ in range(3)]
+        for conn in checked_out:
+            give_back(conn)
+        self.assertEqual(db_pool.checkedin(), 3)
+
+    def test_native_pool(self):
+        self.check_reap('native')
+
+    def test_queue_pool(self):
+        self.check_reap('sqlalchemy')
+
+
+class IdleReaperTestCase(unittest.TestCase):
+    def test_registered_with_idle_timeout(self):
+        alias, db_pool = make_pool(self, IDLE_TIMEOUT=120, MIN_IDLE=1)
+        self.assertEqual(reaper._reaper.pools[alias], (db_pool, 120.0, 1))
+
+    def test_reap_counts_closed_connections(self):
+        alias, db_pool = make_pool(self, POOL_SIZE=2)
+        idle_reaper = IdleReaper()
+        idle_reaper.pools[alias] = (db_pool, 0.0, 0)
+
+        idle_reaper.reap()
+        self.assertEqual(db_pool.checkedin(), 0)
+        self.assertEqual(PoolMetricsRegistry().get_or_create(alias).counters['idle_closed'], 1)
+
+    def test_thread_outlives_failures(self):
+        alias, db_pool = make_pool(self)
+        idle_reaper = IdleReaper()
+        rounds = []
+        reaped, finished = threading.Event(), threading.Event()
+        self.addCleanup(finished.set)
+
+        def reap():
+            rounds.append(None)
+            if len(rounds) == 1:
+                raise RuntimeError('reap failed')
+
+            reaped.set()
+            # the thread stays here until the test's end
+            finished.wait()
+
+        with mock.patch.object(reaper, 'MIN_REAP_INTERVAL', 0.01), \
+                mock.patch.object(idle_reaper, 'reap', side_effect=reap), \
+                self.assertLogs('django', 'ERROR') as logs:
+            idle_reaper.register(alias, db_pool, 0.01, 0)
+            self.assertTrue(reaped.wait(5))
+
+        self.assertEqual(len(rounds), 2)
+        self.assertIn('reap failed', logs.output[0])
+
+    def test_interval_while_registering(self):
+        idle_reaper = IdleReaper()
+        idle_reaper.pools.update(('alias-%d' % i, (None, 60.0, 0)) for i in range(100))
+        # no thread started: it would reap the fake pools
+        idle_reaper._thread = mock.Mock()
+        errors = []
+
+        def register():
+            for i in range(100, 2000):
+                idle_reaper.register('alias-%d' % i, None, 60.0, 0)
+
+        # thread switches as often as possible
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+        thread = threading.Thread(target=register)
+        thread.start()
+
+        while thread.is_alive():
+            try:
+                idle_reaper.interval()
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        thread.join()
+        self.assertEqual(errors, [])
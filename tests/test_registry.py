@@ -0,0 +1,168 @@
+import os
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from database_pool.core.mixins import DBConnectionPool
+from database_pool.core.pool import NativePool
+
+from tests.utils import make_wrapper, unique_alias
+
+
+class SocketConnection:
+    """ A connection on one end of a socket pair, its driver says goodbye when it's closed """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+        try:
+            self.sock.sendall(b'bye')
+        except OSError:
+            pass
+
+        self.sock.close()
+
+
+class DBConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.conn_pool = DBConnectionPool()
+
+    def test_get_or_create_builds_once(self):
+        alias = unique_alias('registry')
+        built = []
+        barrier = threading.Barrier(8)
+
+        def creator():
+            built.append(1)
+            return object()
+
+        def worker():
+            barrier.wait()
+            results.append(self.conn_pool.get_or_create(alias, creator))
+
+        results = []
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+
+    def test_after_fork_in_child(self):
+        wrapper = make_wrapper()
+        wrapper.connect()
+        checked_out = wrapper.connection
+        generation = self.conn_pool.generation
+        called = []
+
+        # the callbacks of the other modules(budget, reaper...) would drop the state of this process
+        with mock.patch.object(self.conn_pool, 'fork_callbacks', [lambda: called.append(True)]):
+            self.conn_pool.after_fork_in_child()
+
+        self.assertEqual(self.conn_pool.generation, generation + 1)
+        self.assertNotIn(wrapper.alias, self.conn_pool)
+        self.assertEqual(called, [True])
+
+        # the connection checked out before the fork belongs to the parent: kept, never used again
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, checked_out)
+        self.assertIn(checked_out, self.conn_pool.inherited)
+        self.assertFalse(checked_out.closed)
+        wrapper.close()
+
+    def open_connection(self):
+        """ :return: a SocketConnection, and the server's end of its socket """
+        ours, server = socket.socketpair()
+        self.addCleanup(ours.close)
+        self.addCleanup(server.close)
+        return SocketConnection(ours), server
+
+    def assertNothingReceived(self, server):
+        server.setblocking(False)
+
+        with self.assertRaises(BlockingIOError):
+            server.recv(16)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'os.fork() is required')
+    def test_forked_child_builds_fresh_pools(self):
+        wrapper = make_wrapper()
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        parent_pool, parent_connection = self.conn_pool.get(wrapper.alias), wrapper.connection
+
+        # a pool of connections on sockets: one idle, one checked out
+        servers = {}
+
+        def creator():
+            conn, servers[conn] = self.open_connection()
+            return conn
+
+        alias = unique_alias('fork')
+        db_pool = NativePool(creator, pool_size=2, max_overflow=0)
+        idle, checked_out = db_pool.connect(), db_pool.connect()
+        idle.checkin()
+        proxy = checked_out.checkout()
+        self.conn_pool.put(alias, db_pool)
+        self.addCleanup(self.conn_pool.pop, alias, None)
+
+        pid = os.fork()
+
+        if pid == 0:
+            code = 1
+
+            try:
+                self.conn_pool.inherit(proxy)
+                wrapper.ensure_connection()
+
+                if self.conn_pool.get(wrapper.alias) is parent_pool or wrapper.connection is parent_connection:
+                    code = 2
+                elif alias in self.conn_pool or not all(conn.closed for conn in servers):
+                    code = 3
+                elif any(conn in self.conn_pool.inherited for conn in (db_pool, proxy)):
+                    code = 4
+                else:
+                    code = 0
+            finally:
+                os._exit(code)
+
+        status = os.waitpid(pid, 0)[1]
+        self.assertTrue(os.WIFEXITED(status))
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+        # the child closed its copies without a goodbye, the parent's connections still work
+        for conn, server in servers.items():
+            self.assertFalse(conn.closed)
+            self.assertNothingReceived(server)
+
+            conn.sock.sendall(b'ping')
+            server.setblocking(True)
+            self.assertEqual(server.recv(16), b'ping')
+
+        wrapper.ensure_connection()
+        self.assertIs(self.conn_pool.get(wrapper.alias), parent_pool)
+
+    def test_inherited_checkout_of_queue_pool_closed(self):
+        from sqlalchemy.pool import QueuePool
+
+        conn, server = self.open_connection()
+        db_pool = QueuePool(lambda: conn, pool_size=1, max_overflow=0)
+        fairy = db_pool.connect()
+
+        self.conn_pool.inherit(fairy)
+        self.assertNotIn(fairy, self.conn_pool.inherited)
+        self.assertTrue(conn.closed)
+        # closed without a goodbye: only the end of the stream
+        self.assertEqual(server.recv(16), b'')
@@ -0,0 +1,151 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from database_pool.backends.fake.base import DatabaseWrapper, SQLiteDatabaseWrapper
+from database_pool.core.cursors import SessionStateCursorWrapper, changes_session_state
+from database_pool.core.reset import MySQLResetOnReturnMixin, SERVER_STATUS_IN_TRANS
+
+from tests.utils import make_wrapper, fake_server
+
+try:
+    from psycopg2 import sql as psycopg2_sql
+except ImportError:
+    psycopg2_sql = None
+
+
+class SessionStateTestCase(unittest.TestCase):
+    def test_statements(self):
+        self.assertTrue(changes_session_state("SET search_path TO app"))
+        self.assertTrue(changes_session_state("  create temporary table t (id int)"))
+        self.assertTrue(changes_session_state("SELECT pg_advisory_lock(%s)"))
+        self.assertTrue(changes_session_state("SELECT 1, GET_LOCK('job', 10)"))
+
+        self.assertFalse(changes_session_state('SELECT "app_setting"."id" FROM "app_setting"'))
+        self.assertFalse(changes_session_state('SELECT "lock"."id" FROM "app_lock" AS "lock"'))
+
+    @unittest.skipIf(psycopg2_sql is None, 'psycopg2 is not installed')
+    def test_composed_statement(self):
+        statement = psycopg2_sql.SQL("SET search_path TO {}").format(psycopg2_sql.Identifier('app'))
+        self.assertFalse(changes_session_state(statement))
+
+        wrapper = make_wrapper()
+        cursor = SessionStateCursorWrapper(mock.Mock(), wrapper)
+        cursor.execute(statement)
+
+        cursor.cursor.execute.assert_called_once_with(statement)
+        self.assertFalse(wrapper._pinned)
+
+
+class ResetOnReturnTestCase(unittest.TestCase):
+    def test_clean_session_checked_in_as_is(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        statements = fake_server(wrapper).stats()['statements']
+        wrapper.close()
+
+        # autocommit, no transaction in progress: no rollback
+        self.assertEqual(fake_server(wrapper).stats()['statements'], statements)
+
+    def test_transaction_rolled_back(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+        wrapper.set_autocommit(False)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (id int)')
+            cursor.execute('INSERT INTO t VALUES (1)')
+
+        self.assertTrue(wrapper.connection.in_transaction)
+        # the transaction left open is rolled back by the pool
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM t')
+            self.assertEqual(cursor.fetchone(), (0,))
+
+        wrapper.close()
+
+    def test_changed_session_reconnected(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.pin_connection()
+        wrapper.close()
+
+        # the fake backend has no means to reset a session: the connection is reopened
+        connects = fake_server(wrapper).stats()['connects']
+        wrapper.ensure_connection()
+        self.assertEqual(fake_server(wrapper).stats()['connects'], connects + 1)
+        wrapper.close()
+
+
+class InitConnectionStateTestCase(unittest.TestCase):
+    def setUp(self):
+        # Django's session setup of the connection
+        patcher = mock.patch.object(SQLiteDatabaseWrapper, 'init_connection_state', autospec=True)
+        self.init_connection_state = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_skipped_on_next_checkout(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+        wrapper.ensure_connection()
+        wrapper.close()
+        self.assertEqual(self.init_connection_state.call_count, 1)
+
+        # the same connection, its session is set up already
+        connects = fake_server(wrapper).stats()['connects']
+        other = make_wrapper(wrapper.alias, POOL_SIZE=1)
+        other.ensure_connection()
+        other.close()
+
+        self.assertEqual(fake_server(wrapper).stats()['connects'], connects)
+        self.assertEqual(self.init_connection_state.call_count, 1)
+
+    def test_run_again_after_session_reset(self):
+        wrapper = make_wrapper(POOL_SIZE=1)
+        wrapper.ensure_connection()
+        self.assertIn('init_state', wrapper.connection_info)
+
+        # a changed session is reset by the pool, not reconnected
+        wrapper.pin_connection()
+        with mock.patch.object(DatabaseWrapper.NativeDialect, 'reset_session', return_value=True) as reset_session:
+            wrapper.close()
+
+        reset_session.assert_called_once()
+        connects = fake_server(wrapper).stats()['connects']
+
+        wrapper.ensure_connection()
+        wrapper.close()
+        self.assertEqual(fake_server(wrapper).stats()['connects'], connects)
+        self.assertEqual(self.init_connection_state.call_count, 2)
+
+
+class MySQLResetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dialect = MySQLResetOnReturnMixin()
+
+    def test_mysqlclient_rolled_back(self):
+        # mysqlclient: no server_status, no _execute_command
+        raw_connection = mock.Mock(spec=['rollback', 'cursor'])
+
+        self.assertIsNone(self.dialect.in_transaction(raw_connection))
+        self.assertTrue(self.dialect.reset_session(raw_connection))
+        raw_connection.rollback.assert_called_once_with()
+
+    def test_pymysql_reset(self):
+        raw_connection = mock.MagicMock(server_status=SERVER_STATUS_IN_TRANS, sql_mode=None, init_command=None,
+                                        autocommit_mode=True, charset='utf8mb4', collation=None)
+
+        self.assertTrue(self.dialect.in_transaction(raw_connection))
+        self.assertTrue(self.dialect.reset_session(raw_connection))
+
+        raw_connection._execute_command.assert_called_once_with(0x1f, b'')
+        raw_connection.autocommit.assert_called_once_with(True)
+        raw_connection.rollback.assert_not_called()
+
+    def test_closed(self):
+        self.assertIsNone(self.dialect.in_transaction(SimpleNamespace(server_status=None)))
@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from database_pool import routers
+
+from tests.utils import make_wrapper, unique_alias, fake_server
+
+
+class ReplicaGroupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.replica = unique_alias('replica')
+        self.group = routers.ReplicaGroup('primary', dict(routers.DEFAULT_REPLICA_OPTIONS, ALIASES=[self.replica]))
+
+        self.wrappers = []
+        patcher = mock.patch.object(routers, '_create_connection', side_effect=self.create_connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_connection(self, alias):
+        wrapper = make_wrapper(alias)
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_lag_statement_fallback(self):
+        # the first statement is unknown to the server, as SHOW REPLICA STATUS is to MariaDB
+        with mock.patch.dict(routers.LAG_QUERIES, fake=('SHOW REPLICA STATUS', 'SELECT 3')):
+            self.group.check_all()
+            self.assertEqual(self.group.lags[self.replica], 3.0)
+            self.assertEqual(self.group.healthy_replicas(), [self.replica])
+
+            # the statement that ran is remembered
+            statements = fake_server(self.wrappers[0]).stats()['statements']
+            self.group.check_all()
+            self.assertEqual(fake_server(self.wrappers[0]).stats()['statements'] - statements, 1)
+
+    def test_lag_unknown_keeps_replica(self):
+        with mock.patch.dict(routers.LAG_QUERIES, fake=('SHOW REPLICA STATUS', 'SHOW SLAVE STATUS')):
+            self.group.check_all()
+
+        self.assertIsNone(self.group.lags[self.replica])
+        self.assertEqual(self.group.healthy_replicas(), [self.replica])
+
+    def test_lagging_and_unreachable_evicted(self):
+        with mock.patch.dict(routers.LAG_QUERIES, fake=('SELECT 60',)):
+            self.group.check_all()
+            self.assertIn('lagging', self.group.evicted[self.replica])
+            self.assertEqual(self.group.choose(), 'primary')
+
+        with mock.patch.dict(routers.LAG_QUERIES, fake=('SELECT 0',)):
+            self.group._lag_queries.clear()
+            self.group.check_all()
+            self.assertEqual(self.group.healthy_replicas(), [self.replica])
+            self.assertEqual(self.group.choose(), self.replica)
+
+
+    def test_unreachable_evicted(self):
+        from database_pool.backends.fake.dbapi import FakeServer
+
+        # the server of the replica refuses every connection
+        FakeServer.get('file:%s?mode=memory&cache=shared' % self.replica, connect_failure_rate=1.0)
+
+        with mock.patch.dict(routers.LAG_QUERIES, fake=('SELECT 0',)):
+            self.group.check_all()
+
+        self.assertIn('unreachable', self.group.evicted[self.replica])
+        self.assertEqual(self.group.choose(), 'primary')
+
+    def test_sticky_reads_after_write(self):
+        self.assertFalse(self.group.is_sticky())
+        self.group.mark_write()
+        self.assertTrue(self.group.is_sticky())
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+from database_pool.core.sizing import DEFAULT_AUTOSIZE_OPTIONS, PoolSizeController, resize_pool
+
+from tests.utils import make_wrapper
+
+
+def make_pool(test, engine='native', **pool_options):
+    wrapper = make_wrapper(ENGINE=engine, **pool_options)
+    wrapper.ensure_connection()
+    wrapper.close()
+    db_pool = wrapper.conn_pool.get(wrapper.alias)
+    test.addCleanup(db_pool.dispose)
+    return db_pool
+
+
+def check_out(db_pool, count):
+    checked_out = [db_pool.connect() for _ in range(count)]
+    for conn in checked_out:
+        (conn.checkin if hasattr(conn, 'checkin') else conn.close)()
+
+
+class ResizePoolTestCase(unittest.TestCase):
+    def check_resize(self, engine):
+        db_pool = make_pool(self, engine, POOL_SIZE=2, MAX_OVERFLOW=0)
+
+        # grown: 4 connections kept idle
+        resize_pool(db_pool, 4)
+        check_out(db_pool, 4)
+        self.assertEqual((db_pool.size(), db_pool.checkedin()), (4, 4))
+
+        # shrunk: the idle surplus closed right now
+        self.assertEqual(resize_pool(db_pool, 1), 3)
+        self.assertEqual((db_pool.size(), db_pool.checkedin()), (1, 1))
+
+    def test_native_pool(self):
+        self.check_resize('native')
+
+    def test_queue_pool(self):
+        self.check_resize('sqlalchemy')
+
+
+class PoolSizeControllerTestCase(unittest.TestCase):
+    def make_controller(self, db_pool, max_overflow, **options):
+        options = dict(DEFAULT_AUTOSIZE_OPTIONS, STEP=2, SHRINK_AFTER=1, **options)
+        return PoolSizeController('sizing', db_pool, options, max_overflow)
+
+    def test_overflow_shrinks_as_pool_grows(self):
+        db_pool = make_pool(self, POOL_SIZE=2, MAX_OVERFLOW=4)
+        controller = self.make_controller(db_pool, 4)
+        self.assertEqual(controller.max_size, 6)
+
+        with mock.patch.object(controller, '_mean_wait', return_value=(1.0, 10)):
+            controller.tick()
+            self.assertEqual((db_pool.size(), db_pool._max_overflow), (4, 2))
+
+            controller.tick()
+            controller.tick()
+
+        # never more than the configured peak
+        self.assertEqual((db_pool.size(), db_pool._max_overflow), (6, 0))
+
+    def test_shrinks_when_idle(self):
+        db_pool = make_pool(self, POOL_SIZE=4, MAX_OVERFLOW=2)
+        controller = self.make_controller(db_pool, 2, MIN_SIZE=1)
+        check_out(db_pool, 4)
+
+        with mock.patch.object(controller, '_mean_wait', return_value=(0.0, 0)):
+            controller.tick()
+
+        self.assertEqual((db_pool.size(), db_pool.checkedin(), db_pool._max_overflow), (2, 2, 2))
+
+    def test_budget_clamp(self):
+        db_pool = make_pool(self, POOL_SIZE=10, MAX_OVERFLOW=15)
+        controller = self.make_controller(db_pool, 15, MAX_CONNECTIONS=10, RESERVED=2, PROCESSES=2)
+
+        controller.apply_budget()
+
+        self.assertEqual(controller.budget, 4)
+        self.assertEqual((db_pool.size(), db_pool._max_overflow), (4, 0))
+
+    def test_processes_unset_warned(self):
+        db_pool = make_pool(self, POOL_SIZE=2, MAX_OVERFLOW=0)
+        controller = self.make_controller(db_pool, 0, MAX_CONNECTIONS=10, RESERVED=2)
+
+        with self.assertLogs('django', 'WARNING'):
+            controller.apply_budget()
+
+        self.assertEqual(controller.budget, 8)
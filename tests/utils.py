@@ -0,0 +1,34 @@
+import itertools
+
+from django.db import connections
+from django.db.utils import load_backend
+
+_counter = itertools.count()
+
+
+def unique_alias(prefix='test'):
+    """ The pools are kept per alias for the whole process: every test builds its own """
+    return '%s-%d' % (prefix, next(_counter))
+
+
+def make_wrapper(alias=None, options=None, **pool_options):
+    """
+    A DatabaseWrapper of the fake backend, not bound to the thread-local `connections`,
+    its server(a shared in-memory sqlite3 database) is named after the alias
+    """
+    alias = alias or unique_alias()
+    # completed by Django(TIME_ZONE, CONN_MAX_AGE, TEST...)
+    settings_dict = dict(connections['default'].settings_dict)
+    settings_dict.update(
+        NAME='file:%s?mode=memory&cache=shared' % alias,
+        OPTIONS=dict(options or {}),
+        POOL_OPTIONS=dict({'ENGINE': 'native', 'ECHO': False}, **pool_options),
+    )
+
+    backend = load_backend(settings_dict['ENGINE'])
+    return backend.DatabaseWrapper(settings_dict, alias)
+
+
+def fake_server(wrapper):
+    from database_pool.backends.fake.dbapi import FakeServer
+    return FakeServer.get(wrapper.settings_dict['NAME'])